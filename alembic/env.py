@@ -29,6 +29,15 @@ if config.config_file_name is not None:
 # Set target metadata
 target_metadata = Base.metadata
 
+# Full-text search objects are managed by hand-written migrations, not the models
+FTS_OBJECTS = {"book_fts", "search_vector", "ix_book_search_vector"}
+
+def include_object(object, name, type_, reflected, compare_to):
+    """Keep autogenerate from dropping the full-text search table/column"""
+    if name in FTS_OBJECTS or (type_ == "table" and name.startswith("book_fts_")):
+        return False
+    return True
+
 def get_database_url():
     """Get database URL from environment variables"""
     db_type = os.getenv("DB_TYPE", "sqlite")
@@ -53,7 +62,8 @@ def run_migrations_offline() -> None:
         target_metadata=target_metadata,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
-        render_as_batch=True
+        render_as_batch=True,
+        include_object=include_object
     )
 
     with context.begin_transaction():
@@ -76,7 +86,8 @@ def run_migrations_online() -> None:
             target_metadata=target_metadata,
             compare_type=True,
             compare_server_default=True,
-            render_as_batch=True
+            render_as_batch=True,
+            include_object=include_object
         )
 
         with context.begin_transaction():
@@ -0,0 +1,28 @@
+"""Add (book_id, created_at, id) index on review
+
+Revision ID: 0a7d4e9b2c61
+Revises: f19c6e2a7d58
+Create Date: 2026-10-18 13:47:15.306228
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0a7d4e9b2c61'
+down_revision: Union[str, Sequence[str], None] = 'f19c6e2a7d58'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_review_book_id_created_at', 'review', ['book_id', 'created_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_review_book_id_created_at', table_name='review')
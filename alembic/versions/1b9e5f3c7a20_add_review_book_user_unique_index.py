@@ -0,0 +1,45 @@
+"""Add unique (book_id, user_id) index on review
+
+Revision ID: 1b9e5f3c7a20
+Revises: 0a7d4e9b2c61
+Create Date: 2026-10-19 10:12:43.581907
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '1b9e5f3c7a20'
+down_revision: Union[str, Sequence[str], None] = '0a7d4e9b2c61'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Keep only the latest review of each user for a book
+    op.execute(
+        """
+        DELETE FROM review WHERE id NOT IN (
+            SELECT MAX(id) FROM review GROUP BY book_id, user_id
+        )
+        """
+    )
+    # Re-derive the rating aggregates the duplicates were counted in
+    op.execute(
+        """
+        UPDATE book SET
+            rating_sum = (SELECT COALESCE(SUM(review.rating), 0) FROM review WHERE review.book_id = book.id),
+            rating_count = (SELECT COUNT(review.id) FROM review WHERE review.book_id = book.id),
+            average_rating = (SELECT AVG(review.rating) FROM review WHERE review.book_id = book.id)
+        """
+    )
+    op.create_index('uq_review_book_id_user_id', 'review', ['book_id', 'user_id'], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('uq_review_book_id_user_id', table_name='review')
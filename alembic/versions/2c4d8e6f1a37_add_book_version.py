@@ -0,0 +1,31 @@
+"""Add book.version
+
+Revision ID: 2c4d8e6f1a37
+Revises: 1b9e5f3c7a20
+Create Date: 2026-10-20 09:31:08.114562
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2c4d8e6f1a37'
+down_revision: Union[str, Sequence[str], None] = '1b9e5f3c7a20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Plain ALTER TABLE rather than batch mode, to keep the full-text search
+# triggers on SQLite (see f19c6e2a7d58).
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('book', sa.Column('version', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('book', 'version')
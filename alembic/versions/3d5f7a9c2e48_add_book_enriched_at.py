@@ -0,0 +1,33 @@
+"""Add book.enriched_at
+
+Revision ID: 3d5f7a9c2e48
+Revises: 2c4d8e6f1a37
+Create Date: 2026-10-21 10:12:44.305918
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3d5f7a9c2e48'
+down_revision: Union[str, Sequence[str], None] = '2c4d8e6f1a37'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Plain ALTER TABLE rather than batch mode, to keep the full-text search
+# triggers on SQLite (see f19c6e2a7d58).
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('book', sa.Column('enriched_at', sa.DateTime(timezone=True), nullable=True))
+    # Books already linked to Google Books count as enriched when last updated
+    op.execute("UPDATE book SET enriched_at = updated_at WHERE google_books_id IS NOT NULL")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('book', 'enriched_at')
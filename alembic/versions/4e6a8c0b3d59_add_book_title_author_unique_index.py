@@ -0,0 +1,51 @@
+"""Add unique index on normalized book (title, author)
+
+Revision ID: 4e6a8c0b3d59
+Revises: 3d5f7a9c2e48
+Create Date: 2026-10-22 14:03:27.518440
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4e6a8c0b3d59'
+down_revision: Union[str, Sequence[str], None] = '3d5f7a9c2e48'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+DUPLICATES = """
+    SELECT count(*) FROM (
+        SELECT 1 FROM book
+        GROUP BY lower(trim(title)), lower(trim(author))
+        HAVING count(*) > 1
+    ) AS duplicates
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Conflict target of the set-based seed refresh. Merging duplicate books
+    # means moving their reviews, so it is left to the operator
+    duplicates = op.get_bind().execute(sa.text(DUPLICATES)).scalar()
+    if duplicates:
+        raise RuntimeError(
+            f"{duplicates} (title, author) pairs are shared by several books "
+            "(compared case-insensitively, ignoring surrounding spaces); "
+            "merge or rename them before upgrading"
+        )
+    op.create_index(
+        'uq_book_title_author',
+        'book',
+        [sa.text('lower(trim(title))'), sa.text('lower(trim(author))')],
+        unique=True,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('uq_book_title_author', table_name='book')
@@ -0,0 +1,39 @@
+"""Add book_statistics snapshot table
+
+Revision ID: 5f7b9d1e3a60
+Revises: 4e6a8c0b3d59
+Create Date: 2026-10-23 09:41:12.087364
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5f7b9d1e3a60'
+down_revision: Union[str, Sequence[str], None] = '4e6a8c0b3d59'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'book_statistics',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('computed_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=False),
+        sa.Column('total_books', sa.Integer(), nullable=False),
+        sa.Column('total_reviews', sa.Integer(), nullable=False),
+        sa.Column('books_with_reviews', sa.Integer(), nullable=False),
+        sa.Column('books_with_google_id', sa.Integer(), nullable=False),
+        sa.Column('genre_distribution', sa.JSON(), nullable=False),
+        sa.Column('duration_seconds', sa.Float(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('book_statistics')
@@ -0,0 +1,48 @@
+"""Add genre_statistics counters
+
+Revision ID: 6a8c0e2f4b71
+Revises: 5f7b9d1e3a60
+Create Date: 2026-10-24 11:26:05.713920
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6a8c0e2f4b71'
+down_revision: Union[str, Sequence[str], None] = '5f7b9d1e3a60'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'genre_statistics',
+        sa.Column('genre', sa.String(length=100), nullable=False),
+        sa.Column('books', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('books_with_reviews', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('books_with_google_id', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('reviews', sa.Integer(), server_default='0', nullable=False),
+        sa.PrimaryKeyConstraint('genre'),
+    )
+    # Start the counters from the catalog as it is
+    op.execute("""
+        INSERT INTO genre_statistics (genre, books, books_with_reviews, books_with_google_id, reviews)
+        SELECT genre, count(*),
+               sum(CASE WHEN rating_count > 0 THEN 1 ELSE 0 END),
+               count(google_books_id),
+               coalesce(sum(rating_count), 0)
+        FROM book
+        GROUP BY genre
+    """)
+    op.add_column('book_statistics', sa.Column('discrepancies', sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('book_statistics', 'discrepancies')
+    op.drop_table('genre_statistics')
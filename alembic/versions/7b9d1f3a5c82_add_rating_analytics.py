@@ -0,0 +1,45 @@
+"""Add rating analytics
+
+Revision ID: 7b9d1f3a5c82
+Revises: 6a8c0e2f4b71
+Create Date: 2026-10-25 09:42:17.381204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7b9d1f3a5c82'
+down_revision: Union[str, Sequence[str], None] = '6a8c0e2f4b71'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('book_statistics', sa.Column('rating_analytics', sa.JSON(), nullable=True))
+    op.create_table(
+        'book_rating_statistics',
+        sa.Column('book_id', sa.Integer(), nullable=False),
+        sa.Column('ratings', sa.Integer(), nullable=False),
+        sa.Column('histogram', sa.JSON(), nullable=False),
+        sa.Column('mean', sa.Float(), nullable=False),
+        sa.Column('variance', sa.Float(), nullable=False),
+        sa.Column('percentiles', sa.JSON(), nullable=False),
+        sa.Column('bayesian_average', sa.Float(), nullable=False),
+        sa.ForeignKeyConstraint(['book_id'], ['book.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('book_id'),
+    )
+    op.create_index(
+        op.f('ix_book_rating_statistics_bayesian_average'), 'book_rating_statistics', ['bayesian_average'], unique=False
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_book_rating_statistics_bayesian_average'), table_name='book_rating_statistics')
+    op.drop_table('book_rating_statistics')
+    op.drop_column('book_statistics', 'rating_analytics')
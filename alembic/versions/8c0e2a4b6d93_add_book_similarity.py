@@ -0,0 +1,37 @@
+"""Add book_similarity
+
+Revision ID: 8c0e2a4b6d93
+Revises: 7b9d1f3a5c82
+Create Date: 2026-10-26 14:08:51.224690
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8c0e2a4b6d93'
+down_revision: Union[str, Sequence[str], None] = '7b9d1f3a5c82'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'book_similarity',
+        sa.Column('book_id', sa.Integer(), nullable=False),
+        sa.Column('rank', sa.Integer(), nullable=False),
+        sa.Column('similar_book_id', sa.Integer(), nullable=False),
+        sa.Column('score', sa.Float(), nullable=False),
+        sa.ForeignKeyConstraint(['book_id'], ['book.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['similar_book_id'], ['book.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('book_id', 'rank'),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('book_similarity')
@@ -0,0 +1,44 @@
+"""Add denormalized rating aggregates to book
+
+Revision ID: b41f6c2d9e07
+Revises: 73fb390d1235
+Create Date: 2026-10-17 09:12:04.118342
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b41f6c2d9e07'
+down_revision: Union[str, Sequence[str], None] = '73fb390d1235'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('book', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('rating_sum', sa.Integer(), server_default='0', nullable=False))
+        batch_op.add_column(sa.Column('rating_count', sa.Integer(), server_default='0', nullable=False))
+        batch_op.add_column(sa.Column('average_rating', sa.Float(), nullable=True))
+
+    # Backfill from existing reviews
+    op.execute(
+        """
+        UPDATE book SET
+            rating_sum = (SELECT COALESCE(SUM(review.rating), 0) FROM review WHERE review.book_id = book.id),
+            rating_count = (SELECT COUNT(review.id) FROM review WHERE review.book_id = book.id),
+            average_rating = (SELECT AVG(review.rating) FROM review WHERE review.book_id = book.id)
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('book', schema=None) as batch_op:
+        batch_op.drop_column('average_rating')
+        batch_op.drop_column('rating_count')
+        batch_op.drop_column('rating_sum')
@@ -0,0 +1,30 @@
+"""Add index on review.book_id
+
+Revision ID: c8a1e4f03b92
+Revises: b41f6c2d9e07
+Create Date: 2026-10-17 11:40:27.503916
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c8a1e4f03b92'
+down_revision: Union[str, Sequence[str], None] = 'b41f6c2d9e07'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('review', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_review_book_id'), ['book_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('review', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_review_book_id'))
@@ -0,0 +1,35 @@
+"""Add book keyset pagination indexes
+
+Revision ID: d2f7a9b15c3e
+Revises: c8a1e4f03b92
+Create Date: 2026-10-17 14:05:51.274610
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd2f7a9b15c3e'
+down_revision: Union[str, Sequence[str], None] = 'c8a1e4f03b92'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_book_title_id', 'book', ['title', 'id'], unique=False)
+    op.create_index(
+        'ix_book_rating_sort',
+        'book',
+        [sa.text('coalesce(average_rating, 0.0)'), 'id'],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_book_rating_sort', table_name='book')
+    op.drop_index('ix_book_title_id', table_name='book')
@@ -0,0 +1,86 @@
+"""Add full-text search index for book title/author
+
+Revision ID: e5b3c8d41a6f
+Revises: d2f7a9b15c3e
+Create Date: 2026-10-17 16:22:09.861447
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5b3c8d41a6f'
+down_revision: Union[str, Sequence[str], None] = 'd2f7a9b15c3e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if op.get_bind().dialect.name == "postgresql":
+        # Generated column, so no triggers are needed to keep it in sync
+        op.execute(
+            """
+            ALTER TABLE book ADD COLUMN search_vector tsvector
+            GENERATED ALWAYS AS (
+                setweight(to_tsvector('simple', coalesce(title, '')), 'A') ||
+                setweight(to_tsvector('simple', coalesce(author, '')), 'B')
+            ) STORED
+            """
+        )
+        op.execute("CREATE INDEX ix_book_search_vector ON book USING GIN (search_vector)")
+        return
+
+    # SQLite: external-content FTS5 table over book, synced by triggers.
+    # Note: a batch "move and copy" of the book table drops these triggers,
+    # so any later migration that recreates book must recreate them.
+    op.execute(
+        """
+        CREATE VIRTUAL TABLE book_fts USING fts5(
+            title, author,
+            content='book', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2',
+            prefix='2 3'
+        )
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER book_fts_ai AFTER INSERT ON book BEGIN
+            INSERT INTO book_fts(rowid, title, author) VALUES (new.id, new.title, new.author);
+        END
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER book_fts_ad AFTER DELETE ON book BEGIN
+            INSERT INTO book_fts(book_fts, rowid, title, author) VALUES ('delete', old.id, old.title, old.author);
+        END
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER book_fts_au AFTER UPDATE OF title, author ON book BEGIN
+            INSERT INTO book_fts(book_fts, rowid, title, author) VALUES ('delete', old.id, old.title, old.author);
+            INSERT INTO book_fts(rowid, title, author) VALUES (new.id, new.title, new.author);
+        END
+        """
+    )
+    op.execute("INSERT INTO book_fts(book_fts) VALUES ('rebuild')")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name == "postgresql":
+        op.execute("DROP INDEX IF EXISTS ix_book_search_vector")
+        with op.batch_alter_table('book', schema=None) as batch_op:
+            batch_op.drop_column('search_vector')
+        return
+
+    op.execute("DROP TRIGGER IF EXISTS book_fts_au")
+    op.execute("DROP TRIGGER IF EXISTS book_fts_ad")
+    op.execute("DROP TRIGGER IF EXISTS book_fts_ai")
+    op.execute("DROP TABLE IF EXISTS book_fts")
@@ -0,0 +1,33 @@
+"""Add book.updated_at
+
+Revision ID: f19c6e2a7d58
+Revises: e5b3c8d41a6f
+Create Date: 2026-10-18 10:03:44.592071
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f19c6e2a7d58'
+down_revision: Union[str, Sequence[str], None] = 'e5b3c8d41a6f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Plain ALTER TABLE rather than batch mode: a batch "move and copy" of book on
+# SQLite would drop the full-text search triggers.
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('book', sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True))
+    op.create_index(op.f('ix_book_updated_at'), 'book', ['updated_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_book_updated_at'), table_name='book')
+    op.drop_column('book', 'updated_at')
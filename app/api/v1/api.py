@@ -1,8 +1,12 @@
 from fastapi import APIRouter
-from .endpoints import auth, books, google_books, tasks  # Add tasks import
+from .endpoints import auth, books, cache, google_books, reviews, statistics, tasks, users  # Add tasks import
 
 api_router = APIRouter()
 api_router.include_router(auth.router, prefix="/auth", tags=["auth"])
 api_router.include_router(books.router, prefix="/books", tags=["books"])
+api_router.include_router(reviews.router, prefix="/reviews", tags=["reviews"])
 api_router.include_router(google_books.router, prefix="/google-books", tags=["google-books"])
-api_router.include_router(tasks.router, prefix="/tasks", tags=["tasks"])  # Add this line
\ No newline at end of file
+api_router.include_router(cache.router, prefix="/cache", tags=["cache"])
+api_router.include_router(statistics.router, prefix="/statistics", tags=["statistics"])
+api_router.include_router(tasks.router, prefix="/tasks", tags=["tasks"])  # Add this line
+api_router.include_router(users.router, prefix="/users", tags=["users"])
\ No newline at end of file
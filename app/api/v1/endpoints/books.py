@@ -1,25 +1,82 @@
-from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from typing import List, Literal, Optional
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
+from fastapi.responses import StreamingResponse
 
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.schemas.book import Book, BookWithReviews
+from app.schemas.book import Book, BookWithReviews, SimilarBook
 from app.schemas.review import Review, ReviewCreate
 from app.schemas.user import User
 from app.api import deps
+from app.api.conditional import etag_matches, not_modified, validator_headers
 from app.services.book_service import book_service
+from app.services.recommendation_service import recommendation_service
 
 router = APIRouter()
 
 @router.get("/", response_model=List[Book])
 async def read_books(
+    request: Request,
     db: AsyncSession = Depends(deps.get_db),
-    skip: int = 0,
-    limit: int = 10,
+    skip: int = Query(0, ge=0, description="Legacy OFFSET paging; ignored when cursor is given"),
+    limit: int = Query(10, ge=1, le=100, description="Page size; use /books/export for the whole catalog"),
     search: Optional[str] = Query(None, min_length=2),
+    sort: Optional[Literal["id", "title", "rating", "relevance"]] = Query(
+        None, description="Defaults to relevance when searching, otherwise id"
+    ),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from a previous X-Next-Cursor header"),
     current_user: User = Depends(deps.get_current_user),
 ):
-    books = await book_service.get_books(db, skip=skip, limit=limit, search=search)
-    return books
+    """
+    List books. Pass the `X-Next-Cursor` response header back as `cursor` to
+    fetch the next page with constant cost regardless of depth.
+    Send the `ETag` of a previous response as `If-None-Match` to get a 304
+    when the page has not changed.
+    """
+    try:
+        # Search candidates are resolved once for both the ETag and the body
+        query = await book_service.resolve_books_page(
+            db, skip=skip, search=search, sort=sort, cursor=cursor
+        )
+        etag, last_modified = await book_service.get_books_page_etag(
+            db, skip=skip, limit=limit, search=search, sort=sort, cursor=cursor, query=query
+        )
+        headers = validator_headers(etag, last_modified)
+        if etag_matches(request, etag):
+            return not_modified(headers)
+        body, next_cursor = await book_service.get_books_page_json(
+            db, skip=skip, limit=limit, search=search, sort=sort, cursor=cursor, etag=etag, query=query
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    # The body is already rendered (and possibly cached) by the service
+    response = Response(content=body, media_type="application/json", headers=headers)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return response
+
+@router.get("/export")
+async def export_books(
+    format: Literal["ndjson", "csv"] = Query("ndjson"),
+    include: Optional[Literal["ratings", "reviews"]] = Query(
+        None, description="Add rating stats, or rating stats and every review, to each book"
+    ),
+    current_user: User = Depends(deps.get_current_user),
+):
+    """
+    Export the whole catalog in id order, streamed from a server-side cursor
+    so memory use does not depend on the number of books.
+    """
+    chunks = book_service.export_catalog(format=format, include=include)
+    if format == "csv":
+        return StreamingResponse(
+            chunks,
+            media_type="text/csv",
+            headers={"Content-Disposition": 'attachment; filename="books.csv"'}
+        )
+    return StreamingResponse(chunks, media_type="application/x-ndjson")
 
 @router.post(
     "/{book_id}/reviews",
@@ -85,16 +142,66 @@ async def add_or_update_book_review(
 @router.get("/{book_id}/reviews", response_model=BookWithReviews)
 async def get_book_reviews(
     book_id: int,
+    request: Request,
     db: AsyncSession = Depends(deps.get_db),
+    limit: int = Query(100, ge=1, le=1000, description="Page size; ignored when format=ndjson"),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from a previous X-Next-Cursor header"),
+    format: Literal["json", "ndjson"] = Query(
+        "json", description="ndjson streams every review (after cursor) one JSON object per line"
+    ),
     current_user: User = Depends(deps.get_current_user),
 ):
-    book_with_reviews = await book_service.get_reviews_for_book(db, book_id=book_id)
-    if not book_with_reviews:
+    """
+    A book with its reviews, oldest first. JSON responses are paginated: pass the
+    `X-Next-Cursor` response header back as `cursor` for the next page.
+    With `format=ndjson` the reviews are streamed instead, and the book's average
+    rating and review count are returned in the X-Average-Rating and X-Review-Count headers.
+    """
+    version = await book_service.get_reviews_etag(
+        db, book_id=book_id, limit=limit, cursor=cursor, format=format
+    )
+    if version is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, 
             detail="Book not found"
         )
-    return book_with_reviews
+    etag, last_modified = version
+    headers = validator_headers(etag, last_modified)
+    if etag_matches(request, etag):
+        return not_modified(headers)
+
+    book = page = None
+    try:
+        if format == "ndjson":
+            book = await book_service.get_review_summary(db, book_id=book_id)
+            lines = book_service.stream_reviews_ndjson(book_id=book_id, cursor=cursor)
+        else:
+            page = await book_service.get_reviews_for_book_json(
+                db, book_id=book_id, limit=limit, cursor=cursor, etag=etag
+            )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    if book is None and page is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, 
+            detail="Book not found"
+        )
+
+    if format == "ndjson":
+        headers["X-Review-Count"] = str(book.review_count)
+        if book.average_rating is not None:
+            headers["X-Average-Rating"] = str(book.average_rating)
+        return StreamingResponse(lines, media_type="application/x-ndjson", headers=headers)
+
+    # The body is already rendered (and possibly cached) by the service
+    body, next_cursor = page
+    response = Response(content=body, media_type="application/json", headers=headers)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return response
 
 @router.delete("/{book_id}/reviews", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_book_review(
@@ -141,4 +248,25 @@ async def get_my_review_for_book(
             book_id=user_review.book_id,
             user_id=user_review.user_id
         )
-    return None
\ No newline at end of file
+    return None
+
+@router.get("/{book_id}/similar", response_model=List[SimilarBook])
+async def read_similar_books(
+    book_id: int,
+    db: AsyncSession = Depends(deps.get_db),
+    limit: int = Query(10, ge=1, le=100, description="At most RECOMMENDER_NEIGHBORS books are kept per book"),
+    current_user: User = Depends(deps.get_current_user),
+):
+    """
+    Books most similar to a book, most similar first: readers who rated one
+    rated the other alike. Read from the neighbors precomputed by the
+    train_book_similarity task, so the cost does not depend on the number of
+    ratings.
+    """
+    books = await recommendation_service.get_similar_books(db, book_id=book_id, limit=limit)
+    if books is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Book not found"
+        )
+    return books
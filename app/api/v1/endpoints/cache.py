@@ -0,0 +1,18 @@
+from typing import Any, Dict
+from fastapi import APIRouter, Depends
+
+from app.api import deps
+from app.schemas.user import User
+from app.services.response_cache import response_cache
+
+router = APIRouter()
+
+@router.get("/stats")
+async def get_cache_stats(
+    current_user: User = Depends(deps.get_current_user),
+) -> Dict[str, Any]:
+    """
+    Response cache counters for this process: hits, misses, stale entries
+    (invalidated by writes), LRU evictions and TTL expirations
+    """
+    return response_cache.stats()
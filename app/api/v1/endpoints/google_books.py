@@ -1,16 +1,35 @@
+import math
 from fastapi import APIRouter, Depends, HTTPException, status, Query
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 
 from app.api import deps
-from app.services.google_books_service import google_books_service
-from app.schemas.google_books import GoogleBookSearchResponse, BookImportRequest, GoogleBookSearchResult
+from app.services.google_books_service import GoogleBooksUnavailable, google_books_service
+from app.services.response_cache import LISTING_TAG, response_cache
+from app.services.search_index import book_search_index
+from app.schemas.google_books import (
+    BookBatchImportRequest,
+    BookBatchImportResult,
+    BookImportRequest,
+    GoogleBookSearchResponse,
+    GoogleBookSearchResult,
+)
+from app.services.book_service import book_service
 from app.crud.crud_book import book as book_crud
 from app.schemas.book import Book, BookCreate
 from app.schemas.user import User
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
 router = APIRouter()
 
+def unavailable(e: GoogleBooksUnavailable) -> HTTPException:
+    headers = {"Retry-After": str(math.ceil(e.retry_after))} if e.retry_after is not None else None
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail=f"Google Books API unavailable: {e}",
+        headers=headers
+    )
+
 @router.get("/search", response_model=GoogleBookSearchResponse)
 async def search_google_books(
     query: str = Query(..., min_length=2, description="Search query for books"),
@@ -18,20 +37,36 @@ async def search_google_books(
     current_user: User = Depends(deps.get_current_user),
 ):
     """Search books using Google Books API"""
-    books = await google_books_service.search_books(query, max_results)
+    try:
+        books = await google_books_service.search_books(query, max_results)
+    except GoogleBooksUnavailable as e:
+        raise unavailable(e)
     
     return GoogleBookSearchResponse(
         books=books,
         total_results=len(books)
     )
 
+@router.get("/client/stats")
+async def get_google_books_client_stats(
+    current_user: User = Depends(deps.get_current_user),
+) -> Dict[str, Any]:
+    """
+    Counters of this process's Google Books API client: requests, errors,
+    average latency, connections opened and the state of its connection pool
+    """
+    return google_books_service.stats()
+
 @router.get("/{google_books_id}", response_model=GoogleBookSearchResult)
 async def get_google_book_details(
     google_books_id: str,
     current_user: User = Depends(deps.get_current_user),
 ):
     """Get detailed information for a specific book from Google Books API"""
-    book_details = await google_books_service.get_book_details(google_books_id)
+    try:
+        book_details = await google_books_service.get_book_details(google_books_id)
+    except GoogleBooksUnavailable as e:
+        raise unavailable(e)
     if not book_details:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -55,7 +90,10 @@ async def import_book_from_google(
         )
     
     # Get book details from Google Books API
-    book_details = await google_books_service.get_book_details(import_request.google_books_id)
+    try:
+        book_details = await google_books_service.get_book_details(import_request.google_books_id)
+    except GoogleBooksUnavailable as e:
+        raise unavailable(e)
     if not book_details:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -74,5 +112,30 @@ async def import_book_from_google(
         thumbnail_url=book_details.get("thumbnail")
     )
     
-    book = await book_crud.create(db, obj_in=book_create)
-    return book
\ No newline at end of file
+    try:
+        book = await book_crud.create(db, obj_in=book_create)
+    except IntegrityError:
+        # Imported concurrently, or another edition with the same title and author
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Book already exists in database"
+        )
+    book_search_index.add_book(book.id, book.title, book.author, book.genre)
+    await response_cache.invalidate(LISTING_TAG)
+    return book
+
+@router.post("/import/batch", response_model=BookBatchImportResult)
+async def import_books_from_google(
+    import_request: BookBatchImportRequest,
+    db: AsyncSession = Depends(deps.get_db),
+    current_user: User = Depends(deps.get_current_user),
+):
+    """
+    Import many books from Google Books API at once. Each id gets its own status
+    (imported, exists, duplicate, not_found, invalid or unavailable); ids that
+    cannot be imported do not reject the rest of the batch.
+    """
+    return await book_service.import_from_google_books(
+        db, google_books_ids=import_request.google_books_ids, genre=import_request.genre
+    )
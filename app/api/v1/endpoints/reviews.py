@@ -0,0 +1,24 @@
+from fastapi import APIRouter, Depends
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.schemas.review import ReviewBatchCreate, ReviewBatchResult
+from app.schemas.user import User
+from app.api import deps
+from app.services.book_service import book_service
+
+router = APIRouter()
+
+@router.post("/batch", response_model=ReviewBatchResult)
+async def add_reviews_batch(
+    batch_in: ReviewBatchCreate,
+    db: AsyncSession = Depends(deps.get_db),
+    current_user: User = Depends(deps.get_current_user),
+):
+    """
+    Create or update many of the current user's reviews in one request.
+    Each item gets its own status (created, updated, invalid, not_found,
+    superseded or failed); invalid items do not reject the rest of the batch.
+    """
+    return await book_service.add_reviews_batch(
+        db, user_id=current_user.id, items=batch_in.items
+    )
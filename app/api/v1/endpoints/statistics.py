@@ -0,0 +1,52 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api import deps
+from app.schemas.statistics import BookRatingStatistics, BookStatistics, RatingAnalytics
+from app.schemas.user import User
+from app.services.book_service import book_service
+
+router = APIRouter()
+
+@router.get("/", response_model=BookStatistics)
+async def read_statistics(
+    db: AsyncSession = Depends(deps.get_db),
+    current_user: User = Depends(deps.get_current_user),
+):
+    """
+    Current catalog statistics, read from per-genre counters that every book
+    and review write updates, so the cost does not depend on the catalog size
+    """
+    return await book_service.get_statistics(db)
+
+@router.get("/ratings", response_model=RatingAnalytics)
+async def read_rating_analytics(
+    db: AsyncSession = Depends(deps.get_db),
+    current_user: User = Depends(deps.get_current_user),
+):
+    """
+    Rating distributions overall, per genre and per month, and the top books
+    by Bayesian average, as computed by the latest daily statistics run
+    """
+    analytics = await book_service.get_rating_analytics(db)
+    if analytics is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Rating analytics have not been computed yet"
+        )
+    return analytics
+
+@router.get("/books/{book_id}", response_model=BookRatingStatistics)
+async def read_book_rating_statistics(
+    book_id: int,
+    db: AsyncSession = Depends(deps.get_db),
+    current_user: User = Depends(deps.get_current_user),
+):
+    """Rating distribution of a book as of the latest daily statistics run"""
+    statistics = await book_service.get_book_rating_statistics(db, book_id)
+    if statistics is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No rating statistics for this book"
+        )
+    return statistics
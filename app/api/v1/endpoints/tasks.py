@@ -7,6 +7,9 @@ from app.tasks.tasks import (
     refresh_book_data_from_source,
     refresh_book_data_from_google_books,  # Add new task
     calculate_book_statistics,
+    recalculate_book_rating_aggregates,
+    train_book_similarity,
+    train_book_recommender,
     send_new_book_notification
 )
 
@@ -63,6 +66,54 @@ async def trigger_statistics_calculation(
         "task_name": "calculate_statistics"
     }
 
+@router.post("/recalculate-ratings")
+async def trigger_rating_recalculation(
+    current_user: User = Depends(deps.get_current_user)
+) -> Dict[str, Any]:
+    """
+    Trigger background task to re-derive book rating aggregates from reviews
+    """
+    task = recalculate_book_rating_aggregates.delay()
+
+    return {
+        "message": "Rating aggregate recalculation task started",
+        "task_id": task.id,
+        "status": "processing",
+        "task_name": "recalculate_book_rating_aggregates"
+    }
+
+@router.post("/train-similarity")
+async def trigger_similarity_training(
+    current_user: User = Depends(deps.get_current_user)
+) -> Dict[str, Any]:
+    """
+    Trigger background task to recompute the similar books of every book from reviews
+    """
+    task = train_book_similarity.delay()
+
+    return {
+        "message": "Book similarity training task started",
+        "task_id": task.id,
+        "status": "processing",
+        "task_name": "train_book_similarity"
+    }
+
+@router.post("/train-recommender")
+async def trigger_recommender_training(
+    current_user: User = Depends(deps.get_current_user)
+) -> Dict[str, Any]:
+    """
+    Trigger background task to retrain the personalized recommendations from reviews
+    """
+    task = train_book_recommender.delay()
+
+    return {
+        "message": "Book recommender training task started",
+        "task_id": task.id,
+        "status": "processing",
+        "task_name": "train_book_recommender"
+    }
+
 @router.post("/notify-new-book")
 async def trigger_new_book_notification(
     book_title: str,
@@ -0,0 +1,30 @@
+from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api import deps
+from app.schemas.book import RecommendedBook
+from app.schemas.user import User
+from app.services.recommendation_service import recommendation_service
+
+router = APIRouter()
+
+@router.get("/me/recommendations", response_model=List[RecommendedBook])
+async def read_my_recommendations(
+    db: AsyncSession = Depends(deps.get_db),
+    limit: int = Query(10, ge=1, le=100),
+    current_user: User = Depends(deps.get_current_user),
+):
+    """
+    Books the current user is predicted to like most, best first, among those
+    they have not reviewed. Scored against the user and book factors of the
+    latest train_book_recommender run, memory-mapped by every API process;
+    users without reviews in that run get the books most users would like.
+    """
+    books = await recommendation_service.get_recommendations(db, user_id=current_user.id, limit=limit)
+    if books is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Recommendations are not available until the recommender has been trained"
+        )
+    return books
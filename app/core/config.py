@@ -1,6 +1,6 @@
 import os
 from pydantic_settings import BaseSettings
-from typing import Literal
+from typing import Literal, Optional
 
 class Settings(BaseSettings):
     PROJECT_NAME: str = "Book Recommendation System"
@@ -29,14 +29,129 @@ class Settings(BaseSettings):
         else:
             return f"sqlite+aiosqlite:///{self.SQLITE_DB_PATH}"
 
+    # Where book listings read ratings from: the denormalized columns on book,
+    # or a live AVG/COUNT aggregate over the review table
+    BOOK_RATING_SOURCE: Literal["denormalized", "aggregate"] = "denormalized"
+
+    # Book search: full-text index (FTS5 on SQLite, tsvector on Postgres),
+    # an in-process trigram index, or a plain ILIKE substring scan
+    BOOK_SEARCH_BACKEND: Literal["fts", "trigram", "ilike"] = "fts"
+    # Trigram index: max candidate ids resolved per search, and how often each
+    # process catches up with books written by other processes
+    BOOK_SEARCH_INDEX_MAX_CANDIDATES: int = 2000
+    BOOK_SEARCH_INDEX_SYNC_SECONDS: float = 5.0
+
+    # Service-tier cache of book listing and review pages: off, an in-process
+    # LRU, or Redis (shared by all processes; needed for Celery task writes to
+    # invalidate it immediately rather than after the TTL)
+    RESPONSE_CACHE_BACKEND: Literal["off", "memory", "redis"] = "memory"
+    RESPONSE_CACHE_TTL_SECONDS: float = 30.0
+    RESPONSE_CACHE_MAX_ENTRIES: int = 10_000
+    RESPONSE_CACHE_REDIS_URL: str = "redis://localhost:6379/1"
+
+    # Bulk review ingestion: max items per request, and items written per
+    # multi-row upsert transaction
+    REVIEW_BATCH_MAX_ITEMS: int = 10_000
+    REVIEW_BATCH_CHUNK_SIZE: int = 500
+
     SECRET_KEY: str = "your-super-secret-jwt-key-change-in-production"
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60
 
+    # Feed merged by the refresh_book_data_from_source task: a JSON array, or
+    # NDJSON (.ndjson/.jsonl), streamed and merged this many books at a time
+    SEED_FEED_PATH: str = "data/books_seed.json"
+    SEED_REFRESH_BATCH_SIZE: int = 5000
+
+    # Rating analytics of the statistics task (needs numpy): reviews are read
+    # BATCH_SIZE rows at a time. Book averages are shrunk towards the catalog
+    # mean as if they had PRIOR_WEIGHT more ratings (default: the mean number
+    # of ratings per reviewed book); the TOP_BOOKS best are kept in the snapshot
+    RATING_ANALYTICS_BATCH_SIZE: int = 100_000
+    RATING_ANALYTICS_PRIOR_WEIGHT: Optional[float] = None
+    RATING_ANALYTICS_TOP_BOOKS: int = 20
+
+    # Item-item recommender trained by train_book_similarity (needs numpy and
+    # scipy): NEIGHBORS most similar books kept per book, by cosine similarity
+    # of their ratings, or adjusted cosine (ratings centered on each user's
+    # mean); similarities are computed BLOCK_SIZE books at a time
+    RECOMMENDER_NEIGHBORS: int = 20
+    RECOMMENDER_SIMILARITY: Literal["cosine", "adjusted_cosine"] = "adjusted_cosine"
+    RECOMMENDER_BLOCK_SIZE: int = 2000
+    # Personalized recommendations: ALS matrix factorization of the ratings
+    # (implicit: reviewed or not, with confidence 1 + ALPHA * rating; explicit:
+    # the ratings themselves) trained by train_book_recommender, whose factor
+    # files are written as versions under MODEL_DIR (the newest KEEP_VERSIONS
+    # are kept) and memory-mapped by the API processes
+    RECOMMENDER_MODEL_DIR: str = "data/recommender"
+    RECOMMENDER_MODEL_KEEP_VERSIONS: int = 3
+    RECOMMENDER_FACTORS: int = 64
+    RECOMMENDER_ALS_MODE: Literal["implicit", "explicit"] = "implicit"
+    RECOMMENDER_ALS_ITERATIONS: int = 10
+    RECOMMENDER_ALS_REGULARIZATION: float = 0.1
+    RECOMMENDER_ALS_ALPHA: float = 5.0
+
     CELERY_BROKER_URL: str = "redis://localhost:6379/0"
     CELERY_RESULT_BACKEND: str = "redis://localhost:6379/0"
+    # Database pool of each Celery worker process: by default one connection
+    # per task the process runs at once (1 for prefork children), plus overflow
+    CELERY_DB_POOL_SIZE: Optional[int] = None
+    CELERY_DB_MAX_OVERFLOW: int = 2
 
     GOOGLE_BOOKS_API_KEY: str = ""
+    GOOGLE_BOOKS_BASE_URL: str = "https://www.googleapis.com/books/v1"
+    # Shared, keep-alive HTTP client of the Google Books API. HTTP/2 needs the
+    # h2 package (httpx[http2]) and falls back to HTTP/1.1 without it
+    GOOGLE_BOOKS_HTTP2: bool = False
+    GOOGLE_BOOKS_MAX_CONNECTIONS: int = 20
+    GOOGLE_BOOKS_MAX_KEEPALIVE_CONNECTIONS: int = 10
+    GOOGLE_BOOKS_KEEPALIVE_EXPIRY_SECONDS: float = 30.0
+    GOOGLE_BOOKS_TIMEOUT_SECONDS: float = 10.0
+    GOOGLE_BOOKS_CONNECT_TIMEOUT_SECONDS: float = 3.0
+    # Pacing of outbound Google Books requests: a token bucket per process
+    # (memory) or shared by all processes (redis); calls give up with a 503 when
+    # a token, or a Retry-After pause, is further away than MAX_WAIT_SECONDS.
+    # 429s are retried up to MAX_RETRIES times
+    GOOGLE_BOOKS_RATE_LIMIT_BACKEND: Literal["off", "memory", "redis"] = "memory"
+    GOOGLE_BOOKS_RATE_LIMIT_PER_SECOND: float = 50.0
+    GOOGLE_BOOKS_RATE_LIMIT_BURST: int = 50
+    GOOGLE_BOOKS_RATE_LIMIT_REDIS_URL: str = "redis://localhost:6379/1"
+    GOOGLE_BOOKS_RATE_LIMIT_MAX_WAIT_SECONDS: float = 5.0
+    GOOGLE_BOOKS_MAX_RETRIES: int = 2
+    # Requests in flight per process, adapted between 1 and MAX_CONCURRENCY:
+    # halved on 429s, errors or responses slower than LATENCY_TARGET_SECONDS
+    GOOGLE_BOOKS_MAX_CONCURRENCY: int = 16
+    GOOGLE_BOOKS_LATENCY_TARGET_SECONDS: float = 2.0
+    # Consecutive failures (errors, 5xx, timeouts) that open the circuit, and
+    # how long it stays open before a trial request
+    GOOGLE_BOOKS_BREAKER_FAILURE_THRESHOLD: int = 5
+    GOOGLE_BOOKS_BREAKER_RESET_SECONDS: float = 30.0
+    # Cache of Google Books API results: off, an in-process LRU, or the LRU in
+    # front of a SQLite file shared by all processes on the host (tiered).
+    # Entries are served stale for STALE_SECONDS past their TTL while being
+    # refreshed; "no results" are kept for NEGATIVE_TTL_SECONDS
+    GOOGLE_BOOKS_CACHE_BACKEND: Literal["off", "memory", "tiered"] = "tiered"
+    GOOGLE_BOOKS_CACHE_PATH: str = "data/google_books_cache.db"
+    GOOGLE_BOOKS_CACHE_MAX_ENTRIES: int = 5_000
+    GOOGLE_BOOKS_CACHE_DISK_MAX_BYTES: int = 256 * 2**20
+    GOOGLE_BOOKS_CACHE_SEARCH_TTL_SECONDS: float = 24 * 3600.0
+    GOOGLE_BOOKS_CACHE_VOLUME_TTL_SECONDS: float = 7 * 24 * 3600.0
+    GOOGLE_BOOKS_CACHE_STALE_SECONDS: float = 7 * 24 * 3600.0
+    GOOGLE_BOOKS_CACHE_NEGATIVE_TTL_SECONDS: float = 3600.0
+    # Batch import from Google Books: max ids per request, and volume detail
+    # lookups in flight at once
+    GOOGLE_BOOKS_IMPORT_MAX_ITEMS: int = 1000
+    GOOGLE_BOOKS_IMPORT_CONCURRENCY: int = 16
+    # Enrichment: books per fanned-out subtask and retries of a subtask's
+    # failed books; then per subtask, books committed per chunk, lookups in
+    # flight at once, age after which enriched books are looked up again, and
+    # run time after which no new chunk is started (under the soft time limit)
+    GOOGLE_BOOKS_ENRICHMENT_RANGE_SIZE: int = 5000
+    GOOGLE_BOOKS_ENRICHMENT_CHUNK_MAX_RETRIES: int = 3
+    GOOGLE_BOOKS_ENRICHMENT_CHUNK_SIZE: int = 500
+    GOOGLE_BOOKS_ENRICHMENT_CONCURRENCY: int = 16
+    GOOGLE_BOOKS_ENRICHMENT_STALE_DAYS: int = 30
+    GOOGLE_BOOKS_ENRICHMENT_TIME_BUDGET_SECONDS: float = 200.0
 
     class Config:
         env_file = ".env"
@@ -0,0 +1,25 @@
+import base64
+import json
+from typing import Any, Tuple
+
+
+def encode_cursor(sort: str, key: Any, id: int) -> str:
+    """Encode the last row of a page as an opaque keyset cursor"""
+    payload = json.dumps({"s": sort, "k": key, "id": id}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: str) -> Tuple[Any, int]:
+    """
+    Decode a cursor produced by encode_cursor into its (sort_key, id) pair.
+    Raises ValueError if the cursor is malformed or was issued for a different sort order.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        cursor_sort, key, id = payload["s"], payload["k"], int(payload["id"])
+    except (ValueError, KeyError, TypeError) as e:
+        raise ValueError("Invalid cursor") from e
+    if cursor_sort != sort:
+        raise ValueError(f"Cursor was issued for sort '{cursor_sort}', not '{sort}'")
+    return key, id
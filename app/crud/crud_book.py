@@ -1,29 +1,334 @@
-from sqlalchemy import select
+import re
+from sqlalchemy import Row, Select, Subquery, bindparam, select, update, func, case, tuple_, literal, literal_column, table, column
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import selectinload
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List, Optional
+from typing import Any, AsyncIterator, Dict, List, Optional, Set, Tuple
 
 from .base import CRUDBase
-from app.db.models import Book
+from .crud_statistics import count_book, count_reviews, new_deltas, statistics as statistics_crud
+from app.core.config import settings
+from app.db.models import Book, Review
 from app.schemas.book import BookCreate
 
+def rating_aggregates_backfill_stmt():
+    """UPDATE statement re-deriving every book's rating aggregates from the review table"""
+    rating_sum = (
+        select(func.coalesce(func.sum(Review.rating), 0))
+        .where(Review.book_id == Book.id)
+        .scalar_subquery()
+    )
+    rating_count = (
+        select(func.count(Review.id))
+        .where(Review.book_id == Book.id)
+        .scalar_subquery()
+    )
+    average_rating = (
+        select(func.avg(Review.rating))
+        .where(Review.book_id == Book.id)
+        .scalar_subquery()
+    )
+    return (
+        update(Book)
+        .values(
+            rating_sum=rating_sum,
+            rating_count=rating_count,
+            average_rating=average_rating,
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+# Sort orders supported by keyset pagination: id ascending, title ascending,
+# rating descending and search relevance (best first), each with id as the tie-breaker
+BOOK_SORTS = ("id", "title", "rating", "relevance")
+
 class CRUDBook(CRUDBase[Book, BookCreate, None]):
-    async def get_multi_with_reviews(
-        self, 
-        db: AsyncSession, 
-        *, 
-        skip: int = 0, 
+    async def create(self, db: AsyncSession, *, obj_in: BookCreate) -> Book:
+        """Insert a book and count it in its genre's statistics, then commit"""
+        db_obj = self.model(**obj_in.model_dump())
+        db.add(db_obj)
+        # Raises on a duplicate before anything is counted
+        await db.flush()
+        deltas = new_deltas()
+        count_book(deltas, db_obj.genre, google_books_id=db_obj.google_books_id)
+        await statistics_crud.apply_deltas(db, deltas)
+        await db.commit()
+        await db.refresh(db_obj)
+        return db_obj
+
+    def search_matches(self, search: str) -> Optional[Subquery]:
+        """
+        Full-text match subquery of (book_id, rank) for a search string, where a
+        lower rank is a better match. All words must match; the last one is
+        matched as a prefix so partially typed searches still hit.
+        Uses the book_fts FTS5 table on SQLite and book.search_vector on Postgres.
+        Returns None when the search contains no indexable words.
+        """
+        terms = re.findall(r"\w+", search.lower())
+        if not terms:
+            return None
+        if settings.DB_TYPE == "postgres":
+            tsquery = func.to_tsquery("simple", " & ".join(terms[:-1] + [f"{terms[-1]}:*"]))
+            search_vector = literal_column("book.search_vector")
+            return (
+                select(
+                    self.model.id.label("book_id"),
+                    (-func.ts_rank_cd(search_vector, tsquery)).label("rank"),
+                )
+                .where(search_vector.op("@@")(tsquery))
+                .subquery()
+            )
+        book_fts = table("book_fts", column("rowid"))
+        return (
+            select(
+                book_fts.c.rowid.label("book_id"),
+                # Title hits weigh more than author hits
+                func.bm25(literal_column("book_fts"), 10.0, 5.0).label("rank"),
+            )
+            .where(literal_column("book_fts").op("MATCH")(
+                " ".join([f'"{term}"' for term in terms[:-1]] + [f'"{terms[-1]}"*'])
+            ))
+            .subquery()
+        )
+
+    def _filtered_page(
+        self,
+        query: Select,
+        *,
+        sort: str,
+        skip: int,
+        limit: int,
+        search: Optional[str],
+        after: Optional[Tuple[Any, int]],
+        candidate_ids: Optional[List[int]] = None,
+        recheck: bool = True
+    ) -> Select:
+        """
+        Apply search, ordering and pagination to a book query, adding the
+        sort key as a trailing `sort_key` column.
+        `candidate_ids` (from the in-process search index) replaces the database
+        search; with `recheck` every search word must still appear in the row.
+        With `after` (a decoded cursor) the page starts strictly after that
+        (sort_key, id) pair using a row-value comparison that the (sort_key, id)
+        indexes can seek to; otherwise `skip` falls back to legacy OFFSET paging.
+        """
+        matches = None
+        if candidate_ids is not None:
+            query = query.filter(self.model.id.in_(candidate_ids))
+            if search and recheck:
+                for word in re.findall(r"\w+", search):
+                    query = query.filter(
+                        (self.model.title.ilike(f"%{word}%")) |
+                        (self.model.author.ilike(f"%{word}%")) |
+                        (self.model.genre.ilike(f"%{word}%"))
+                    )
+        elif search:
+            if settings.BOOK_SEARCH_BACKEND == "fts":
+                matches = self.search_matches(search)
+            if matches is not None:
+                query = query.join(matches, matches.c.book_id == self.model.id)
+            else:
+                query = query.filter(
+                    (self.model.title.ilike(f"%{search}%")) |
+                    (self.model.author.ilike(f"%{search}%"))
+                )
+
+        if sort == "relevance" and matches is not None:
+            key = matches.c.rank
+        elif sort == "title":
+            key = self.model.title
+        elif sort == "rating":
+            # Unrated books sort as 0 so the key is never NULL
+            key = func.coalesce(self.model.average_rating, literal_column("0.0"))
+        else:
+            # Relevance without a full-text match degrades to id order
+            sort, key = "id", self.model.id
+        descending = sort == "rating"
+        query = query.add_columns(key.label("sort_key"))
+
+        if after is not None:
+            after_key, after_id = after
+            if sort == "id":
+                query = query.filter(self.model.id > after_id)
+            # The redundant single-column bound lets SQLite seek the expression index
+            elif descending:
+                query = query.filter(
+                    key <= after_key,
+                    tuple_(key, self.model.id) < tuple_(after_key, after_id)
+                )
+            else:
+                query = query.filter(
+                    key >= after_key,
+                    tuple_(key, self.model.id) > tuple_(after_key, after_id)
+                )
+        elif skip:
+            query = query.offset(skip)
+        if sort == "id":
+            query = query.order_by(self.model.id)
+        elif descending:
+            query = query.order_by(key.desc(), self.model.id.desc())
+        else:
+            query = query.order_by(key, self.model.id)
+        return query.limit(limit)
+
+    async def get_multi_with_ratings(
+        self,
+        db: AsyncSession,
+        *,
+        skip: int = 0,
         limit: int = 100,
-        search: Optional[str] = None
-    ) -> List[Book]:
-        query = select(self.model).options(selectinload(self.model.reviews)).offset(skip).limit(limit).order_by(self.model.id)
-        if search:
-            query = query.filter(
-                (self.model.title.ilike(f"%{search}%")) |
-                (self.model.author.ilike(f"%{search}%"))
+        search: Optional[str] = None,
+        sort: str = "id",
+        after: Optional[Tuple[Any, int]] = None,
+        candidate_ids: Optional[List[int]] = None,
+        recheck: bool = True
+    ) -> List[Row]:
+        """
+        List books using the denormalized rating columns, without touching the review table.
+        Returns (Book, sort_key) rows.
+        """
+        query = self._filtered_page(
+            select(self.model), sort=sort, skip=skip, limit=limit, search=search, after=after,
+            candidate_ids=candidate_ids, recheck=recheck
+        )
+        result = await db.execute(query)
+        return result.all()
+
+    async def get_multi_with_rating_stats(
+        self,
+        db: AsyncSession,
+        *,
+        skip: int = 0,
+        limit: int = 100,
+        search: Optional[str] = None,
+        sort: str = "id",
+        after: Optional[Tuple[Any, int]] = None,
+        candidate_ids: Optional[List[int]] = None,
+        recheck: bool = True
+    ) -> List[Dict[str, Any]]:
+        """
+        List books with AVG/COUNT of their ratings computed in the database.
+        The grouped review subquery is restricted to the ids on the requested page,
+        and only plain column rows are returned (no ORM objects).
+        """
+        page = self._filtered_page(
+            select(self.model.id),
+            sort=sort, skip=skip, limit=limit, search=search, after=after,
+            candidate_ids=candidate_ids, recheck=recheck
+        ).subquery()
+
+        stats = (
+            select(
+                Review.book_id,
+                func.avg(Review.rating).label("average_rating"),
+                func.count(Review.id).label("review_count"),
             )
+            .where(Review.book_id.in_(select(page.c.id)))
+            .group_by(Review.book_id)
+            .subquery()
+        )
+
+        query = (
+            select(
+                self.model.id,
+                self.model.title,
+                self.model.author,
+                self.model.genre,
+                self.model.google_books_id,
+                stats.c.average_rating,
+                func.coalesce(stats.c.review_count, 0).label("review_count"),
+                page.c.sort_key,
+            )
+            .join(page, page.c.id == self.model.id)
+            .outerjoin(stats, stats.c.book_id == self.model.id)
+        )
+        if sort == "rating":
+            query = query.order_by(page.c.sort_key.desc(), self.model.id.desc())
+        else:
+            query = query.order_by(page.c.sort_key, self.model.id)
         result = await db.execute(query)
-        return result.scalars().unique().all()
+        return result.mappings().all()
+
+    async def get_page_versions(
+        self,
+        db: AsyncSession,
+        *,
+        skip: int = 0,
+        limit: int = 100,
+        search: Optional[str] = None,
+        sort: str = "id",
+        after: Optional[Tuple[Any, int]] = None,
+        candidate_ids: Optional[List[int]] = None,
+        recheck: bool = True
+    ) -> List[Row]:
+        """
+        (id, version, updated_at) of the books on a listing page, in page order.
+        Selects the same rows as get_multi_with_ratings without loading them.
+        """
+        query = self._filtered_page(
+            select(self.model.id, self.model.version, self.model.updated_at),
+            sort=sort, skip=skip, limit=limit, search=search, after=after,
+            candidate_ids=candidate_ids, recheck=recheck
+        )
+        result = await db.execute(query)
+        return result.all()
+
+    async def get_version(self, db: AsyncSession, id: int) -> Optional[Row]:
+        """(version, updated_at) of a book, or None if it does not exist"""
+        result = await db.execute(
+            select(self.model.version, self.model.updated_at).where(self.model.id == id)
+        )
+        return result.first()
+
+    async def stream_export(
+        self,
+        db: AsyncSession,
+        *,
+        with_stats: bool = False,
+        batch_size: int = 1000
+    ) -> AsyncIterator[List[Row]]:
+        """
+        Yield every book as plain rows in id order, `batch_size` at a time, from
+        a server-side cursor. With `with_stats`, rows carry average_rating and
+        review_count (live aggregates when BOOK_RATING_SOURCE=aggregate).
+        """
+        columns = [
+            self.model.id,
+            self.model.title,
+            self.model.author,
+            self.model.genre,
+            self.model.google_books_id,
+            self.model.isbn,
+            self.model.page_count,
+            self.model.description,
+            self.model.thumbnail_url,
+        ]
+        query = select(*columns)
+        if with_stats and settings.BOOK_RATING_SOURCE == "aggregate":
+            stats = (
+                select(
+                    Review.book_id,
+                    func.avg(Review.rating).label("average_rating"),
+                    func.count(Review.id).label("review_count"),
+                )
+                .group_by(Review.book_id)
+                .subquery()
+            )
+            query = query.add_columns(
+                stats.c.average_rating,
+                func.coalesce(stats.c.review_count, 0).label("review_count"),
+            ).outerjoin(stats, stats.c.book_id == self.model.id)
+        elif with_stats:
+            query = query.add_columns(
+                self.model.average_rating,
+                self.model.rating_count.label("review_count"),
+            )
+        result = await db.stream(
+            query.order_by(self.model.id).execution_options(yield_per=batch_size)
+        )
+        async for partition in result.partitions():
+            yield partition
 
     async def get_with_reviews(self, db: AsyncSession, id: int) -> Optional[Book]:
         query = select(self.model).options(selectinload(self.model.reviews)).where(self.model.id == id)
@@ -36,4 +341,159 @@ class CRUDBook(CRUDBase[Book, BookCreate, None]):
         )
         return result.scalars().first()
 
-book = CRUDBook(Book)
\ No newline at end of file
+    async def apply_rating_delta(
+        self,
+        db: AsyncSession,
+        *,
+        book_id: int,
+        sum_delta: Any,
+        count_delta: Any
+    ) -> bool:
+        """
+        Adjust a book's rating aggregates, and the review counters of its genre,
+        in the current transaction. The deltas may be SQL expressions.
+        Returns False if the book does not exist.
+        Does not commit: the caller commits together with the review write.
+        """
+        new_sum = self.model.rating_sum + sum_delta
+        new_count = self.model.rating_count + count_delta
+        if isinstance(count_delta, int):
+            count_delta = literal(count_delta)
+        result = await db.execute(
+            update(self.model)
+            .where(self.model.id == book_id)
+            .values(
+                rating_sum=new_sum,
+                rating_count=new_count,
+                average_rating=case(
+                    (new_count > 0, new_sum * 1.0 / new_count),
+                    else_=None,
+                ),
+            )
+            .returning(self.model.genre, self.model.rating_count, count_delta.label("count_delta"))
+        )
+        row = result.first()
+        if row is None:
+            return False
+        deltas = new_deltas()
+        count_reviews(deltas, row.genre, rating_count=row.rating_count, count_delta=row.count_delta)
+        await statistics_crud.apply_deltas(db, deltas)
+        return True
+
+    async def apply_review_rating(
+        self, db: AsyncSession, *, book_id: int, user_id: int, rating: int
+    ) -> bool:
+        """
+        Adjust a book's rating aggregates for a user's review being set to `rating`.
+        Run before the review upsert: the book row is locked first, so concurrent
+        review writes for the book apply one after the other, and the rating being
+        replaced is read afterwards, in its own statement, so that it includes
+        any review committed while waiting for the lock.
+        Returns False if the book does not exist. Does not commit.
+        """
+        if not await self.lock_existing_ids(db, [book_id]):
+            return False
+        previous = await db.scalar(
+            select(Review.rating).where(Review.book_id == book_id, Review.user_id == user_id)
+        )
+        return await self.apply_rating_delta(
+            db,
+            book_id=book_id,
+            sum_delta=rating - (previous or 0),
+            count_delta=0 if previous is not None else 1,
+        )
+
+    async def apply_rating_deltas(
+        self, db: AsyncSession, deltas: Dict[int, Tuple[int, int]]
+    ) -> None:
+        """
+        Adjust the rating aggregates of many books, given {book_id: (sum_delta,
+        count_delta)}, with one executemany UPDATE, and the review counters of
+        their genres. Does not commit.
+        """
+        if not deltas:
+            return
+        table = self.model.__table__
+        new_sum = table.c.rating_sum + bindparam("sum_delta")
+        new_count = table.c.rating_count + bindparam("count_delta")
+        await db.execute(
+            update(table)
+            .where(table.c.id == bindparam("target_id"))
+            .values(
+                rating_sum=new_sum,
+                rating_count=new_count,
+                average_rating=case(
+                    (new_count > 0, new_sum * 1.0 / new_count),
+                    else_=None,
+                ),
+            ),
+            [
+                {"target_id": book_id, "sum_delta": sum_delta, "count_delta": count_delta}
+                for book_id, (sum_delta, count_delta) in deltas.items()
+            ]
+        )
+        # The rows are locked by the UPDATE until the caller commits
+        books = await db.execute(
+            select(self.model.id, self.model.genre, self.model.rating_count)
+            .where(self.model.id.in_(list(deltas)))
+        )
+        counter_deltas = new_deltas()
+        for book in books:
+            count_reviews(
+                counter_deltas, book.genre, rating_count=book.rating_count, count_delta=deltas[book.id][1]
+            )
+        await statistics_crud.apply_deltas(db, counter_deltas)
+
+    async def get_by_ids(self, db: AsyncSession, ids: List[int]) -> Dict[int, Book]:
+        """Existing books among `ids`, keyed by id"""
+        result = await db.execute(select(self.model).where(self.model.id.in_(ids)))
+        return {book.id: book for book in result.scalars().all()}
+
+    async def lock_existing_ids(self, db: AsyncSession, ids: List[int]) -> Set[int]:
+        """
+        The subset of `ids` that belong to existing books, whose rows stay locked
+        (SELECT ... FOR UPDATE, in id order) until the transaction ends
+        """
+        result = await db.execute(
+            select(self.model.id)
+            .where(self.model.id.in_(ids))
+            .order_by(self.model.id)
+            .with_for_update()
+        )
+        return set(result.scalars().all())
+
+    async def get_existing_google_books_ids(
+        self, db: AsyncSession, google_books_ids: List[str]
+    ) -> Set[str]:
+        """The subset of `google_books_ids` already imported"""
+        result = await db.execute(
+            select(self.model.google_books_id).where(
+                self.model.google_books_id.in_(google_books_ids)
+            )
+        )
+        return set(result.scalars().all())
+
+    async def create_many_from_google(
+        self, db: AsyncSession, *, rows: List[Dict[str, Any]]
+    ) -> List[Book]:
+        """
+        Insert books with one multi-row INSERT ... ON CONFLICT DO NOTHING
+        RETURNING and commit. Books imported concurrently by another request, or
+        with the title and author of a book already in the catalog, are skipped
+        and missing from the result.
+        """
+        if not rows:
+            return []
+        insert = pg_insert if settings.DB_TYPE == "postgres" else sqlite_insert
+        # No conflict target: either unique index, google_books_id or the
+        # normalized (title, author), skips the row
+        stmt = insert(self.model).on_conflict_do_nothing().returning(self.model)
+        books = list((await db.scalars(stmt, rows)).all())
+        deltas = new_deltas()
+        for book in books:
+            count_book(deltas, book.genre, google_books_id=book.google_books_id)
+        await statistics_crud.apply_deltas(db, deltas)
+        await db.commit()
+        return books
+
+book = CRUDBook(Book)
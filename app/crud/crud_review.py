@@ -1,9 +1,13 @@
 # app/crud/crud_review.py
-from sqlalchemy import select
+from datetime import datetime
+from sqlalchemy import Row, Select, delete, func, select, tuple_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import Optional, Dict, Any
+from typing import AsyncIterator, List, Optional, Dict, Any, Tuple
 
 from .base import CRUDBase
+from app.core.config import settings
 from app.db.models import Review
 from app.schemas.review import ReviewCreate
 
@@ -17,6 +21,75 @@ class CRUDReview(CRUDBase[Review, ReviewCreate, ReviewCreate]):
         await db.refresh(db_obj)
         return db_obj
 
+    def _upsert_stmt(self, updated_fields: List[str]):
+        """
+        INSERT ... ON CONFLICT (book_id, user_id) DO UPDATE ... RETURNING, without
+        values: executed with a list of parameter sets, SQLAlchemy batches the rows
+        into multi-row VALUES while the compiled statement stays cached
+        """
+        table = self.model.__table__
+        insert = pg_insert if settings.DB_TYPE == "postgres" else sqlite_insert
+        stmt = insert(table)
+        return stmt.on_conflict_do_update(
+            index_elements=[table.c.book_id, table.c.user_id],
+            set_={**{field: stmt.excluded[field] for field in updated_fields}, "updated_at": func.now()},
+        ).returning(
+            table.c.id,
+            table.c.rating,
+            table.c.review_text,
+            table.c.book_id,
+            table.c.user_id,
+            table.c.created_at,
+        )
+
+    async def upsert(
+        self, db: AsyncSession, *, obj_in: ReviewCreate, book_id: int, user_id: int
+    ) -> Row:
+        """
+        Create or replace a user's review of a book with a single
+        INSERT ... ON CONFLICT (book_id, user_id) DO UPDATE ... RETURNING,
+        then commit. Concurrent posts by the same user resolve to one review.
+        """
+        # Like update(), fields the client did not send keep their stored values
+        stmt = self._upsert_stmt(list(obj_in.model_dump(exclude_unset=True)))
+        result = await db.execute(
+            stmt, {**obj_in.model_dump(), "book_id": book_id, "user_id": user_id}
+        )
+        row = result.one()
+        await db.commit()
+        return row
+
+    async def upsert_many(
+        self, db: AsyncSession, *, user_id: int, items: List[Dict[str, Any]]
+    ) -> List[Row]:
+        """
+        Create or replace a user's reviews of several books with one multi-row
+        INSERT ... ON CONFLICT DO UPDATE ... RETURNING. `items` hold book_id,
+        rating and review_text, with each book at most once. Does not commit.
+        """
+        result = await db.execute(
+            self._upsert_stmt(["rating", "review_text"]),
+            [{**item, "user_id": user_id} for item in items]
+        )
+        return result.all()
+
+    async def get_ratings_by_user(
+        self, db: AsyncSession, *, user_id: int, book_ids: List[int]
+    ) -> Dict[int, int]:
+        """Ratings of a user's existing reviews of the given books, keyed by book id"""
+        result = await db.execute(
+            select(self.model.book_id, self.model.rating).where(
+                self.model.user_id == user_id,
+                self.model.book_id.in_(book_ids)
+            )
+        )
+        return dict(result.all())
+
+    async def get_book_ids_by_user(self, db: AsyncSession, *, user_id: int) -> List[int]:
+        """Ids of the books a user has reviewed"""
+        result = await db.execute(select(self.model.book_id).where(self.model.user_id == user_id))
+        return list(result.scalars().all())
+
     async def get_by_book_and_user(
         self, db: AsyncSession, *, book_id: int, user_id: int
     ) -> Optional[Review]:
@@ -28,6 +101,21 @@ class CRUDReview(CRUDBase[Review, ReviewCreate, ReviewCreate]):
         )
         return result.scalars().first()
 
+    async def delete_by_book_and_user(
+        self, db: AsyncSession, *, book_id: int, user_id: int
+    ) -> Optional[int]:
+        """
+        Delete a user's review of a book with DELETE ... RETURNING rating.
+        Returns the deleted review's rating, or None if there was none (also when
+        a concurrent delete removed it first). Does not commit.
+        """
+        result = await db.execute(
+            delete(self.model)
+            .where(self.model.book_id == book_id, self.model.user_id == user_id)
+            .returning(self.model.rating)
+        )
+        return result.scalar_one_or_none()
+
     async def get_reviews_by_book(
         self, db: AsyncSession, *, book_id: int
     ) -> list[Review]:
@@ -36,6 +124,95 @@ class CRUDReview(CRUDBase[Review, ReviewCreate, ReviewCreate]):
         )
         return result.scalars().all()
 
+    def _book_reviews_query(
+        self, *, book_id: int, after: Optional[Tuple[datetime, int]]
+    ) -> Select:
+        """
+        Plain-column query for a book's reviews in (created_at, id) order,
+        starting strictly after the `after` pair when given
+        """
+        query = select(
+            self.model.id,
+            self.model.rating,
+            self.model.review_text,
+            self.model.book_id,
+            self.model.user_id,
+            self.model.created_at,
+        ).where(self.model.book_id == book_id)
+        if after is not None:
+            after_created_at, after_id = after
+            # The redundant single-column bound lets SQLite seek the
+            # (book_id, created_at, id) index
+            query = query.where(
+                self.model.created_at >= after_created_at,
+                tuple_(self.model.created_at, self.model.id) > tuple_(
+                    after_created_at, after_id,
+                    types=(self.model.created_at.type, self.model.id.type)
+                )
+            )
+        return query.order_by(self.model.created_at, self.model.id)
+
+    async def get_page_by_book(
+        self,
+        db: AsyncSession,
+        *,
+        book_id: int,
+        limit: int,
+        after: Optional[Tuple[datetime, int]] = None
+    ) -> List[Row]:
+        """One keyset page of a book's reviews as plain rows"""
+        result = await db.execute(
+            self._book_reviews_query(book_id=book_id, after=after).limit(limit)
+        )
+        return result.all()
+
+    async def stream_by_book(
+        self,
+        db: AsyncSession,
+        *,
+        book_id: int,
+        after: Optional[Tuple[datetime, int]] = None,
+        batch_size: int = 1000
+    ) -> AsyncIterator[List[Row]]:
+        """
+        Yield all of a book's reviews in batches from a server-side cursor,
+        so memory stays bounded by `batch_size` rows
+        """
+        result = await db.stream(
+            self._book_reviews_query(book_id=book_id, after=after)
+            .execution_options(yield_per=batch_size)
+        )
+        async for partition in result.partitions():
+            yield partition
+
+    async def get_for_book_range(
+        self, db: AsyncSession, *, first_book_id: int, last_book_id: int
+    ) -> List[Row]:
+        """Reviews of the books with ids in [first_book_id, last_book_id], ordered by (book_id, id)"""
+        result = await db.execute(
+            select(
+                self.model.id,
+                self.model.book_id,
+                self.model.user_id,
+                self.model.rating,
+                self.model.review_text,
+                self.model.created_at,
+            )
+            .where(self.model.book_id.between(first_book_id, last_book_id))
+            .order_by(self.model.book_id, self.model.id)
+        )
+        return result.all()
+
+    async def get_rating_stats(self, db: AsyncSession, *, book_id: int) -> Row:
+        """AVG and COUNT of a book's ratings computed in the database"""
+        result = await db.execute(
+            select(
+                func.avg(self.model.rating).label("average_rating"),
+                func.count(self.model.id).label("review_count"),
+            ).where(self.model.book_id == book_id)
+        )
+        return result.one()
+
     async def update_review(
         self, 
         db: AsyncSession, 
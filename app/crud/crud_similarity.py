@@ -0,0 +1,23 @@
+from sqlalchemy import Row, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List
+
+from .base import CRUDBase
+from app.db.models import Book, BookSimilarity
+
+class CRUDBookSimilarity(CRUDBase[BookSimilarity, None, None]):
+    async def get_neighbors(self, db: AsyncSession, *, book_id: int, limit: int) -> List[Row]:
+        """
+        (Book, score) rows of the precomputed neighbors of a book, most similar
+        first: a range scan of the (book_id, rank) primary key
+        """
+        result = await db.execute(
+            select(Book, self.model.score)
+            .join(Book, Book.id == self.model.similar_book_id)
+            .where(self.model.book_id == book_id)
+            .order_by(self.model.rank)
+            .limit(limit)
+        )
+        return result.all()
+
+book_similarity = CRUDBookSimilarity(BookSimilarity)
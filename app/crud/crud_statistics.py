@@ -0,0 +1,111 @@
+from collections import Counter, defaultdict
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from typing import Any, DefaultDict, Dict, Iterable, List, Optional, Union
+
+from .base import CRUDBase
+from app.core.config import settings
+from app.db.models import BookRatingStatistics, BookStatistics, GenreStatistics
+
+COUNTERS = ("books", "books_with_reviews", "books_with_google_id", "reviews")
+
+# {genre: {counter: delta}}, collected by a write and applied in its transaction
+StatisticsDeltas = DefaultDict[str, Counter]
+
+def new_deltas() -> StatisticsDeltas:
+    return defaultdict(Counter)
+
+def count_book(
+    deltas: StatisticsDeltas,
+    genre: str,
+    *,
+    google_books_id: Optional[str],
+    rating_count: int = 0,
+    sign: int = 1
+) -> None:
+    """Count a book into its genre's counters, or out of them with sign=-1"""
+    counts = deltas[genre]
+    counts["books"] += sign
+    counts["books_with_google_id"] += sign * (google_books_id is not None)
+    counts["books_with_reviews"] += sign * (rating_count > 0)
+    counts["reviews"] += sign * rating_count
+
+def count_reviews(
+    deltas: StatisticsDeltas, genre: str, *, rating_count: int, count_delta: int
+) -> None:
+    """Count `count_delta` reviews added to a book now having `rating_count` reviews"""
+    counts = deltas[genre]
+    counts["reviews"] += count_delta
+    counts["books_with_reviews"] += (rating_count > 0) - (rating_count - count_delta > 0)
+
+def counter_deltas_stmt():
+    """
+    INSERT ... ON CONFLICT (genre) DO UPDATE adding deltas to a genre's
+    counters, creating its row the first time; executed with counter_params()
+    """
+    table = GenreStatistics.__table__
+    insert = pg_insert if settings.DB_TYPE == "postgres" else sqlite_insert
+    stmt = insert(table)
+    return stmt.on_conflict_do_update(
+        index_elements=[table.c.genre],
+        set_={counter: table.c[counter] + stmt.excluded[counter] for counter in COUNTERS},
+    )
+
+def counter_params(deltas: StatisticsDeltas) -> List[Dict[str, Any]]:
+    # In genre order, so that concurrent writes lock counter rows in the same order
+    return [
+        {"genre": genre, **{counter: counts[counter] for counter in COUNTERS}}
+        for genre, counts in sorted(deltas.items())
+        if any(counts.values())
+    ]
+
+def apply_deltas_sync(db: Union[Session, Connection], deltas: StatisticsDeltas) -> None:
+    """Apply counter deltas in the current transaction of a sync session or connection"""
+    params = counter_params(deltas)
+    if params:
+        db.execute(counter_deltas_stmt(), params)
+
+def summarize_genres(rows: Iterable[Any]) -> Dict[str, Any]:
+    """Catalog statistics from per-genre counts (rows with the COUNTERS as attributes)"""
+    rows = [row for row in rows if row.books > 0]
+    summary = {counter: sum(getattr(row, counter) for row in rows) for counter in COUNTERS}
+    return {
+        "total_books": summary["books"],
+        "total_reviews": summary["reviews"],
+        "books_with_reviews": summary["books_with_reviews"],
+        "books_with_google_id": summary["books_with_google_id"],
+        "genre_distribution": {
+            row.genre: row.books for row in sorted(rows, key=lambda row: row.books, reverse=True)
+        },
+    }
+
+class CRUDStatistics(CRUDBase[GenreStatistics, None, None]):
+    async def apply_deltas(self, db: AsyncSession, deltas: StatisticsDeltas) -> None:
+        """Apply counter deltas in the current transaction. Does not commit."""
+        params = counter_params(deltas)
+        if params:
+            await db.execute(counter_deltas_stmt(), params)
+
+    async def get_current(self, db: AsyncSession) -> Dict[str, Any]:
+        """Current catalog statistics: one read of the (one row per genre) counters"""
+        result = await db.execute(select(self.model))
+        return summarize_genres(result.scalars().all())
+
+    async def get_latest_rating_analytics(self, db: AsyncSession) -> Optional[BookStatistics]:
+        """Latest book_statistics snapshot with rating analytics"""
+        result = await db.execute(
+            select(BookStatistics)
+            .where(BookStatistics.rating_analytics.isnot(None))
+            .order_by(BookStatistics.id.desc())
+            .limit(1)
+        )
+        return result.scalars().first()
+
+    async def get_book_ratings(self, db: AsyncSession, book_id: int) -> Optional[BookRatingStatistics]:
+        return await db.get(BookRatingStatistics, book_id)
+
+statistics = CRUDStatistics(GenreStatistics)
@@ -1,8 +1,18 @@
-from sqlalchemy import Column, Integer, String, Float, ForeignKey, Text, DateTime
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, Text, DateTime, Index, JSON, literal_column
+from sqlalchemy.dialects import sqlite
 from sqlalchemy.orm import relationship  # Add this import
 from sqlalchemy.sql import func
 from app.db.base_class import Base
 
+# SQLite stores func.now() as 'YYYY-MM-DD HH:MM:SS'; bind Python datetimes in the
+# same format so comparisons against stored values (e.g. keyset cursors) line up
+Timestamp = DateTime(timezone=True).with_variant(
+    sqlite.DATETIME(
+        storage_format="%(year)04d-%(month)02d-%(day)02d %(hour)02d:%(minute)02d:%(second)02d"
+    ),
+    "sqlite",
+)
+
 class Book(Base):
     __tablename__ = "book"
     id = Column(Integer, primary_key=True, index=True)
@@ -14,16 +24,105 @@ class Book(Base):
     description = Column(Text, nullable=True)
     page_count = Column(Integer, nullable=True)
     thumbnail_url = Column(String(500), nullable=True)
+    # Denormalized rating aggregates, maintained by the review write paths
+    rating_sum = Column(Integer, nullable=False, default=0, server_default="0")
+    rating_count = Column(Integer, nullable=False, default=0, server_default="0")
+    average_rating = Column(Float, nullable=True)
+    updated_at = Column(Timestamp, default=func.now(), onupdate=func.now(), index=True)
+    # Last Google Books enrichment attempt, matched or not; see app/tasks/enrichment.py
+    enriched_at = Column(Timestamp, nullable=True)
+    # Incremented by every UPDATE of the row, including the rating aggregate
+    # updates made by review writes; versions the book's API representations
+    version = Column(
+        Integer, nullable=False, default=0, server_default="0",
+        onupdate=literal_column("version") + 1
+    )
     reviews = relationship("Review", back_populates="book", cascade="all, delete-orphan")
 
+    # Composite indexes backing keyset pagination on (sort_key, id)
+    __table_args__ = (
+        Index("ix_book_title_id", title, id),
+        Index("ix_book_rating_sort", func.coalesce(average_rating, literal_column("0.0")), id),
+        # One book per normalized (title, author); the seed refresh merges on it
+        Index("uq_book_title_author", func.lower(func.trim(title)), func.lower(func.trim(author)), unique=True),
+    )
+
 class Review(Base):
     __tablename__ = "review"
     id = Column(Integer, primary_key=True, index=True)
     rating = Column(Integer, nullable=False)
     review_text = Column(Text, nullable=True)
-    book_id = Column(Integer, ForeignKey("book.id"), nullable=False)
+    book_id = Column(Integer, ForeignKey("book.id"), index=True, nullable=False)
     user_id = Column(Integer, index=True, nullable=False)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    created_at = Column(Timestamp, server_default=func.now())
+    updated_at = Column(Timestamp, onupdate=func.now())
     
-    book = relationship("Book", back_populates="reviews")
\ No newline at end of file
+    book = relationship("Book", back_populates="reviews")
+
+    __table_args__ = (
+        # One review per user and book; also the conflict target of the review upsert
+        Index("uq_review_book_id_user_id", book_id, user_id, unique=True),
+        # Backs keyset pagination of a book's reviews in (created_at, id) order
+        Index("ix_review_book_id_created_at", book_id, created_at, id),
+    )
+
+class BookStatistics(Base):
+    """Catalog statistics recomputed by calculate_book_statistics, one row per run"""
+    __tablename__ = "book_statistics"
+    id = Column(Integer, primary_key=True)
+    computed_at = Column(Timestamp, nullable=False, server_default=func.now())
+    total_books = Column(Integer, nullable=False)
+    total_reviews = Column(Integer, nullable=False)
+    books_with_reviews = Column(Integer, nullable=False)
+    books_with_google_id = Column(Integer, nullable=False)
+    # {genre: number of books}
+    genre_distribution = Column(JSON, nullable=False)
+    # Time the computation took, to watch it as the catalog grows
+    duration_seconds = Column(Float, nullable=False)
+    # {genre: {counter: {"counted", "actual"}}}: drift of the maintained
+    # genre_statistics counters found (and corrected) by this computation
+    discrepancies = Column(JSON, nullable=True)
+    # Rating distributions (overall, per genre and per month) and the top books
+    # by Bayesian average, from app/tasks/analytics.py; NULL when not computed
+    rating_analytics = Column(JSON, nullable=True)
+
+class GenreStatistics(Base):
+    """
+    Counters of one genre, updated in the same transaction as every book and
+    review write; the statistics endpoint adds them up
+    """
+    __tablename__ = "genre_statistics"
+    genre = Column(String(100), primary_key=True)
+    books = Column(Integer, nullable=False, default=0, server_default="0")
+    books_with_reviews = Column(Integer, nullable=False, default=0, server_default="0")
+    books_with_google_id = Column(Integer, nullable=False, default=0, server_default="0")
+    reviews = Column(Integer, nullable=False, default=0, server_default="0")
+
+class BookRatingStatistics(Base):
+    """
+    Rating distribution of one reviewed book, replaced for every book by each
+    run of the rating analytics (app/tasks/analytics.py)
+    """
+    __tablename__ = "book_rating_statistics"
+    book_id = Column(Integer, ForeignKey("book.id", ondelete="CASCADE"), primary_key=True)
+    ratings = Column(Integer, nullable=False)
+    # Number of 1 to 5 star ratings
+    histogram = Column(JSON, nullable=False)
+    mean = Column(Float, nullable=False)
+    variance = Column(Float, nullable=False)
+    # {"p10", "p25", "p50", "p75", "p90"}: nearest-rank percentiles of the ratings
+    percentiles = Column(JSON, nullable=False)
+    # Mean shrunk towards the catalog mean, so that books with few ratings rank fairly
+    bayesian_average = Column(Float, nullable=False, index=True)
+
+class BookSimilarity(Base):
+    """
+    Nearest neighbors of a book by item-item similarity of their ratings,
+    replaced by each run of train_book_similarity (app/tasks/similarity.py)
+    """
+    __tablename__ = "book_similarity"
+    book_id = Column(Integer, ForeignKey("book.id", ondelete="CASCADE"), primary_key=True)
+    # 0 for the most similar book; the primary key keeps a book's neighbors in order
+    rank = Column(Integer, primary_key=True)
+    similar_book_id = Column(Integer, ForeignKey("book.id", ondelete="CASCADE"), nullable=False)
+    score = Column(Float, nullable=False)
@@ -8,6 +8,8 @@ from app.api.v1.api import api_router
 from app.core.config import settings
 from app.db.init_db import init_db
 from app.db.session import SessionLocal
+from app.services.google_books_service import google_books_service
+from app.services.search_index import book_search_index
 
 async def run_migrations():
     """Run database migrations with better error handling"""
@@ -57,11 +59,21 @@ async def lifespan(app: FastAPI):
         logger.info("Database initialized successfully.")
     except Exception as e:
         logger.error(f"Error initializing database: {e}")
+
+    if settings.BOOK_SEARCH_BACKEND == "trigram":
+        try:
+            async with SessionLocal() as db:
+                await book_search_index.build(db)
+        except Exception as e:
+            logger.error(f"Error building book search index: {e}")
+
+    await google_books_service.start()
     
     yield
     
     # On shutdown
     logger.info("Shutting down...")
+    await google_books_service.aclose()
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
@@ -14,10 +14,19 @@ class BookCreate(BookBase):
 class Book(BookBase):
     id: int
     average_rating: Optional[float] = Field(None, ge=1, le=5)
+    review_count: Optional[int] = Field(None, ge=0)
 
     model_config = ConfigDict(from_attributes=True)
 
 class BookWithReviews(Book):
     reviews: List[Review] = []
 
-    model_config = ConfigDict(from_attributes=True)
\ No newline at end of file
+    model_config = ConfigDict(from_attributes=True)
+class SimilarBook(Book):
+    # Cosine similarity of the two books' ratings, between 0 and 1
+    similarity: float
+
+class RecommendedBook(Book):
+    # Predicted interest of the user in the book; only comparable between
+    # recommendations made by the same model
+    score: float
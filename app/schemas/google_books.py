@@ -1,5 +1,7 @@
 from pydantic import BaseModel, Field
-from typing import List, Optional, Dict, Any
+from typing import List, Literal, Optional, Dict, Any
+
+from app.core.config import settings
 
 class GoogleBookSearchResult(BaseModel):
     google_books_id: str
@@ -21,4 +23,23 @@ class GoogleBookSearchResponse(BaseModel):
 
 class BookImportRequest(BaseModel):
     google_books_id: str
-    genre: str = Field(..., description="Genre to assign to the imported book")
\ No newline at end of file
+    genre: str = Field(..., description="Genre to assign to the imported book")
+
+class BookBatchImportRequest(BaseModel):
+    google_books_ids: List[str] = Field(
+        ..., min_length=1, max_length=settings.GOOGLE_BOOKS_IMPORT_MAX_ITEMS
+    )
+    genre: str = Field(..., description="Genre to assign to the imported books")
+
+class BookBatchImportItemResult(BaseModel):
+    google_books_id: str
+    status: Literal["imported", "exists", "duplicate", "not_found", "invalid", "unavailable"]
+    book_id: Optional[int] = None
+    detail: Optional[str] = None
+
+class BookBatchImportResult(BaseModel):
+    imported: int
+    existing: int
+    not_found: int
+    unavailable: int
+    items: List[BookBatchImportItemResult]
@@ -1,5 +1,8 @@
 from pydantic import BaseModel, Field, ConfigDict
-from typing import Optional
+
+from app.core.config import settings
+from datetime import datetime
+from typing import Any, Dict, List, Literal, Optional
 
 class ReviewBase(BaseModel):
     rating: int = Field(..., ge=1, le=5)
@@ -12,5 +15,31 @@ class Review(ReviewBase):
     id: int
     book_id: int
     user_id: int
+    created_at: Optional[datetime] = None
+
+    model_config = ConfigDict(from_attributes=True)
+
+class ReviewBatchItem(ReviewBase):
+    book_id: int
+
+class ReviewBatchCreate(BaseModel):
+    # Items are validated one by one by the service so that a bad item is
+    # reported in its result instead of rejecting the whole batch
+    items: List[Dict[str, Any]] = Field(
+        ...,
+        min_length=1,
+        max_length=settings.REVIEW_BATCH_MAX_ITEMS,
+        description="Objects of the form {book_id, rating, review_text}",
+    )
+
+class ReviewBatchItemResult(BaseModel):
+    index: int
+    status: Literal["created", "updated", "invalid", "not_found", "superseded", "failed"]
+    review_id: Optional[int] = None
+    detail: Optional[str] = None
 
-    model_config = ConfigDict(from_attributes=True)
\ No newline at end of file
+class ReviewBatchResult(BaseModel):
+    created: int
+    updated: int
+    failed: int
+    items: List[ReviewBatchItemResult]
@@ -0,0 +1,68 @@
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from pydantic import BaseModel, ConfigDict, computed_field
+
+class BookStatistics(BaseModel):
+    total_books: int
+    total_reviews: int
+    books_with_reviews: int
+    books_with_google_id: int
+    # Books per genre, most common first
+    genre_distribution: Dict[str, int]
+
+    model_config = ConfigDict(from_attributes=True)
+
+    @computed_field
+    @property
+    def books_without_reviews(self) -> int:
+        return self.total_books - self.books_with_reviews
+
+    @computed_field
+    @property
+    def books_without_google_id(self) -> int:
+        return self.total_books - self.books_with_google_id
+
+    @computed_field
+    @property
+    def average_reviews_per_book(self) -> float:
+        return round(self.total_reviews / self.total_books, 2) if self.total_books > 0 else 0
+
+class RatingDistribution(BaseModel):
+    ratings: int
+    # Number of 1 to 5 star ratings
+    histogram: List[int]
+    mean: float
+    variance: float
+    # {"p10", "p25", "p50", "p75", "p90"}: nearest-rank percentiles
+    percentiles: Dict[str, int]
+
+    model_config = ConfigDict(from_attributes=True)
+
+class GenreRatingDistribution(RatingDistribution):
+    books_rated: int
+
+class BookRatingStatistics(RatingDistribution):
+    book_id: int
+    bayesian_average: float
+
+class TopRatedBook(BaseModel):
+    book_id: int
+    ratings: int
+    mean: float
+    bayesian_average: float
+
+class RatingAnalytics(BaseModel):
+    computed_at: datetime
+    ratings: int
+    books_rated: int
+    # Bayesian averages are (prior_weight * prior_mean + sum) / (prior_weight + ratings)
+    prior_mean: float
+    prior_weight: float
+    overall: Optional[RatingDistribution]
+    genres: Dict[str, GenreRatingDistribution]
+    # Keyed by "YYYY-MM" of the review's creation
+    monthly: Dict[str, RatingDistribution]
+    # Best books by Bayesian average
+    top_books: List[TopRatedBook]
+    duration_seconds: float
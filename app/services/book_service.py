@@ -1,17 +1,81 @@
-from typing import List, Optional
+import asyncio
+import csv
+import hashlib
+import io
+import json
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, Iterable, Iterator, List, Mapping, NamedTuple, Optional, Tuple
+from pydantic import TypeAdapter, ValidationError
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.config import settings
+from app.core.pagination import decode_cursor, encode_cursor
 from app.crud.crud_book import book as book_crud
 from app.crud.crud_review import review as review_crud
-from app.schemas.book import Book, BookWithReviews
-from app.schemas.review import ReviewCreate, Review
+from app.crud.crud_statistics import statistics as statistics_crud
+from app.schemas.book import Book, BookCreate, BookWithReviews
+from app.schemas.google_books import BookBatchImportItemResult, BookBatchImportResult
+from app.schemas.review import (
+    ReviewBatchItem,
+    ReviewBatchItemResult,
+    ReviewBatchResult,
+    ReviewCreate,
+    Review,
+)
+from app.schemas.statistics import BookRatingStatistics, BookStatistics, RatingAnalytics
 from app.db.models import Book as BookModel
+from app.db.session import SessionLocal
+from app.services.google_books_service import GoogleBooksUnavailable, google_books_service
+from app.services.response_cache import (
+    CATALOG_TAG,
+    LISTING_TAG,
+    RATING_ORDER_TAG,
+    book_tag,
+    response_cache,
+)
+from app.services.search_index import SearchResult, book_search_index
+
+_book_list_adapter = TypeAdapter(List[Book])
+
+# Column order of catalog exports
+EXPORT_BOOK_FIELDS = (
+    "id", "title", "author", "genre", "google_books_id", "isbn",
+    "page_count", "description", "thumbnail_url",
+)
+# (CSV header, review field) of the review columns of CSV exports with reviews
+EXPORT_CSV_REVIEW_COLUMNS = (
+    ("review_id", "id"), ("rating", "rating"), ("review_text", "review_text"),
+    ("user_id", "user_id"), ("review_created_at", "created_at"),
+)
+
+class BookPageQuery(NamedTuple):
+    """What selects the books of a listing page, resolved once per request"""
+    sort: str
+    after: Optional[Tuple[Any, int]]
+    # Trigram index candidates, when the index answers the search
+    index_result: Optional[SearchResult]
+    candidate_kwargs: Dict[str, Any]
 
 class BookService:
     def _calculate_average_rating(self, book_model: BookModel) -> float | None:
-        if not book_model.reviews:
+        # Read from the denormalized aggregates so no review rows are needed
+        if not book_model.rating_count:
             return None
-        return round(sum(r.rating for r in book_model.reviews) / len(book_model.reviews), 2)
+        return round(book_model.rating_sum / book_model.rating_count, 2)
+
+    def _book_from_stats_row(self, row: Mapping[str, Any]) -> Book:
+        # AVG comes back as Decimal on Postgres and float on SQLite
+        avg_rating = row["average_rating"]
+        return Book(
+            id=row["id"],
+            title=row["title"],
+            author=row["author"],
+            genre=row["genre"],
+            google_books_id=row["google_books_id"],
+            average_rating=round(float(avg_rating), 2) if avg_rating is not None else None,
+            review_count=row["review_count"],
+        )
 
     async def get_books(
         self, 
@@ -19,14 +83,66 @@ class BookService:
         *, 
         skip: int, 
         limit: int, 
-        search: Optional[str]
+        search: Optional[str],
+        sort: Optional[str] = None,
+        cursor: Optional[str] = None
     ) -> List[Book]:
-        books_from_db = await book_crud.get_multi_with_reviews(
-            db, skip=skip, limit=limit, search=search
+        books, _ = await self.get_books_page(
+            db, skip=skip, limit=limit, search=search, sort=sort, cursor=cursor
         )
+        return books
+
+    async def get_books_page(
+        self,
+        db: AsyncSession,
+        *,
+        skip: int,
+        limit: int,
+        search: Optional[str],
+        sort: Optional[str] = None,
+        cursor: Optional[str] = None,
+        query: Optional[BookPageQuery] = None
+    ) -> Tuple[List[Book], Optional[str]]:
+        """
+        Return one page of books and the cursor for the next page (None on the last page).
+        When `cursor` is given `skip` is ignored. Raises ValueError for an invalid cursor.
+        Searches are ordered by relevance unless another sort is requested.
+        Pass `query` from resolve_books_page to reuse an already resolved page.
+        """
+        if query is None:
+            query = await self.resolve_books_page(db, skip=skip, search=search, sort=sort, cursor=cursor)
+        sort, after, index_result, candidate_kwargs = query
+
+        # Fetch one extra row to know whether another page exists
+        if settings.BOOK_RATING_SOURCE == "aggregate":
+            rows = await book_crud.get_multi_with_rating_stats(
+                db, skip=skip, limit=limit + 1, search=search, sort=sort, after=after,
+                **candidate_kwargs
+            )
+            next_cursor = None
+            if len(rows) > limit:
+                rows = rows[:limit]
+                next_cursor = encode_cursor(sort, rows[-1]["sort_key"], rows[-1]["id"])
+            elif index_result is not None and index_result.truncated:
+                next_cursor = encode_cursor(sort, index_result.ids[-1], index_result.ids[-1])
+            return [self._book_from_stats_row(row) for row in rows], next_cursor
+
+        rows = await book_crud.get_multi_with_ratings(
+            db, skip=skip, limit=limit + 1, search=search, sort=sort, after=after,
+            **candidate_kwargs
+        )
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            last_book, last_key = rows[-1]
+            next_cursor = encode_cursor(sort, last_key, last_book.id)
+        elif index_result is not None and index_result.truncated:
+            # The recheck rejected enough candidates to leave the page short;
+            # continue after the last candidate the index handed out
+            next_cursor = encode_cursor(sort, index_result.ids[-1], index_result.ids[-1])
         
         books_with_avg_rating = []
-        for book_model in books_from_db:
+        for book_model, _ in rows:
             avg_rating = self._calculate_average_rating(book_model)
             book_dict = {
                 "id": book_model.id,
@@ -34,11 +150,166 @@ class BookService:
                 "author": book_model.author,
                 "genre": book_model.genre,
                 "average_rating": avg_rating,
+                "review_count": book_model.rating_count,
                 "google_books_id": book_model.google_books_id
             }
             books_with_avg_rating.append(Book(**book_dict))
             
-        return books_with_avg_rating
+        return books_with_avg_rating, next_cursor
+
+    async def resolve_books_page(
+        self,
+        db: AsyncSession,
+        *,
+        skip: int,
+        search: Optional[str],
+        sort: Optional[str] = None,
+        cursor: Optional[str] = None
+    ) -> BookPageQuery:
+        """
+        Resolve the effective sort, the decoded cursor and, with the trigram
+        backend, the search candidates shared by the listing queries. Resolve
+        once per request and pass the result to get_books_page_etag and
+        get_books_page_json, so the index is synced and searched only once.
+        Raises ValueError for an invalid cursor.
+        """
+        sort = sort or ("relevance" if search else "id")
+        after = decode_cursor(cursor, sort) if cursor else None
+
+        index_result = None
+        candidate_kwargs = {}
+        if search and settings.BOOK_SEARCH_BACKEND == "trigram":
+            index_result = await self._search_index_candidates(
+                db, search=search, sort=sort, skip=skip, after=after
+            )
+            if index_result is not None:
+                candidate_kwargs = {"candidate_ids": index_result.ids, "recheck": index_result.exact}
+        return BookPageQuery(sort, after, index_result, candidate_kwargs)
+
+    async def get_books_page_etag(
+        self,
+        db: AsyncSession,
+        *,
+        skip: int,
+        limit: int,
+        search: Optional[str],
+        sort: Optional[str] = None,
+        cursor: Optional[str] = None,
+        query: Optional[BookPageQuery] = None
+    ) -> Tuple[str, Optional[datetime]]:
+        """
+        ETag and Last-Modified of a listing page, from the parameters that select
+        it and the (id, version) of the books on it and of the first book after
+        it. Runs one narrow query, without
+        rating aggregation or rendering. Raises ValueError for an invalid cursor.
+        """
+        if query is None:
+            query = await self.resolve_books_page(db, skip=skip, search=search, sort=sort, cursor=cursor)
+        sort, after, _, candidate_kwargs = query
+        rows = await book_crud.get_page_versions(
+            db, skip=skip, limit=limit + 1, search=search, sort=sort, after=after,
+            **candidate_kwargs
+        )
+        # The same rows back different bodies and next cursors under another
+        # limit, sort, offset, search or cursor
+        digest = hashlib.blake2b(digest_size=12)
+        digest.update(json.dumps([sort, limit, skip, search, cursor]).encode())
+        for row in rows:
+            digest.update(f"{row.id}.{row.version};".encode())
+        last_modified = max((row.updated_at for row in rows if row.updated_at), default=None)
+        return f'W/"{digest.hexdigest()}"', last_modified
+
+    async def get_reviews_etag(
+        self,
+        db: AsyncSession,
+        *,
+        book_id: int,
+        limit: int,
+        cursor: Optional[str] = None,
+        format: str = "json"
+    ) -> Optional[Tuple[str, Optional[datetime]]]:
+        """
+        ETag and Last-Modified of one response of a book's review listing, from the
+        book's version (bumped by every review write) together with the cursor,
+        limit and format that select the body. Returns None if the book does not exist.
+        """
+        row = await book_crud.get_version(db, id=book_id)
+        if row is None:
+            return None
+        # NDJSON streams every review after the cursor, whatever the limit
+        if format == "ndjson":
+            limit = None
+        digest = hashlib.blake2b(digest_size=12)
+        digest.update(f"{book_id}.{row.version};{format};{limit};{cursor or ''}".encode())
+        return f'W/"{digest.hexdigest()}"', row.updated_at
+
+    async def get_books_page_json(
+        self,
+        db: AsyncSession,
+        *,
+        skip: int,
+        limit: int,
+        search: Optional[str],
+        sort: Optional[str] = None,
+        cursor: Optional[str] = None,
+        etag: Optional[str] = None,
+        query: Optional[BookPageQuery] = None
+    ) -> Tuple[str, Optional[str]]:
+        """
+        get_books_page rendered as a JSON body, served from the response cache
+        when possible. Passing the page's current ETag makes the cached entry
+        specific to that version, and passing its resolved `query` spares a
+        cache miss from resolving it again. Raises ValueError for an invalid cursor.
+        """
+        sort = sort or ("relevance" if search else "id")
+
+        async def render() -> List[Any]:
+            books, next_cursor = await self.get_books_page(
+                db, skip=skip, limit=limit, search=search, sort=sort, cursor=cursor, query=query
+            )
+            return [_book_list_adapter.dump_json(books).decode(), next_cursor, [b.id for b in books]]
+
+        def tags(page: List[Any]) -> List[str]:
+            # Review writes reorder rating-sorted pages but only change the
+            # contents of other pages that show the reviewed book
+            if sort == "rating":
+                return [CATALOG_TAG, LISTING_TAG, RATING_ORDER_TAG]
+            return [CATALOG_TAG, LISTING_TAG] + [book_tag(book_id) for book_id in page[2]]
+
+        body, next_cursor, _ = await response_cache.get_or_compute(
+            response_cache.key(
+                "books", skip=skip, limit=limit, search=search, sort=sort, cursor=cursor, etag=etag
+            ),
+            render,
+            tags
+        )
+        return body, next_cursor
+
+    async def _search_index_candidates(
+        self,
+        db: AsyncSession,
+        *,
+        search: str,
+        sort: str,
+        skip: int,
+        after: Optional[Tuple[Any, int]]
+    ) -> Optional[SearchResult]:
+        """
+        Resolve search candidates from the in-process trigram index.
+        Returns None when the database should search instead: index not built,
+        legacy OFFSET paging, or a title/rating sort over more candidates than
+        the index hands out at once.
+        """
+        if not book_search_index.ready or skip:
+            return None
+        await book_search_index.sync(db)
+        if sort in ("id", "relevance"):
+            # The index has no relevance score, so these pages are in id order
+            return book_search_index.search(search, after_id=after[1] if after else 0)
+        result = book_search_index.search(search)
+        if result is None or result.truncated:
+            return None
+        return result
 
     async def add_or_update_review(
         self, 
@@ -48,74 +319,354 @@ class BookService:
         user_id: int, 
         review_in: ReviewCreate
     ) -> Optional[Review]:
-        # First check if book exists
-        book_model = await book_crud.get(db, id=book_id)
-        if not book_model:
+        """
+        Create the user's review of a book, or replace their existing one.
+        Returns None if the book does not exist.
+        """
+        # Adjusting the aggregates first doubles as the existence check and
+        # locks the book row; the upsert then commits both together
+        book_exists = await book_crud.apply_review_rating(
+            db, book_id=book_id, user_id=user_id, rating=review_in.rating
+        )
+        if not book_exists:
+            await db.rollback()
+            return None
+        try:
+            review_row = await review_crud.upsert(
+                db, obj_in=review_in, book_id=book_id, user_id=user_id
+            )
+        except IntegrityError:
+            # The book was deleted concurrently (foreign key violation)
+            await db.rollback()
             return None
+        await response_cache.invalidate(book_tag(book_id), RATING_ORDER_TAG)
+        return Review.model_validate(review_row)
 
-        # Check if this user already has a review for this book
-        existing_review = await review_crud.get_by_book_and_user(
-            db, book_id=book_id, user_id=user_id
-        )
+    async def add_reviews_batch(
+        self, db: AsyncSession, *, user_id: int, items: List[Dict[str, Any]]
+    ) -> ReviewBatchResult:
+        """
+        Create or replace many reviews by one user, reporting a status per item.
+        Items are validated in one pass; when several target the same book the
+        last one wins. Valid items are written in chunks of REVIEW_BATCH_CHUNK_SIZE,
+        each in its own transaction: one query locking the books that exist, one
+        for the ratings being replaced, one executemany UPDATE of the book
+        aggregates and one multi-row upsert.
+        """
+        results: List[Optional[ReviewBatchItemResult]] = [None] * len(items)
+        latest: Dict[int, Tuple[int, ReviewBatchItem]] = {}
+        for index, raw in enumerate(items):
+            try:
+                item = ReviewBatchItem.model_validate(raw)
+            except ValidationError as e:
+                results[index] = ReviewBatchItemResult(
+                    index=index,
+                    status="invalid",
+                    detail="; ".join(
+                        f"{'.'.join(map(str, error['loc']))}: {error['msg']}" for error in e.errors()
+                    )
+                )
+                continue
+            if item.book_id in latest:
+                superseded = latest[item.book_id][0]
+                results[superseded] = ReviewBatchItemResult(
+                    index=superseded, status="superseded", detail=f"Replaced by item {index}"
+                )
+            latest[item.book_id] = (index, item)
 
-        if existing_review:
-            # UPDATE existing review
-            print(f"Updating existing review ID {existing_review.id} by user {user_id} for book {book_id}")
-            updated_review = await review_crud.update(
-                db, db_obj=existing_review, obj_in=review_in
+        # Ordered by book id so concurrent batches lock book rows in the same order
+        pending = sorted(latest.items())
+        chunk_size = settings.REVIEW_BATCH_CHUNK_SIZE
+        for start in range(0, len(pending), chunk_size):
+            chunk = pending[start:start + chunk_size]
+            book_ids = [book_id for book_id, _ in chunk]
+            try:
+                # Lock the books first: the ratings being replaced are read after
+                # any concurrent write to them has committed
+                existing_books = await book_crud.lock_existing_ids(db, book_ids)
+                previous = await review_crud.get_ratings_by_user(
+                    db, user_id=user_id, book_ids=list(existing_books)
+                )
+                writes = []
+                for book_id, (index, item) in chunk:
+                    if book_id not in existing_books:
+                        results[index] = ReviewBatchItemResult(
+                            index=index, status="not_found", detail="Book not found"
+                        )
+                        continue
+                    writes.append(item.model_dump())
+                if not writes:
+                    continue
+                await book_crud.apply_rating_deltas(db, {
+                    write["book_id"]: (
+                        write["rating"] - previous.get(write["book_id"], 0),
+                        0 if write["book_id"] in previous else 1
+                    )
+                    for write in writes
+                })
+                rows = await review_crud.upsert_many(db, user_id=user_id, items=writes)
+                await db.commit()
+            except IntegrityError as e:
+                # A book was deleted concurrently; the whole chunk was rolled back
+                await db.rollback()
+                for book_id, (index, _) in chunk:
+                    if results[index] is None:
+                        results[index] = ReviewBatchItemResult(
+                            index=index, status="failed", detail=type(e).__name__
+                        )
+                continue
+            await response_cache.invalidate(
+                *[book_tag(row.book_id) for row in rows], RATING_ORDER_TAG
             )
-            # Refresh to get the updated object
-            await db.refresh(updated_review)
-            return Review(
-                id=updated_review.id,
-                rating=updated_review.rating,
-                review_text=updated_review.review_text,
-                book_id=updated_review.book_id,
-                user_id=updated_review.user_id
+            for row in rows:
+                index = latest[row.book_id][0]
+                results[index] = ReviewBatchItemResult(
+                    index=index,
+                    status="updated" if row.book_id in previous else "created",
+                    review_id=row.id
+                )
+            # Writes the upsert returned no row for were not stored
+            for write in writes:
+                index = latest[write["book_id"]][0]
+                if results[index] is None:
+                    results[index] = ReviewBatchItemResult(
+                        index=index, status="failed", detail="Review was not written"
+                    )
+
+        created = sum(1 for result in results if result.status == "created")
+        updated = sum(1 for result in results if result.status == "updated")
+        return ReviewBatchResult(
+            created=created,
+            updated=updated,
+            failed=sum(1 for result in results if result.status in ("invalid", "not_found", "failed")),
+            items=results
+        )
+
+    async def _rating_summary(
+        self, db: AsyncSession, book_model: BookModel
+    ) -> Tuple[Optional[float], int]:
+        """Average rating and review count of a book, without loading its reviews"""
+        if settings.BOOK_RATING_SOURCE == "aggregate":
+            stats = await review_crud.get_rating_stats(db, book_id=book_model.id)
+            avg_rating = stats.average_rating
+            return (
+                round(float(avg_rating), 2) if avg_rating is not None else None,
+                stats.review_count
             )
-        else:
-            # CREATE new review
-            print(f"Creating new review by user {user_id} for book {book_id}")
-            new_review = await review_crud.create_with_user(
-                db, obj_in=review_in, user_id=user_id, book_id=book_id
+        return self._calculate_average_rating(book_model), book_model.rating_count
+
+    def _decode_review_cursor(self, cursor: Optional[str]) -> Optional[Tuple[datetime, int]]:
+        if not cursor:
+            return None
+        created_at, review_id = decode_cursor(cursor, "created_at")
+        try:
+            return datetime.fromisoformat(created_at), review_id
+        except (TypeError, ValueError) as e:
+            raise ValueError("Invalid cursor") from e
+
+    async def get_reviews_for_book(
+        self,
+        db: AsyncSession,
+        *,
+        book_id: int,
+        limit: int = 100,
+        cursor: Optional[str] = None
+    ) -> Tuple[Optional[BookWithReviews], Optional[str]]:
+        """
+        Return a book with one page of its reviews (oldest first) and the cursor
+        for the next page. Raises ValueError for an invalid cursor.
+        """
+        after = self._decode_review_cursor(cursor)
+        book_model = await book_crud.get(db, id=book_id)
+        if not book_model:
+            return None, None
+
+        avg_rating, review_count = await self._rating_summary(db, book_model)
+
+        # Fetch one extra row to know whether another page exists
+        rows = await review_crud.get_page_by_book(
+            db, book_id=book_id, limit=limit + 1, after=after
+        )
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(
+                "created_at", rows[-1].created_at.isoformat(), rows[-1].id
             )
-            return Review(
-                id=new_review.id,
-                rating=new_review.rating,
-                review_text=new_review.review_text,
-                book_id=new_review.book_id,
-                user_id=new_review.user_id
+
+        return BookWithReviews(
+            id=book_model.id,
+            title=book_model.title,
+            author=book_model.author,
+            genre=book_model.genre,
+            average_rating=avg_rating,
+            review_count=review_count,
+            reviews=[Review.model_validate(row) for row in rows]
+        ), next_cursor
+
+    async def get_reviews_for_book_json(
+        self,
+        db: AsyncSession,
+        *,
+        book_id: int,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+        etag: Optional[str] = None
+    ) -> Optional[Tuple[str, Optional[str]]]:
+        """
+        get_reviews_for_book rendered as a JSON body, served from the response
+        cache when possible (specific to `etag` when given). Returns None if
+        the book does not exist.
+        """
+        async def render() -> Optional[List[Any]]:
+            book, next_cursor = await self.get_reviews_for_book(
+                db, book_id=book_id, limit=limit, cursor=cursor
             )
+            if book is None:
+                return None
+            return [book.model_dump_json(), next_cursor]
 
-    async def get_reviews_for_book(
-        self, db: AsyncSession, *, book_id: int
-    ) -> Optional[BookWithReviews]:
-        book_model = await book_crud.get_with_reviews(db, id=book_id)
+        page = await response_cache.get_or_compute(
+            response_cache.key("reviews", book_id=book_id, limit=limit, cursor=cursor, etag=etag),
+            render,
+            lambda _: [CATALOG_TAG, book_tag(book_id)]
+        )
+        return (page[0], page[1]) if page is not None else None
+
+    async def get_review_summary(self, db: AsyncSession, *, book_id: int) -> Optional[Book]:
+        """A book with its average rating and review count, or None if it does not exist"""
+        book_model = await book_crud.get(db, id=book_id)
         if not book_model:
             return None
-        
-        avg_rating = self._calculate_average_rating(book_model)
-        
-        # Convert reviews to Review schema
-        reviews = []
-        for review_model in book_model.reviews:
-            reviews.append(Review(
-                id=review_model.id,
-                rating=review_model.rating,
-                review_text=review_model.review_text,
-                book_id=review_model.book_id,
-                user_id=review_model.user_id
-            ))
-        
-        return BookWithReviews(
+        avg_rating, review_count = await self._rating_summary(db, book_model)
+        return Book(
             id=book_model.id,
             title=book_model.title,
             author=book_model.author,
             genre=book_model.genre,
+            google_books_id=book_model.google_books_id,
             average_rating=avg_rating,
-            reviews=reviews
+            review_count=review_count
         )
 
+    def stream_reviews_ndjson(
+        self, *, book_id: int, cursor: Optional[str] = None
+    ) -> AsyncIterator[str]:
+        """
+        Stream all of a book's reviews (after `cursor`, if given) as NDJSON chunks.
+        The cursor is validated up front so a bad one raises ValueError before
+        the response starts. Rows are read through a dedicated session, which
+        lives exactly as long as the stream.
+        """
+        after = self._decode_review_cursor(cursor)
+
+        async def lines() -> AsyncIterator[str]:
+            async with SessionLocal() as db:
+                async for batch in review_crud.stream_by_book(db, book_id=book_id, after=after):
+                    yield "".join(json.dumps(self._review_row(row)) + "\n" for row in batch)
+
+        return lines()
+
+    @staticmethod
+    def _review_row(row: Any) -> Dict[str, Any]:
+        return {
+            "id": row.id,
+            "rating": row.rating,
+            "review_text": row.review_text,
+            "book_id": row.book_id,
+            "user_id": row.user_id,
+            "created_at": row.created_at.isoformat() if row.created_at else None,
+        }
+
+    def export_catalog(
+        self, *, format: str = "ndjson", include: Optional[str] = None
+    ) -> AsyncIterator[str]:
+        """
+        Stream every book in id order as NDJSON or CSV chunks, one chunk per
+        batch of rows read from a server-side cursor, so memory stays bounded by
+        the batch size whatever the catalog size.
+
+        `include="ratings"` adds average_rating and review_count to each book;
+        `include="reviews"` also nests the book's reviews (NDJSON) or emits one
+        CSV line per review, repeating the book columns.
+        """
+        with_reviews = include == "reviews"
+        with_stats = include in ("ratings", "reviews")
+        fields = list(EXPORT_BOOK_FIELDS) + (["average_rating", "review_count"] if with_stats else [])
+
+        async def chunks() -> AsyncIterator[str]:
+            if format == "csv":
+                yield self._csv_chunk(
+                    [fields + [header for header, _ in EXPORT_CSV_REVIEW_COLUMNS] if with_reviews else fields]
+                )
+            async with SessionLocal() as db:
+                async for batch in book_crud.stream_export(db, with_stats=with_stats):
+                    reviews: Dict[int, List[Dict[str, Any]]] = {}
+                    if with_reviews:
+                        for row in await review_crud.get_for_book_range(
+                            db, first_book_id=batch[0].id, last_book_id=batch[-1].id
+                        ):
+                            reviews.setdefault(row.book_id, []).append(self._review_row(row))
+                    if format == "csv":
+                        yield self._csv_chunk(self._export_csv_rows(batch, fields, reviews, with_reviews))
+                    else:
+                        yield "".join(
+                            json.dumps(
+                                {**self._export_book(row), "reviews": reviews.get(row.id, [])}
+                                if with_reviews else self._export_book(row)
+                            ) + "\n"
+                            for row in batch
+                        )
+
+        return chunks()
+
+    @staticmethod
+    def _export_book(row: Any) -> Dict[str, Any]:
+        book = row._asdict()
+        if "average_rating" in book and book["average_rating"] is not None:
+            # AVG comes back as Decimal on Postgres in aggregate mode
+            book["average_rating"] = round(float(book["average_rating"]), 2)
+        return book
+
+    @staticmethod
+    def _export_csv_rows(
+        batch: List[Any],
+        fields: List[str],
+        reviews: Dict[int, List[Dict[str, Any]]],
+        with_reviews: bool,
+    ) -> Iterator[List[Any]]:
+        for row in batch:
+            book = BookService._export_book(row)
+            values = [book[name] for name in fields]
+            if not with_reviews:
+                yield values
+                continue
+            # A book without reviews still gets one line, with empty review columns
+            for review in reviews.get(row.id) or [{}]:
+                yield values + [review.get(name) for _, name in EXPORT_CSV_REVIEW_COLUMNS]
+
+    @staticmethod
+    def _csv_chunk(rows: Iterable[List[Any]]) -> str:
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        return buffer.getvalue()
+
+    async def get_statistics(self, db: AsyncSession) -> BookStatistics:
+        """Current catalog statistics, from the counters the write paths maintain"""
+        return BookStatistics(**await statistics_crud.get_current(db))
+
+    async def get_rating_analytics(self, db: AsyncSession) -> Optional[RatingAnalytics]:
+        """Rating analytics of the latest statistics run that computed them"""
+        snapshot = await statistics_crud.get_latest_rating_analytics(db)
+        if snapshot is None:
+            return None
+        return RatingAnalytics(computed_at=snapshot.computed_at, **snapshot.rating_analytics)
+
+    async def get_book_rating_statistics(self, db: AsyncSession, book_id: int) -> Optional[BookRatingStatistics]:
+        """Rating distribution of a book as of the latest rating analytics run"""
+        row = await statistics_crud.get_book_ratings(db, book_id)
+        return BookRatingStatistics.model_validate(row) if row else None
+
     async def delete_review(
         self, 
         db: AsyncSession, 
@@ -123,14 +674,124 @@ class BookService:
         book_id: int, 
         user_id: int
     ) -> bool:
-        """Delete a user's review for a book"""
-        existing_review = await review_crud.get_by_book_and_user(
-            db, book_id=book_id, user_id=user_id
+        """
+        Delete a user's review for a book and subtract it from the book's rating
+        aggregates, in one transaction. Only the delete that removed the review
+        adjusts them, so concurrent deletes of the same review count it once.
+        """
+        # Locked before the review, in the same order as the review writes
+        await book_crud.lock_existing_ids(db, [book_id])
+        rating = await review_crud.delete_by_book_and_user(db, book_id=book_id, user_id=user_id)
+        if rating is None:
+            await db.rollback()
+            return False
+        await book_crud.apply_rating_delta(db, book_id=book_id, sum_delta=-rating, count_delta=-1)
+        await db.commit()
+        await response_cache.invalidate(book_tag(book_id), RATING_ORDER_TAG)
+        return True
+
+    async def import_from_google_books(
+        self,
+        db: AsyncSession,
+        *,
+        google_books_ids: List[str],
+        genre: str
+    ) -> BookBatchImportResult:
+        """
+        Import many Google Books volumes: ids already in the catalog are found
+        with one IN query, the remaining volumes are fetched concurrently (at most
+        GOOGLE_BOOKS_IMPORT_CONCURRENCY at a time) and the new books are written
+        with a single multi-row INSERT. Returns a status per requested id.
+        """
+        items: List[Optional[BookBatchImportItemResult]] = [None] * len(google_books_ids)
+        pending: Dict[str, int] = {}
+        for index, google_books_id in enumerate(google_books_ids):
+            if google_books_id in pending:
+                items[index] = BookBatchImportItemResult(google_books_id=google_books_id, status="duplicate")
+            else:
+                pending[google_books_id] = index
+
+        existing = await book_crud.get_existing_google_books_ids(db, list(pending))
+        for google_books_id in existing:
+            items[pending.pop(google_books_id)] = BookBatchImportItemResult(
+                google_books_id=google_books_id, status="exists"
+            )
+
+        semaphore = asyncio.Semaphore(settings.GOOGLE_BOOKS_IMPORT_CONCURRENCY)
+
+        async def fetch(google_books_id: str) -> Any:
+            async with semaphore:
+                try:
+                    return await google_books_service.get_book_details(google_books_id)
+                except GoogleBooksUnavailable as e:
+                    return e
+
+        details = await asyncio.gather(*(fetch(google_books_id) for google_books_id in pending))
+
+        rows: Dict[str, Dict[str, Any]] = {}
+        requested: Dict[str, str] = {}
+        for google_books_id, book_details in zip(list(pending), details):
+            index = pending[google_books_id]
+            if isinstance(book_details, GoogleBooksUnavailable):
+                items[index] = BookBatchImportItemResult(
+                    google_books_id=google_books_id, status="unavailable", detail=str(book_details)
+                )
+                continue
+            if not book_details:
+                items[index] = BookBatchImportItemResult(google_books_id=google_books_id, status="not_found")
+                continue
+            try:
+                book_in = BookCreate(
+                    title=book_details["title"],
+                    author=", ".join(book_details["authors"]),
+                    genre=genre,
+                    google_books_id=book_details["google_books_id"],
+                )
+            except ValidationError as e:
+                items[index] = BookBatchImportItemResult(
+                    google_books_id=google_books_id,
+                    status="invalid",
+                    detail="; ".join(
+                        f"{'.'.join(map(str, error['loc']))}: {error['msg']}" for error in e.errors()
+                    )
+                )
+                continue
+            # Volume ids that Google resolves to the same canonical volume import once
+            if book_in.google_books_id in rows:
+                items[index] = BookBatchImportItemResult(google_books_id=google_books_id, status="duplicate")
+                continue
+            rows[book_in.google_books_id] = {
+                **book_in.model_dump(),
+                "isbn": book_details.get("isbn"),
+                "description": book_details.get("description"),
+                "page_count": book_details.get("page_count"),
+                "thumbnail_url": book_details.get("thumbnail"),
+            }
+            requested[book_in.google_books_id] = google_books_id
+
+        books = await book_crud.create_many_from_google(db, rows=list(rows.values()))
+        for book in books:
+            book_search_index.add_book(book.id, book.title, book.author, book.genre)
+            google_books_id = requested.pop(book.google_books_id)
+            items[pending[google_books_id]] = BookBatchImportItemResult(
+                google_books_id=google_books_id, status="imported", book_id=book.id
+            )
+        # Rows skipped by ON CONFLICT: imported since the IN query, already
+        # stored under the canonical id Google returned, or under another
+        # volume with the same title and author (e.g. another edition)
+        for google_books_id in requested.values():
+            items[pending[google_books_id]] = BookBatchImportItemResult(
+                google_books_id=google_books_id, status="exists"
+            )
+        if books:
+            await response_cache.invalidate(LISTING_TAG)
+
+        return BookBatchImportResult(
+            imported=len(books),
+            existing=sum(item.status == "exists" for item in items),
+            not_found=sum(item.status == "not_found" for item in items),
+            unavailable=sum(item.status == "unavailable" for item in items),
+            items=items,
         )
-        
-        if existing_review:
-            await review_crud.remove(db, id=existing_review.id)
-            return True
-        return False
 
 book_service = BookService()
\ No newline at end of file
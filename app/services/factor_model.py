@@ -0,0 +1,184 @@
+"""
+Matrix factorization models of the recommender, stored as versioned .npy files.
+
+The train_book_recommender task (app/tasks/factorization.py) writes each
+trained model into a new version directory under RECOMMENDER_MODEL_DIR and
+then points the CURRENT file at it. API processes map the arrays read-only
+(np.load(mmap_mode="r")), so every process on a host shares the same page
+cache pages instead of holding its own copy, and a new version is picked up
+on the next request.
+
+Books are stored in descending order of factor norm. A user's score for a
+book is at most |user factor| * |book factor| (Cauchy-Schwarz), so top_books()
+scores the catalog a block at a time and stops at the first block whose
+bound cannot beat the current top N: the result is exact, and for the usual
+long tail of small factors most of the catalog is never read.
+"""
+import json
+import os
+import shutil
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+from loguru import logger
+
+from app.core.config import settings
+
+CURRENT = "CURRENT"
+ARRAYS = ("user_ids", "user_factors", "book_ids", "book_factors", "book_norms")
+# Books scored per block by top_books()
+SCORE_BLOCK_SIZE = 16_384
+
+
+class FactorModel(NamedTuple):
+    version: str
+    # Sorted, with one row of user_factors each
+    user_ids: "np.ndarray"
+    user_factors: "np.ndarray"
+    # In descending order of book_norms, with one row of book_factors each
+    book_ids: "np.ndarray"
+    book_factors: "np.ndarray"
+    book_norms: "np.ndarray"
+    # Factor of users the model has not seen: the mean user factor
+    cold_start_factor: "np.ndarray"
+    meta: Dict[str, Any]
+
+    def user_factor(self, user_id: int) -> Optional["np.ndarray"]:
+        row = int(np.searchsorted(self.user_ids, user_id))
+        if row < len(self.user_ids) and self.user_ids[row] == user_id:
+            return self.user_factors[row]
+        return None
+
+
+def write_factor_model(
+    directory: str,
+    *,
+    user_ids: "np.ndarray",
+    user_factors: "np.ndarray",
+    book_ids: "np.ndarray",
+    book_factors: "np.ndarray",
+    meta: Dict[str, Any],
+    keep_versions: int,
+) -> str:
+    """
+    Write a trained model as a new version and make it the current one;
+    returns the version. The version directory is renamed into place once
+    complete and CURRENT is replaced atomically, so readers never see a
+    partial model. Only the newest keep_versions versions are kept (processes
+    still mapping a removed one keep reading it until they switch).
+    """
+    root = Path(directory)
+    root.mkdir(parents=True, exist_ok=True)
+    # Sorts in training order, which pruning relies on
+    version = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%fZ")
+    staging = root / f".{version}.tmp"
+    staging.mkdir()
+
+    order = np.argsort(user_ids)
+    norms = np.linalg.norm(book_factors, axis=1)
+    by_norm = np.argsort(-norms, kind="stable")
+    arrays = {
+        "user_ids": user_ids[order].astype(np.int64),
+        "user_factors": user_factors[order].astype(np.float32),
+        "book_ids": book_ids[by_norm].astype(np.int64),
+        "book_factors": book_factors[by_norm].astype(np.float32),
+        "book_norms": norms[by_norm].astype(np.float32),
+    }
+    for name, array in arrays.items():
+        np.save(staging / f"{name}.npy", np.ascontiguousarray(array))
+    cold_start = user_factors.mean(axis=0) if len(user_factors) else np.zeros(book_factors.shape[1])
+    (staging / "meta.json").write_text(json.dumps({
+        **meta, "version": version, "cold_start_factor": cold_start.astype(float).tolist(),
+    }))
+    staging.rename(root / version)
+
+    pointer = root / f".{CURRENT}.tmp"
+    pointer.write_text(version)
+    os.replace(pointer, root / CURRENT)
+
+    versions = sorted(path for path in root.iterdir() if path.is_dir() and not path.name.startswith("."))
+    for old in versions[:-keep_versions]:
+        shutil.rmtree(old, ignore_errors=True)
+    return version
+
+
+def load_factor_model(directory: str, version: str) -> FactorModel:
+    path = Path(directory) / version
+    arrays = {name: np.load(path / f"{name}.npy", mmap_mode="r") for name in ARRAYS}
+    meta = json.loads((path / "meta.json").read_text())
+    cold_start_factor = np.asarray(meta.pop("cold_start_factor"), dtype=np.float32)
+    return FactorModel(version=version, cold_start_factor=cold_start_factor, meta=meta, **arrays)
+
+
+def top_books(model: FactorModel, user_factor: "np.ndarray", count: int) -> Tuple["np.ndarray", "np.ndarray"]:
+    """
+    Rows of the `count` best scoring books for a user factor, best first, and
+    their scores: dot products a block of books at a time, merged with
+    argpartition, until the norm bound rules out the remaining blocks
+    """
+    if count <= 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+    bound = float(np.linalg.norm(user_factor))
+    best_rows = np.zeros(0, dtype=np.int64)
+    best_scores = np.zeros(0, dtype=np.float32)
+    for start in range(0, len(model.book_ids), SCORE_BLOCK_SIZE):
+        if len(best_rows) == count and best_scores.min() >= bound * model.book_norms[start]:
+            break
+        scores = model.book_factors[start:start + SCORE_BLOCK_SIZE] @ user_factor
+        rows = np.arange(start, start + len(scores))
+        if len(best_rows):
+            scores = np.concatenate([best_scores, scores])
+            rows = np.concatenate([best_rows, rows])
+        if len(scores) > count:
+            keep = np.argpartition(-scores, count - 1)[:count]
+            scores, rows = scores[keep], rows[keep]
+        best_rows, best_scores = rows, scores
+    order = np.argsort(-best_scores, kind="stable")
+    return best_rows[order], best_scores[order]
+
+
+class FactorModelStore:
+    """The current factor model of RECOMMENDER_MODEL_DIR, mapped once per version"""
+
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = directory or settings.RECOMMENDER_MODEL_DIR
+        self._model: Optional[FactorModel] = None
+
+    def current(self) -> Optional[FactorModel]:
+        """The current model, remapped when a new version has been trained; None if none was"""
+        try:
+            version = (Path(self.directory) / CURRENT).read_text().strip()
+        except FileNotFoundError:
+            return None
+        if self._model is None or self._model.version != version:
+            self._model = load_factor_model(self.directory, version)
+            logger.info(f"Mapped recommender model {version}")
+        return self._model
+
+    def recommend(
+        self, user_id: int, *, count: int, exclude_book_ids: List[int]
+    ) -> Optional[List[Tuple[int, float]]]:
+        """
+        (book id, score) of the `count` best books for a user, best first,
+        leaving out exclude_book_ids; None when no model has been trained
+        """
+        model = self.current()
+        if model is None:
+            return None
+        user_factor = model.user_factor(user_id)
+        if user_factor is None:
+            user_factor = model.cold_start_factor
+        excluded = set(exclude_book_ids)
+        # Enough candidates to fill `count` once the excluded books are dropped
+        rows, scores = top_books(model, user_factor, min(count + len(excluded), len(model.book_ids)))
+        recommended = [
+            (book_id, score)
+            for book_id, score in zip(model.book_ids[rows].tolist(), scores.tolist())
+            if book_id not in excluded
+        ]
+        return recommended[:count]
+
+
+factor_model_store = FactorModelStore()
@@ -0,0 +1,292 @@
+import asyncio
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, NamedTuple, Optional, Set, Tuple
+
+from loguru import logger
+
+from app.core.config import settings
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def search_key(query: str, max_results: int) -> str:
+    return f"search:{max_results}:{_WHITESPACE.sub(' ', query.strip().lower())}"
+
+
+def volume_key(google_books_id: str) -> str:
+    return f"volume:{google_books_id}"
+
+
+class CacheEntry(NamedTuple):
+    value: Any
+    # Wall-clock times, comparable across the processes sharing the disk tier
+    fresh_until: float
+    stale_until: float
+
+
+class MemoryTier:
+    """Per-process LRU of entries, bounded by entry count"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def set(self, key: str, entry: CacheEntry) -> None:
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class DiskTier:
+    """
+    Entries in a SQLite file shared by every process on the host (API workers
+    and Celery workers) and kept across restarts. When the stored values exceed
+    `max_bytes`, expired entries and then the least recently used ones are
+    deleted down to 90% of it. Calls are blocking; the cache runs them in a
+    worker thread.
+    """
+
+    def __init__(self, path: str, max_bytes: int):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.evictions = 0
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._writes_since_check = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, "
+                "fresh_until REAL NOT NULL, stale_until REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_entries_accessed_at ON entries (accessed_at)")
+            self._conn = conn
+        return self._conn
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute(
+                "SELECT value, fresh_until, stale_until FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (time.time(), key))
+        return CacheEntry(json.loads(row[0]), row[1], row[2])
+
+    def set(self, key: str, entry: CacheEntry) -> None:
+        value = json.dumps(entry.value)
+        with self._lock:
+            conn = self._connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?)",
+                (key, value, len(value), entry.fresh_until, entry.stale_until, time.time()),
+            )
+            # Summing sizes costs a scan; do it every 100 writes
+            self._writes_since_check += 1
+            if self._writes_since_check >= 100:
+                self._writes_since_check = 0
+                self._evict(conn)
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        size = conn.execute("SELECT coalesce(sum(size), 0) FROM entries").fetchone()[0]
+        if size <= self.max_bytes:
+            return
+        self.evictions += conn.execute("DELETE FROM entries WHERE stale_until < ?", (time.time(),)).rowcount
+        size = conn.execute("SELECT coalesce(sum(size), 0) FROM entries").fetchone()[0]
+        target = self.max_bytes * 0.9
+        cursor = conn.execute("SELECT key, size FROM entries ORDER BY accessed_at")
+        victims = []
+        for key, entry_size in cursor:
+            if size <= target:
+                break
+            victims.append((key,))
+            size -= entry_size
+        conn.executemany("DELETE FROM entries WHERE key = ?", victims)
+        self.evictions += len(victims)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+class GoogleBooksCache:
+    """
+    Two-tier cache of Google Books API results: an in-process LRU in front of a
+    SQLite file shared by all processes.
+
+    An entry is fresh for its TTL, then served stale for up to
+    GOOGLE_BOOKS_CACHE_STALE_SECONDS while a background fetch refreshes it
+    (stale-while-revalidate). "No results" are cached too, for the shorter
+    GOOGLE_BOOKS_CACHE_NEGATIVE_TTL_SECONDS. Fetch errors are never cached; the
+    caller's fetch should raise on them. Disk tier errors are logged and treated
+    as misses.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_entries: int,
+        path: Optional[str],
+        max_bytes: int,
+        stale_seconds: float,
+        negative_ttl: float,
+    ):
+        self.memory = MemoryTier(max_entries)
+        self.disk = DiskTier(path, max_bytes) if path else None
+        self.stale_seconds = stale_seconds
+        self.negative_ttl = negative_ttl
+        self._refreshing: Set[str] = set()
+        self._tasks: Set[asyncio.Task] = set()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.stale_hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.revalidations = 0
+        self.errors = 0
+
+    @classmethod
+    def from_settings(cls) -> Optional["GoogleBooksCache"]:
+        if settings.GOOGLE_BOOKS_CACHE_BACKEND == "off":
+            return None
+        return cls(
+            max_entries=settings.GOOGLE_BOOKS_CACHE_MAX_ENTRIES,
+            path=settings.GOOGLE_BOOKS_CACHE_PATH if settings.GOOGLE_BOOKS_CACHE_BACKEND == "tiered" else None,
+            max_bytes=settings.GOOGLE_BOOKS_CACHE_DISK_MAX_BYTES,
+            stale_seconds=settings.GOOGLE_BOOKS_CACHE_STALE_SECONDS,
+            negative_ttl=settings.GOOGLE_BOOKS_CACHE_NEGATIVE_TTL_SECONDS,
+        )
+
+    async def get_or_fetch(
+        self, key: str, fetch: Callable[[], Awaitable[Any]], *, ttl: float
+    ) -> Any:
+        """
+        Return the cached value of `key`, or fetch, store and return it. Empty
+        values (None, [], {}) are cached as "no results" for the negative TTL.
+        """
+        now = time.time()
+        entry, tier = await self._lookup(key)
+        if entry is not None and now < entry.stale_until:
+            if tier == "memory":
+                self.memory_hits += 1
+            else:
+                self.disk_hits += 1
+            if not entry.value:
+                self.negative_hits += 1
+            if now >= entry.fresh_until:
+                self.stale_hits += 1
+                self._revalidate(key, fetch, ttl)
+            return entry.value
+
+        self.misses += 1
+        value = await fetch()
+        await self._store(key, value, ttl)
+        return value
+
+    async def _lookup(self, key: str) -> Tuple[Optional[CacheEntry], Optional[str]]:
+        entry = self.memory.get(key)
+        if entry is not None:
+            return entry, "memory"
+        if self.disk is None:
+            return None, None
+        try:
+            entry = await asyncio.to_thread(self.disk.get, key)
+        except Exception as e:
+            self._disk_error(e)
+            return None, None
+        if entry is None:
+            return None, None
+        self.memory.set(key, entry)
+        return entry, "disk"
+
+    async def _store(self, key: str, value: Any, ttl: float) -> None:
+        now = time.time()
+        fresh_until = now + (ttl if value else self.negative_ttl)
+        entry = CacheEntry(value, fresh_until, fresh_until + self.stale_seconds)
+        self.memory.set(key, entry)
+        if self.disk is None:
+            return
+        try:
+            await asyncio.to_thread(self.disk.set, key, entry)
+        except Exception as e:
+            self._disk_error(e)
+
+    def _revalidate(self, key: str, fetch: Callable[[], Awaitable[Any]], ttl: float) -> None:
+        if key in self._refreshing:
+            return
+        self._refreshing.add(key)
+        self.revalidations += 1
+
+        async def refresh() -> None:
+            try:
+                await self._store(key, await fetch(), ttl)
+            except Exception as e:
+                # Keep serving the stale entry; the next hit retries
+                logger.warning(f"Google Books cache refresh of {key} failed: {e}")
+            finally:
+                self._refreshing.discard(key)
+
+        task = asyncio.create_task(refresh())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def aclose(self) -> None:
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        if self.disk is not None:
+            self.disk.close()
+
+    def stats(self) -> Dict[str, Any]:
+        hits = self.memory_hits + self.disk_hits
+        lookups = hits + self.misses
+        return {
+            "memory_entries": len(self.memory),
+            "memory_max_entries": self.memory.max_entries,
+            "disk_path": self.disk.path if self.disk else None,
+            "disk_max_bytes": self.disk.max_bytes if self.disk else None,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_ratio": round(hits / lookups, 4) if lookups else None,
+            # Hits on "no results" entries, and on expired entries served while refreshing
+            "negative_hits": self.negative_hits,
+            "stale_hits": self.stale_hits,
+            "revalidations": self.revalidations,
+            "memory_evictions": self.memory.evictions,
+            "disk_evictions": self.disk.evictions if self.disk else 0,
+            "errors": self.errors,
+        }
+
+    def _disk_error(self, e: Exception) -> None:
+        self.errors += 1
+        logger.warning(f"Google Books disk cache error: {e}")
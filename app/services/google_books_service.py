@@ -1,52 +1,296 @@
+import asyncio
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
 import httpx
-from typing import List, Optional, Dict, Any
+from typing import Any, Awaitable, Callable, Dict, List, Optional
 from loguru import logger
 
+from app.core.config import settings
+from app.services.rate_limit import (
+    AdaptiveConcurrencyLimiter,
+    CircuitBreaker,
+    CircuitOpenError,
+    MemoryTokenBucket,
+    RateLimiter,
+    RateLimitTimeout,
+    RedisTokenBucket,
+)
+from app.services.google_books_cache import GoogleBooksCache, search_key, volume_key
+from app.services.single_flight import SingleFlight
+
+class GoogleBooksUnavailable(Exception):
+    """
+    The Google Books API is throttling, failing or unreachable, or calls to it
+    are being failed fast. `retry_after` is a hint in seconds, when known.
+    """
+
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def _parse_retry_after(value: Optional[str], default: float) -> float:
+    """Seconds from a Retry-After header, given as seconds or as an HTTP date"""
+    if not value:
+        return default
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return default
+
+
 class GoogleBooksService:
+    """
+    Client of the Google Books API.
+
+    Requests share one long-lived `httpx.AsyncClient`, so connections (and their
+    TCP/TLS setup) are reused across calls. The client is opened by `start()` and
+    closed by `aclose()`, which the FastAPI lifespan and the Celery worker process
+    signals call; code running without either (scripts, tests) gets one lazily.
+    A client belongs to the event loop that created it and is replaced if used
+    from another loop. Results are cached by `GoogleBooksCache`, and concurrent
+    identical lookups are coalesced by `SingleFlight`.
+
+    Outbound requests are paced by a token bucket (per process, or in Redis to
+    share it with every API process and Celery worker) and by a concurrency limit
+    adapted to 429s and latency (AIMD), and a circuit breaker fails them fast
+    while the API is down. Failures raise GoogleBooksUnavailable rather than
+    looking like empty results.
+    """
+
     def __init__(self):
-        self.base_url = "https://www.googleapis.com/books/v1"
+        self.base_url = settings.GOOGLE_BOOKS_BASE_URL
         self.api_key = None  # You can add API key if needed
+        self._client: Optional[httpx.AsyncClient] = None
+        self._client_loop: Optional[asyncio.AbstractEventLoop] = None
+        self.cache = GoogleBooksCache.from_settings()
+        self.single_flight = SingleFlight()
+        self.rate_limiter = self._build_rate_limiter()
+        self.concurrency = AdaptiveConcurrencyLimiter(
+            initial=settings.GOOGLE_BOOKS_MAX_CONCURRENCY,
+            min_limit=1,
+            max_limit=settings.GOOGLE_BOOKS_MAX_CONCURRENCY,
+            latency_target=settings.GOOGLE_BOOKS_LATENCY_TARGET_SECONDS,
+        )
+        self.breaker = CircuitBreaker(
+            failure_threshold=settings.GOOGLE_BOOKS_BREAKER_FAILURE_THRESHOLD,
+            reset_seconds=settings.GOOGLE_BOOKS_BREAKER_RESET_SECONDS,
+        )
+        self.throttled = 0
+        self.requests = 0
+        self.errors = 0
+        self.connections_opened = 0
+        self.request_seconds = 0.0
+
+    @staticmethod
+    def _build_rate_limiter() -> Optional[RateLimiter]:
+        rate, burst = settings.GOOGLE_BOOKS_RATE_LIMIT_PER_SECOND, settings.GOOGLE_BOOKS_RATE_LIMIT_BURST
+        if settings.GOOGLE_BOOKS_RATE_LIMIT_BACKEND == "redis":
+            return RateLimiter(RedisTokenBucket(settings.GOOGLE_BOOKS_RATE_LIMIT_REDIS_URL, rate, burst))
+        if settings.GOOGLE_BOOKS_RATE_LIMIT_BACKEND == "memory":
+            return RateLimiter(MemoryTokenBucket(rate, burst))
+        return None
+
+    async def start(self) -> None:
+        await self._get_client()
+
+    async def aclose(self) -> None:
+        if self.cache is not None:
+            await self.cache.aclose()
+        if self._client is not None:
+            client, self._client, self._client_loop = self._client, None, None
+            await client.aclose()
+
+    async def _get_client(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        stale = None
+        if self._client is not None and self._client_loop is not loop:
+            # Its connections are bound to a loop that is gone or elsewhere
+            stale, stale_loop = self._client, self._client_loop
+            self._client = None
+        if self._client is None:
+            self._client = self._build_client()
+            self._client_loop = loop
+        if stale is not None:
+            # Replaced before closing, so concurrent callers share the new client
+            await self._close_stale_client(stale, stale_loop)
+        return self._client
+
+    @staticmethod
+    async def _close_stale_client(client: httpx.AsyncClient, loop: Optional[asyncio.AbstractEventLoop]) -> None:
+        """Close a client left behind by another event loop, releasing its connection pool"""
+        if loop is not None and loop.is_closed():
+            logger.warning("Google Books client's event loop is closed; discarding its connection pool")
+        else:
+            logger.warning("Google Books client used from a new event loop; closing it and reopening")
+        try:
+            await client.aclose()
+        except RuntimeError as e:
+            # Closing the sockets needs their closed loop: the pool is emptied
+            # and the client marked closed, and the sockets go with the client
+            logger.warning(f"Discarded Google Books client without closing its connections: {e}")
+    def _build_client(self) -> httpx.AsyncClient:
+        http2 = settings.GOOGLE_BOOKS_HTTP2
+        if http2:
+            try:
+                import h2  # noqa: F401
+            except ImportError:
+                logger.warning("GOOGLE_BOOKS_HTTP2 needs the h2 package (httpx[http2]); using HTTP/1.1")
+                http2 = False
+        return httpx.AsyncClient(
+            base_url=self.base_url,
+            http2=http2,
+            limits=httpx.Limits(
+                max_connections=settings.GOOGLE_BOOKS_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.GOOGLE_BOOKS_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=settings.GOOGLE_BOOKS_KEEPALIVE_EXPIRY_SECONDS,
+            ),
+            timeout=httpx.Timeout(
+                settings.GOOGLE_BOOKS_TIMEOUT_SECONDS,
+                connect=settings.GOOGLE_BOOKS_CONNECT_TIMEOUT_SECONDS,
+            ),
+        )
+
+    async def _trace(self, event_name: str, info: Dict[str, Any]) -> None:
+        if event_name == "connection.connect_tcp.complete":
+            self.connections_opened += 1
+
+    async def _get_json(self, path: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        GET a path of the API through the shared client, guarded by the circuit
+        breaker. A 429 pauses every caller sharing the rate limiter for its
+        Retry-After and is retried up to GOOGLE_BOOKS_MAX_RETRIES times.
+        Raises GoogleBooksUnavailable when the API is throttling, failing or
+        unreachable, and httpx.HTTPStatusError for other error statuses.
+        """
+        client = await self._get_client()
+        attempt = 0
+        while True:
+            try:
+                self.breaker.before_call()
+            except CircuitOpenError as e:
+                raise GoogleBooksUnavailable(str(e), retry_after=e.retry_after) from e
+            try:
+                response = await self._send(client, path, params)
+            except RateLimitTimeout as e:
+                self.breaker.record_abandoned()
+                raise GoogleBooksUnavailable(str(e), retry_after=e.retry_after) from e
+            except httpx.RequestError as e:
+                self.breaker.record_failure()
+                raise GoogleBooksUnavailable(f"request failed: {e!r}") from e
+            except BaseException:
+                self.breaker.record_abandoned()
+                raise
+
+            if response.status_code >= 500:
+                self.breaker.record_failure()
+                raise GoogleBooksUnavailable(f"Google Books answered {response.status_code}")
+            # Any other answer, throttling included, shows the API is up
+            self.breaker.record_success()
+            if response.status_code != 429:
+                response.raise_for_status()
+                return response.json()
+
+            self.throttled += 1
+            retry_after = _parse_retry_after(response.headers.get("Retry-After"), default=2.0 ** attempt)
+            if attempt >= settings.GOOGLE_BOOKS_MAX_RETRIES:
+                raise GoogleBooksUnavailable("throttled by Google Books (429)", retry_after=retry_after)
+            attempt += 1
+            if self.rate_limiter is not None:
+                # The next acquire() waits out the pause, or gives up past the max wait
+                await self.rate_limiter.pause(retry_after)
+            elif retry_after > settings.GOOGLE_BOOKS_RATE_LIMIT_MAX_WAIT_SECONDS:
+                raise GoogleBooksUnavailable("throttled by Google Books (429)", retry_after=retry_after)
+            else:
+                await asyncio.sleep(retry_after)
+
+    async def _send(
+        self, client: httpx.AsyncClient, path: str, params: Optional[Dict[str, Any]]
+    ) -> httpx.Response:
+        """One request, paced by the rate limiter and the adaptive concurrency limit"""
+        if self.rate_limiter is not None:
+            await self.rate_limiter.acquire(max_wait=settings.GOOGLE_BOOKS_RATE_LIMIT_MAX_WAIT_SECONDS)
+        await self.concurrency.acquire()
+        started = time.perf_counter()
+        self.requests += 1
+        throttled = False
+        try:
+            response = await client.get(path, params=params, extensions={"trace": self._trace})
+            throttled = response.status_code == 429 or response.status_code >= 500
+            if response.status_code >= 400:
+                self.errors += 1
+            return response
+        except httpx.RequestError:
+            # Timeouts and refused connections signal overload as much as a 429
+            throttled = True
+            self.errors += 1
+            raise
+        finally:
+            latency = time.perf_counter() - started
+            self.request_seconds += latency
+            self.concurrency.release(latency=latency, throttled=throttled)
+
+    def stats(self) -> Dict[str, Any]:
+        pool = []
+        if self._client is not None:
+            # httpx does not expose its pool; read it from the transport if present
+            pool = getattr(getattr(self._client, "_transport", None), "_pool", None)
+            pool = list(getattr(pool, "connections", []))
+        return {
+            "base_url": self.base_url,
+            "client_open": self._client is not None,
+            "requests": self.requests,
+            "errors": self.errors,
+            # New TCP connections; requests minus this is the number of reuses
+            "connections_opened": self.connections_opened,
+            "avg_latency_ms": round(self.request_seconds / self.requests * 1000, 2) if self.requests else None,
+            "pool": {
+                "max_connections": settings.GOOGLE_BOOKS_MAX_CONNECTIONS,
+                "max_keepalive_connections": settings.GOOGLE_BOOKS_MAX_KEEPALIVE_CONNECTIONS,
+                "keepalive_expiry_seconds": settings.GOOGLE_BOOKS_KEEPALIVE_EXPIRY_SECONDS,
+                "connections": len(pool),
+                "idle": sum(1 for connection in pool if connection.is_idle()),
+            },
+            "cache": self.cache.stats() if self.cache else None,
+            "single_flight": self.single_flight.stats(),
+            # 429 answers, each followed by a pause of the rate limiter
+            "throttled": self.throttled,
+            "rate_limiter": self.rate_limiter.stats() if self.rate_limiter else None,
+            "concurrency": self.concurrency.stats(),
+            "circuit_breaker": self.breaker.stats(),
+        }
+
+    async def _lookup(self, key: str, fetch: Callable[[], Awaitable[Any]], *, ttl: float) -> Any:
+        """
+        Result of `fetch` for a cache key, from the cache if possible. Fetches
+        (cache misses and background refreshes) of the same key that overlap
+        share one outbound request.
+        """
+        coalesced = lambda: self.single_flight.do(key, fetch)
+        if self.cache is None:
+            return await coalesced()
+        return await self.cache.get_or_fetch(key, coalesced, ttl=ttl)
 
     async def search_books(
         self, 
         query: str, 
         max_results: int = 10
     ) -> List[Dict[str, Any]]:
-        """Search books using Google Books API"""
+        """Search books using Google Books API. Raises GoogleBooksUnavailable."""
         try:
-            async with httpx.AsyncClient() as client:
-                params = {
-                    "q": query,
-                    "maxResults": max_results,
-                    "printType": "books"
-                }
-                
-                response = await client.get(f"{self.base_url}/volumes", params=params)
-                response.raise_for_status()
-                
-                data = response.json()
-                books = []
-                
-                for item in data.get("items", []):
-                    volume_info = item.get("volumeInfo", {})
-                    book_data = {
-                        "google_books_id": item.get("id"),
-                        "title": volume_info.get("title", "Unknown Title"),
-                        "authors": volume_info.get("authors", ["Unknown Author"]),
-                        "published_date": volume_info.get("publishedDate"),
-                        "description": volume_info.get("description"),
-                        "isbn": self._extract_isbn(volume_info.get("industryIdentifiers", [])),
-                        "page_count": volume_info.get("pageCount"),
-                        "categories": volume_info.get("categories", []),
-                        "average_rating": volume_info.get("averageRating"),
-                        "ratings_count": volume_info.get("ratingsCount"),
-                        "thumbnail": volume_info.get("imageLinks", {}).get("thumbnail"),
-                        "language": volume_info.get("language", "en")
-                    }
-                    books.append(book_data)
-                
-                return books
-                
+            return await self._lookup(
+                search_key(query, max_results),
+                lambda: self._fetch_search(query, max_results),
+                ttl=settings.GOOGLE_BOOKS_CACHE_SEARCH_TTL_SECONDS,
+            )
+
+        except GoogleBooksUnavailable:
+            raise
         except httpx.RequestError as e:
             logger.error(f"Google Books API request failed: {e}")
             return []
@@ -54,6 +298,36 @@ class GoogleBooksService:
             logger.error(f"Error processing Google Books API response: {e}")
             return []
 
+    async def _fetch_search(self, query: str, max_results: int) -> List[Dict[str, Any]]:
+        params = {
+            "q": query,
+            "maxResults": max_results,
+            "printType": "books"
+        }
+
+        data = await self._get_json("/volumes", params=params)
+        books = []
+
+        for item in data.get("items", []):
+            volume_info = item.get("volumeInfo", {})
+            book_data = {
+                "google_books_id": item.get("id"),
+                "title": volume_info.get("title", "Unknown Title"),
+                "authors": volume_info.get("authors", ["Unknown Author"]),
+                "published_date": volume_info.get("publishedDate"),
+                "description": volume_info.get("description"),
+                "isbn": self._extract_isbn(volume_info.get("industryIdentifiers", [])),
+                "page_count": volume_info.get("pageCount"),
+                "categories": volume_info.get("categories", []),
+                "average_rating": volume_info.get("averageRating"),
+                "ratings_count": volume_info.get("ratingsCount"),
+                "thumbnail": volume_info.get("imageLinks", {}).get("thumbnail"),
+                "language": volume_info.get("language", "en")
+            }
+            books.append(book_data)
+
+        return books
+
     def _extract_isbn(self, industry_identifiers: List[Dict]) -> Optional[str]:
         """Extract ISBN from industry identifiers"""
         for identifier in industry_identifiers:
@@ -62,31 +336,16 @@ class GoogleBooksService:
         return None
 
     async def get_book_details(self, google_books_id: str) -> Optional[Dict[str, Any]]:
-        """Get detailed information for a specific book"""
+        """Get detailed information for a specific book. Raises GoogleBooksUnavailable."""
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(f"{self.base_url}/volumes/{google_books_id}")
-                response.raise_for_status()
-                
-                data = response.json()
-                volume_info = data.get("volumeInfo", {})
-                
-                return {
-                    "google_books_id": data.get("id"),
-                    "title": volume_info.get("title", "Unknown Title"),
-                    "authors": volume_info.get("authors", ["Unknown Author"]),
-                    "published_date": volume_info.get("publishedDate"),
-                    "description": volume_info.get("description"),
-                    "isbn": self._extract_isbn(volume_info.get("industryIdentifiers", [])),
-                    "page_count": volume_info.get("pageCount"),
-                    "categories": volume_info.get("categories", []),
-                    "average_rating": volume_info.get("averageRating"),
-                    "ratings_count": volume_info.get("ratingsCount"),
-                    "thumbnail": volume_info.get("imageLinks", {}).get("thumbnail"),
-                    "language": volume_info.get("language", "en"),
-                    "publisher": volume_info.get("publisher")
-                }
-                
+            return await self._lookup(
+                volume_key(google_books_id),
+                lambda: self._fetch_volume(google_books_id),
+                ttl=settings.GOOGLE_BOOKS_CACHE_VOLUME_TTL_SECONDS,
+            )
+
+        except GoogleBooksUnavailable:
+            raise
         except httpx.RequestError as e:
             logger.error(f"Google Books API request failed: {e}")
             return None
@@ -94,4 +353,31 @@ class GoogleBooksService:
             logger.error(f"Error processing Google Books API response: {e}")
             return None
 
+    async def _fetch_volume(self, google_books_id: str) -> Optional[Dict[str, Any]]:
+        """Volume details, or None if Google does not know the volume"""
+        try:
+            data = await self._get_json(f"/volumes/{google_books_id}")
+        except httpx.HTTPStatusError as e:
+            # Google answers unknown volume ids with 404
+            if e.response.status_code == 404:
+                return None
+            raise
+        volume_info = data.get("volumeInfo", {})
+
+        return {
+            "google_books_id": data.get("id"),
+            "title": volume_info.get("title", "Unknown Title"),
+            "authors": volume_info.get("authors", ["Unknown Author"]),
+            "published_date": volume_info.get("publishedDate"),
+            "description": volume_info.get("description"),
+            "isbn": self._extract_isbn(volume_info.get("industryIdentifiers", [])),
+            "page_count": volume_info.get("pageCount"),
+            "categories": volume_info.get("categories", []),
+            "average_rating": volume_info.get("averageRating"),
+            "ratings_count": volume_info.get("ratingsCount"),
+            "thumbnail": volume_info.get("imageLinks", {}).get("thumbnail"),
+            "language": volume_info.get("language", "en"),
+            "publisher": volume_info.get("publisher")
+        }
+
 google_books_service = GoogleBooksService()
\ No newline at end of file
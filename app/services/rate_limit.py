@@ -0,0 +1,305 @@
+import asyncio
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+
+import redis.asyncio as aioredis
+from loguru import logger
+
+
+class RateLimitTimeout(Exception):
+    """A call would have to wait longer than allowed for a token"""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"rate limited, retry after {retry_after:.1f}s")
+        self.retry_after = retry_after
+
+
+class CircuitOpenError(Exception):
+    """The circuit breaker is failing calls fast"""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"circuit open, retry after {retry_after:.1f}s")
+        self.retry_after = retry_after
+
+
+class MemoryTokenBucket:
+    """Token bucket for the current process"""
+
+    name = "memory"
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+
+    async def take(self) -> float:
+        """Take a token; returns 0, or the seconds to wait before trying again"""
+        now = time.monotonic()
+        if now < self._paused_until:
+            return self._paused_until - now
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return 0.0
+        return (1 - self._tokens) / self.rate
+
+    async def pause(self, seconds: float) -> None:
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+
+# Both scripts read the clock of the Redis server, shared by every client
+_TAKE_SCRIPT = """
+local now_parts = redis.call('TIME')
+local now = tonumber(now_parts[1]) + tonumber(now_parts[2]) / 1000000
+local paused_until = tonumber(redis.call('GET', KEYS[2]) or '0')
+if paused_until > now then
+    return tostring(paused_until - now)
+end
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(state[1]) or burst
+local updated = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + (now - updated) * rate)
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 60)
+return tostring(wait)
+"""
+
+_PAUSE_SCRIPT = """
+local now_parts = redis.call('TIME')
+local now = tonumber(now_parts[1]) + tonumber(now_parts[2]) / 1000000
+local seconds = tonumber(ARGV[1])
+local paused_until = tonumber(redis.call('GET', KEYS[1]) or '0')
+if now + seconds > paused_until then
+    redis.call('SET', KEYS[1], tostring(now + seconds), 'PX', math.ceil(seconds * 1000))
+end
+return 1
+"""
+
+
+class RedisTokenBucket:
+    """Token bucket in Redis, shared by every API process and Celery worker"""
+
+    name = "redis"
+
+    def __init__(self, url: str, rate: float, burst: int, prefix: str = "bookrec:ratelimit:google_books:"):
+        self.rate = rate
+        self.burst = burst
+        self.prefix = prefix
+        self._client = aioredis.from_url(url)
+        self._take = self._client.register_script(_TAKE_SCRIPT)
+        self._pause = self._client.register_script(_PAUSE_SCRIPT)
+
+    async def take(self) -> float:
+        wait = await self._take(
+            keys=[self.prefix + "bucket", self.prefix + "paused_until"], args=[self.rate, self.burst]
+        )
+        return float(wait)
+
+    async def pause(self, seconds: float) -> None:
+        await self._pause(keys=[self.prefix + "paused_until"], args=[seconds])
+
+
+class RateLimiter:
+    """
+    Paces calls with a token bucket. `acquire` waits for a token, or raises
+    RateLimitTimeout if that would take longer than `max_wait`. `pause` stops
+    every caller sharing the bucket for a while, e.g. for a Retry-After.
+    Backend errors are logged and let the call through.
+    """
+
+    def __init__(self, bucket: Any):
+        self.bucket = bucket
+        self.waits = 0
+        self.wait_seconds = 0.0
+        self.timeouts = 0
+        self.pauses = 0
+        self.errors = 0
+
+    async def acquire(self, *, max_wait: float) -> None:
+        deadline = time.monotonic() + max_wait
+        while True:
+            try:
+                wait = await self.bucket.take()
+            except Exception as e:
+                self._backend_error(e)
+                return
+            if wait <= 0:
+                return
+            remaining = deadline - time.monotonic()
+            if wait > remaining:
+                self.timeouts += 1
+                raise RateLimitTimeout(wait)
+            self.waits += 1
+            self.wait_seconds += wait
+            await asyncio.sleep(wait)
+
+    async def pause(self, seconds: float) -> None:
+        self.pauses += 1
+        try:
+            await self.bucket.pause(seconds)
+        except Exception as e:
+            self._backend_error(e)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": self.bucket.name,
+            "rate_per_second": self.bucket.rate,
+            "burst": self.bucket.burst,
+            "waits": self.waits,
+            "wait_seconds": round(self.wait_seconds, 3),
+            "timeouts": self.timeouts,
+            "pauses": self.pauses,
+            "errors": self.errors,
+        }
+
+    def _backend_error(self, e: Exception) -> None:
+        self.errors += 1
+        logger.warning(f"Rate limiter backend error: {e}")
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    Bounds the calls in flight with a limit adjusted by AIMD: every call that
+    completes under `latency_target` raises the limit by 1/limit (about +1 per
+    limit's worth of calls), and a throttled or slow call halves it, at most
+    once per `cooldown` so one burst of failures counts as one signal.
+    """
+
+    def __init__(
+        self,
+        *,
+        initial: int,
+        min_limit: int,
+        max_limit: int,
+        latency_target: float,
+        cooldown: float = 1.0,
+    ):
+        self.limit = float(initial)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_target = latency_target
+        self.cooldown = cooldown
+        self.in_flight = 0
+        self.decreases = 0
+        self._last_decrease = 0.0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    async def acquire(self) -> None:
+        while self.in_flight >= int(self.limit):
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+                elif not waiter.cancelled():
+                    # Woken for a free slot it will not take; pass it on
+                    self._wake()
+                raise
+        self.in_flight += 1
+
+    def release(self, *, latency: float, throttled: bool = False) -> None:
+        self.in_flight -= 1
+        now = time.monotonic()
+        if throttled or latency > self.latency_target:
+            if now - self._last_decrease >= self.cooldown:
+                self.limit = max(self.min_limit, self.limit / 2)
+                self._last_decrease = now
+                self.decreases += 1
+        else:
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+        self._wake()
+
+    def _wake(self) -> None:
+        free = int(self.limit) - self.in_flight
+        while free > 0 and self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                free -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "limit": round(self.limit, 2),
+            "min_limit": self.min_limit,
+            "max_limit": self.max_limit,
+            "in_flight": self.in_flight,
+            "waiting": len(self._waiters),
+            "decreases": self.decreases,
+        }
+
+
+class CircuitBreaker:
+    """
+    Fails calls fast after `failure_threshold` consecutive failures. Once open it
+    rejects calls for `reset_seconds`, then lets a single trial call through
+    (half-open): success closes it, failure opens it again.
+    """
+
+    def __init__(self, *, failure_threshold: int, reset_seconds: float):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial_in_flight = False
+        self.opens = 0
+        self.rejected = 0
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at < self.reset_seconds:
+            return "open"
+        return "half_open"
+
+    def before_call(self) -> None:
+        state = self.state
+        if state == "closed":
+            return
+        if state == "half_open" and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return
+        self.rejected += 1
+        retry_after = max(0.0, self.opened_at + self.reset_seconds - time.monotonic())
+        raise CircuitOpenError(retry_after)
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+
+    def record_abandoned(self) -> None:
+        """The call was cancelled before its outcome was known"""
+        self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self._trial_in_flight or self.failures >= self.failure_threshold:
+            if self.opened_at is None or self._trial_in_flight:
+                self.opens += 1
+            self.opened_at = time.monotonic()
+            self._trial_in_flight = False
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "failure_threshold": self.failure_threshold,
+            "reset_seconds": self.reset_seconds,
+            "opens": self.opens,
+            "rejected": self.rejected,
+        }
@@ -0,0 +1,59 @@
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.crud.crud_book import book as book_crud
+from app.crud.crud_review import review as review_crud
+from app.crud.crud_similarity import book_similarity as similarity_crud
+from app.db.models import Book as BookModel
+from app.schemas.book import RecommendedBook, SimilarBook
+from app.services.factor_model import factor_model_store
+
+
+class RecommendationService:
+    @staticmethod
+    def _book_fields(book: BookModel) -> Dict[str, Any]:
+        return {
+            "id": book.id,
+            "title": book.title,
+            "author": book.author,
+            "genre": book.genre,
+            "google_books_id": book.google_books_id,
+            "average_rating": round(book.average_rating, 2) if book.average_rating is not None else None,
+            "review_count": book.rating_count,
+        }
+
+    async def get_similar_books(
+        self, db: AsyncSession, *, book_id: int, limit: int
+    ) -> Optional[List[SimilarBook]]:
+        """
+        Books most similar to a book, from the neighbors precomputed by the
+        train_book_similarity task; None when the book does not exist
+        """
+        rows = await similarity_crud.get_neighbors(db, book_id=book_id, limit=limit)
+        if not rows and await book_crud.get(db, id=book_id) is None:
+            return None
+        return [SimilarBook(**self._book_fields(book), similarity=score) for book, score in rows]
+
+    async def get_recommendations(
+        self, db: AsyncSession, *, user_id: int, limit: int
+    ) -> Optional[List[RecommendedBook]]:
+        """
+        The books a user is predicted to like most, best first, leaving out
+        those they have reviewed; scored against the factors trained by the
+        train_book_recommender task. None until a model has been trained.
+        """
+        reviewed = await review_crud.get_book_ids_by_user(db, user_id=user_id)
+        recommended = factor_model_store.recommend(user_id, count=limit, exclude_book_ids=reviewed)
+        if recommended is None:
+            return None
+        books = await book_crud.get_by_ids(db, [book_id for book_id, _ in recommended])
+        # Books deleted since the model was trained are left out
+        return [
+            RecommendedBook(**self._book_fields(books[book_id]), score=round(score, 4))
+            for book_id, score in recommended
+            if book_id in books
+        ]
+
+
+recommendation_service = RecommendationService()
@@ -0,0 +1,239 @@
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+import redis
+import redis.asyncio as aioredis
+from loguru import logger
+
+from app.core.config import settings
+
+# Invalidation tags: every entry depends on the catalog as a whole (bulk
+# changes by background tasks), listing pages on the set of books, rating-ordered
+# pages on every book's rating, and other listing pages and review pages only
+# on the books they show
+CATALOG_TAG = "books"
+LISTING_TAG = "books:list"
+RATING_ORDER_TAG = "books:rating"
+
+
+def book_tag(book_id: int) -> str:
+    return f"book:{book_id}"
+
+
+class MemoryCacheBackend:
+    """In-process LRU of cache entries with per-entry expiry, bounded by entry count"""
+
+    name = "memory"
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._generations: Dict[str, int] = {}
+        self._sequence = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    async def get(self, key: str) -> Optional[Any]:
+        item = self._entries.get(key)
+        if item is None:
+            return None
+        expires_at, entry = item
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            self.expirations += 1
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    async def set(self, key: str, entry: Any, ttl: float) -> None:
+        self._entries[key] = (time.monotonic() + ttl, entry)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    async def sequence(self) -> int:
+        return self._sequence
+
+    async def generations(self, tags: List[str]) -> List[int]:
+        return [self._generations.get(tag, 0) for tag in tags]
+
+    async def bump(self, tags: List[str]) -> None:
+        self._sequence += 1
+        for tag in tags:
+            self._generations[tag] = self._sequence
+
+    def bump_sync(self, tags: List[str]) -> None:
+        # Other processes (Celery workers) cannot reach this process's entries;
+        # they expire within RESPONSE_CACHE_TTL_SECONDS instead
+        pass
+
+    def size(self) -> int:
+        return len(self._entries)
+
+
+class RedisCacheBackend:
+    """
+    Entries and tag generations kept in Redis, shared by every API process and
+    Celery worker. Size is bounded by the Redis maxmemory policy.
+    """
+
+    name = "redis"
+
+    def __init__(self, url: str, prefix: str = "bookrec:cache:"):
+        self.url = url
+        self.prefix = prefix
+        self._client = aioredis.from_url(url)
+        self._sync_client = None
+        self.evictions = 0
+        self.expirations = 0
+
+    async def get(self, key: str) -> Optional[Any]:
+        raw = await self._client.get(self.prefix + key)
+        return json.loads(raw) if raw is not None else None
+
+    async def set(self, key: str, entry: Any, ttl: float) -> None:
+        await self._client.set(self.prefix + key, json.dumps(entry), px=int(ttl * 1000))
+
+    async def sequence(self) -> int:
+        return int(await self._client.get(self.prefix + "sequence") or 0)
+
+    async def generations(self, tags: List[str]) -> List[int]:
+        values = await self._client.mget([f"{self.prefix}gen:{tag}" for tag in tags])
+        return [int(value or 0) for value in values]
+
+    async def bump(self, tags: List[str]) -> None:
+        sequence = await self._client.incr(self.prefix + "sequence")
+        await self._client.mset({f"{self.prefix}gen:{tag}": sequence for tag in tags})
+
+    def bump_sync(self, tags: List[str]) -> None:
+        if self._sync_client is None:
+            self._sync_client = redis.Redis.from_url(self.url)
+        sequence = self._sync_client.incr(self.prefix + "sequence")
+        self._sync_client.mset({f"{self.prefix}gen:{tag}": sequence for tag in tags})
+
+    def size(self) -> Optional[int]:
+        return None
+
+
+class ResponseCache:
+    """
+    Cache of rendered service results, invalidated by tags.
+
+    Every entry records the generation of each of its tags when it was stored;
+    `invalidate(tag)` moves the tag to a new generation, so all entries carrying
+    it turn into misses without having to find them. Generations come from a
+    global sequence, which also lets `get_or_compute` refuse to store a result
+    whose tags were invalidated while it was being computed.
+    Backend errors are logged and treated as misses.
+    """
+
+    def __init__(self):
+        self.backend = None
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.invalidations = 0
+        self.errors = 0
+        self.configure()
+
+    def configure(self) -> None:
+        if settings.RESPONSE_CACHE_BACKEND == "redis":
+            self.backend = RedisCacheBackend(settings.RESPONSE_CACHE_REDIS_URL)
+        elif settings.RESPONSE_CACHE_BACKEND == "memory":
+            self.backend = MemoryCacheBackend(settings.RESPONSE_CACHE_MAX_ENTRIES)
+        else:
+            self.backend = None
+
+    @staticmethod
+    def key(namespace: str, **params: Any) -> str:
+        return f"{namespace}:{json.dumps(params, sort_keys=True, separators=(',', ':'))}"
+
+    async def get_or_compute(
+        self,
+        key: str,
+        compute: Callable[[], Awaitable[Any]],
+        tags: Callable[[Any], Iterable[str]],
+    ) -> Any:
+        """
+        Return the cached value for `key`, or compute, store and return it.
+        `compute` must return a JSON-serializable value; None is never cached.
+        `tags(value)` names what the value depends on, e.g. "book:42".
+        """
+        if self.backend is None:
+            return await compute()
+        try:
+            entry = await self.backend.get(key)
+            if entry is not None:
+                entry_tags = entry["tags"]
+                if await self.backend.generations(list(entry_tags)) == list(entry_tags.values()):
+                    self.hits += 1
+                    return entry["value"]
+                self.stale += 1
+            self.misses += 1
+            sequence = await self.backend.sequence()
+        except Exception as e:
+            self._backend_error(e)
+            return await compute()
+
+        value = await compute()
+        if value is None:
+            return value
+        try:
+            value_tags = sorted(set(tags(value)))
+            generations = await self.backend.generations(value_tags)
+            if max(generations, default=0) <= sequence:
+                await self.backend.set(
+                    key,
+                    {"tags": dict(zip(value_tags, generations)), "value": value},
+                    settings.RESPONSE_CACHE_TTL_SECONDS,
+                )
+        except Exception as e:
+            self._backend_error(e)
+        return value
+
+    async def invalidate(self, *tags: str) -> None:
+        if self.backend is None or not tags:
+            return
+        self.invalidations += 1
+        try:
+            await self.backend.bump(list(tags))
+        except Exception as e:
+            self._backend_error(e)
+
+    def invalidate_sync(self, *tags: str) -> None:
+        """invalidate() for synchronous callers such as Celery tasks"""
+        if self.backend is None or not tags:
+            return
+        self.invalidations += 1
+        try:
+            self.backend.bump_sync(list(tags))
+        except Exception as e:
+            self._backend_error(e)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "backend": self.backend.name if self.backend else "off",
+            "entries": self.backend.size() if self.backend else 0,
+            "max_entries": settings.RESPONSE_CACHE_MAX_ENTRIES,
+            "ttl_seconds": settings.RESPONSE_CACHE_TTL_SECONDS,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+            # Misses caused by an invalidated tag
+            "stale": self.stale,
+            "evictions": self.backend.evictions if self.backend else 0,
+            "expirations": self.backend.expirations if self.backend else 0,
+            "invalidations": self.invalidations,
+            "errors": self.errors,
+        }
+
+    def _backend_error(self, e: Exception) -> None:
+        self.errors += 1
+        logger.warning(f"Response cache backend error: {e}")
+
+
+response_cache = ResponseCache()
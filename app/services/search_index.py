@@ -0,0 +1,260 @@
+import asyncio
+import math
+import re
+import time
+import zlib
+from array import array
+from datetime import timedelta
+from bisect import bisect_left, bisect_right
+from collections import Counter
+from typing import Dict, List, NamedTuple, Optional, Set
+
+from loguru import logger
+from sqlalchemy import func, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.db.models import Book as BookModel
+
+_NON_WORD = re.compile(r"[^\w]+")
+
+
+def normalize(text: str) -> str:
+    return _NON_WORD.sub(" ", text.lower()).strip()
+
+
+def document_trigrams(text: str) -> Set[str]:
+    """Trigrams of every word, padded on both sides so word boundaries are indexed"""
+    grams = set()
+    for word in normalize(text).split():
+        padded = f" {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def query_trigrams(word: str) -> Set[str]:
+    """Trigrams of a query word, padded on the left only so it matches word prefixes"""
+    padded = f" {word}"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class SearchResult(NamedTuple):
+    ids: List[int]
+    # True when every query trigram matched (the caller should recheck the words);
+    # False for typo-tolerant matches
+    exact: bool
+    # True when more matches exist beyond the returned ids
+    truncated: bool
+
+
+class TrigramIndex:
+    """
+    Inverted index from trigram to the sorted ids of the books containing it.
+
+    Posting lists are `array('I')` (4 bytes per entry, no per-id Python objects).
+    Appends of increasing ids keep them sorted; out-of-order appends mark the list
+    for a lazy sort/dedupe on next read. Updates only add postings: trigrams a book
+    no longer has stay behind as stale candidates, which callers filter out by
+    rechecking the words, and `stale_documents` tells when a rebuild is worthwhile.
+    """
+
+    def __init__(self):
+        self._postings: Dict[str, array] = {}
+        self._unsorted: Set[str] = set()
+        # crc32 of each book's normalized text, indexed by book id (0 = not indexed)
+        self._doc_hashes = array("I")
+        self.document_count = 0
+        self.stale_documents = 0
+
+    def add(self, book_id: int, title: str, author: str, genre: str) -> bool:
+        """Index or re-index a book. Returns False if its text is unchanged."""
+        text = f"{title} {author} {genre}"
+        doc_hash = zlib.crc32(normalize(text).encode()) or 1
+        if book_id >= len(self._doc_hashes):
+            self._doc_hashes.extend(array("I", bytes(4 * (book_id + 1 - len(self._doc_hashes)))))
+        previous = self._doc_hashes[book_id]
+        if previous == doc_hash:
+            return False
+        if previous:
+            self.stale_documents += 1
+        else:
+            self.document_count += 1
+        self._doc_hashes[book_id] = doc_hash
+
+        for gram in document_trigrams(text):
+            postings = self._postings.get(gram)
+            if postings is None:
+                self._postings[gram] = array("I", (book_id,))
+                continue
+            if postings[-1] >= book_id:
+                self._unsorted.add(gram)
+            postings.append(book_id)
+        return True
+
+    def postings(self, gram: str) -> array:
+        if gram in self._unsorted:
+            self._postings[gram] = array("I", sorted(set(self._postings[gram])))
+            self._unsorted.discard(gram)
+        return self._postings.get(gram, array("I"))
+
+    def memory_bytes(self) -> int:
+        """Approximate size of the posting and hash arrays"""
+        return sum(p.buffer_info()[1] * p.itemsize for p in self._postings.values()) + \
+            self._doc_hashes.buffer_info()[1] * self._doc_hashes.itemsize
+
+    def search_exact(self, words: List[str], *, after_id: int, limit: int) -> Optional[SearchResult]:
+        """
+        Ids (ascending, greater than `after_id`) of books containing every trigram
+        of every query word. Returns None if the words are too short to index.
+        """
+        grams: Set[str] = set()
+        for word in words:
+            grams |= query_trigrams(word)
+        if not grams:
+            return None
+        lists = sorted((self.postings(gram) for gram in grams), key=len)
+        if not lists[0]:
+            return SearchResult([], True, False)
+
+        # Walk the shortest list and probe the others with binary search,
+        # stopping as soon as the page of candidates is full
+        shortest, others = lists[0], lists[1:]
+        ids: List[int] = []
+        for candidate in shortest[bisect_right(shortest, after_id):]:
+            if all(self._contains(postings, candidate) for postings in others):
+                if len(ids) == limit:
+                    return SearchResult(ids, True, True)
+                ids.append(candidate)
+        return SearchResult(ids, True, False)
+
+    def search_fuzzy(self, words: List[str], *, limit: int) -> List[int]:
+        """
+        Typo-tolerant fallback: ids of books sharing most of the query's trigrams,
+        best overlap first. Trigrams present in more than 5% of books are ignored
+        as they carry little signal and dominate the counting cost.
+        """
+        grams: Set[str] = set()
+        for word in words:
+            grams |= query_trigrams(word)
+        common = max(100, self.document_count // 20)
+        selective = [self.postings(gram) for gram in grams]
+        selective = [postings for postings in selective if 0 < len(postings) <= common]
+        if not selective:
+            return []
+        # A single edit changes at most three trigrams of a word
+        threshold = max(1, len(selective) - 3 * len(words), math.ceil(len(selective) / 2))
+        counts = Counter()
+        for postings in selective:
+            counts.update(postings)
+        ranked = sorted(
+            (book_id for book_id, count in counts.items() if count >= threshold),
+            key=lambda book_id: (-counts[book_id], book_id),
+        )
+        return ranked[:limit]
+
+    @staticmethod
+    def _contains(postings: array, value: int) -> bool:
+        i = bisect_left(postings, value)
+        return i < len(postings) and postings[i] == value
+
+
+class BookSearchIndex:
+    """
+    Process-local trigram index over book title, author and genre.
+
+    Built at startup, updated directly by in-process writes (Google imports) and
+    caught up from the database at most every BOOK_SEARCH_INDEX_SYNC_SECONDS for
+    writes made by other processes such as the Celery refresh tasks: new books are
+    found by id, changed books by their `updated_at` watermark.
+    """
+
+    def __init__(self):
+        self.index: Optional[TrigramIndex] = None
+        self.max_id = 0
+        self.watermark = None
+        self.last_sync = 0.0
+        self._lock = asyncio.Lock()
+
+    @property
+    def ready(self) -> bool:
+        return self.index is not None
+
+    async def build(self, db: AsyncSession) -> None:
+        """(Re)build the index from the book table, swapping it in when complete"""
+        started = time.perf_counter()
+        # Taken from the database clock so it compares cleanly with updated_at
+        watermark = await db.scalar(select(func.now()))
+        index = TrigramIndex()
+        max_id = 0
+        result = await db.stream(
+            select(
+                BookModel.id, BookModel.title, BookModel.author, BookModel.genre
+            ).execution_options(yield_per=10_000)
+        )
+        async for book_id, title, author, genre in result:
+            index.add(book_id, title, author, genre)
+            max_id = max(max_id, book_id)
+
+        self.index, self.max_id, self.watermark = index, max_id, watermark
+        self.last_sync = time.monotonic()
+        logger.info(
+            f"Built book search index: {index.document_count} books, "
+            f"{index.memory_bytes() / 2**20:.1f} MiB in {time.perf_counter() - started:.1f}s"
+        )
+
+    async def sync(self, db: AsyncSession, *, force: bool = False) -> None:
+        """Pick up books inserted or changed by other processes since the last sync"""
+        if not self.ready:
+            return
+        if not force and time.monotonic() - self.last_sync < settings.BOOK_SEARCH_INDEX_SYNC_SECONDS:
+            return
+        async with self._lock:
+            watermark = await db.scalar(select(func.now()))
+            # Overlap by a second since some backends store updated_at with second
+            # precision; rows re-read this way are skipped by the content hash
+            result = await db.execute(
+                select(BookModel.id, BookModel.title, BookModel.author, BookModel.genre).where(
+                    or_(
+                        BookModel.id > self.max_id,
+                        BookModel.updated_at >= self.watermark - timedelta(seconds=1),
+                    )
+                )
+            )
+            for book_id, title, author, genre in result:
+                self.add_book(book_id, title, author, genre)
+            self.watermark = watermark
+            self.last_sync = time.monotonic()
+
+            if self.index.stale_documents > max(1000, self.index.document_count // 5):
+                logger.info("Book search index has many stale postings, rebuilding")
+                await self.build(db)
+
+    def add_book(self, book_id: int, title: str, author: str, genre: str) -> None:
+        if not self.ready:
+            return
+        self.index.add(book_id, title, author, genre)
+        self.max_id = max(self.max_id, book_id)
+
+    def search(
+        self, search: str, *, after_id: int = 0, limit: Optional[int] = None
+    ) -> Optional[SearchResult]:
+        """
+        Candidate book ids for a search, ascending by id after `after_id`.
+        Falls back to typo-tolerant matching when nothing matches exactly.
+        Returns None when the index cannot answer (not built, or no indexable words).
+        """
+        if not self.ready:
+            return None
+        words = normalize(search).split()
+        limit = limit or settings.BOOK_SEARCH_INDEX_MAX_CANDIDATES
+        result = self.index.search_exact(words, after_id=after_id, limit=limit)
+        if result is None or result.ids:
+            return result
+        if after_id and self.index.search_exact(words, after_id=0, limit=1).ids:
+            # Exact matches exist; this page is simply past the last of them
+            return result
+        fuzzy_ids = sorted(self.index.search_fuzzy(words, limit=limit))
+        return SearchResult([i for i in fuzzy_ids if i > after_id], False, False)
+
+
+book_search_index = BookSearchIndex()
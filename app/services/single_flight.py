@@ -0,0 +1,49 @@
+import asyncio
+from collections import Counter
+from typing import Any, Awaitable, Callable, Dict
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls for the same key: the first caller starts the
+    call, later callers arriving before it completes await the same result (or
+    exception) instead of starting their own.
+
+    The call runs in its own task and callers await it through `asyncio.shield`,
+    so a cancelled caller (e.g. a client disconnecting) neither cancels it nor
+    fails the others. Coalesced callers are counted per key for the `top_keys`
+    most coalesced keys.
+    """
+
+    def __init__(self, top_keys: int = 20):
+        self.top_keys = top_keys
+        self._calls: Dict[str, asyncio.Task] = {}
+        self._coalesced_by_key: Counter = Counter()
+        self.calls = 0
+        self.executions = 0
+        self.coalesced = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        self.calls += 1
+        task = self._calls.get(key)
+        if task is None:
+            self.executions += 1
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda _: self._calls.pop(key, None))
+        else:
+            self.coalesced += 1
+            self._coalesced_by_key[key] += 1
+            if len(self._coalesced_by_key) > 2 * self.top_keys:
+                self._coalesced_by_key = Counter(dict(self._coalesced_by_key.most_common(self.top_keys)))
+        return await asyncio.shield(task)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._calls),
+            # Approximate: keys falling out of the top list lose their counts
+            "top_coalesced_keys": dict(self._coalesced_by_key.most_common(self.top_keys)),
+        }
@@ -0,0 +1,262 @@
+"""
+Rating analytics: rating distributions per book, per genre and per month,
+with means, variances, nearest-rank percentiles and Bayesian averages.
+
+Reviews are read as (book_id, rating, month) integer rows, a batch at a time,
+straight from the DB-API cursor and folded into rating histograms with
+np.add.at, so memory is bounded by the number of books (and months), not of
+reviews. Everything else is derived from the histograms with array
+operations: genres are aggregated from the book histograms through a book id
+-> genre lookup array (np.add.reduceat) instead of a join.
+"""
+import itertools
+import time
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Tuple
+
+import numpy as np
+from sqlalchemy import Integer, cast, delete, extract, func, insert, select
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import Select
+
+from app.core.config import settings
+from app.db.models import Book, BookRatingStatistics, BookStatistics, Review
+
+RATING_LEVELS = 5
+PERCENTILES = (10, 25, 50, 75, 90)
+# Rows per executemany when replacing book_rating_statistics
+WRITE_CHUNK_SIZE = 10_000
+
+
+def month_index(column):
+    """year * 12 + month - 1 of a timestamp column, 0 when NULL"""
+    if settings.DB_TYPE == "postgres":
+        month = extract("year", column) * 12 + extract("month", column) - 1
+    else:
+        # Stored as 'YYYY-MM-DD HH:MM:SS'; slicing it is cheaper than strftime
+        month = (
+            cast(func.substr(column, 1, 4), Integer) * 12
+            + cast(func.substr(column, 6, 2), Integer) - 1
+        )
+    return func.coalesce(cast(month, Integer), 0)
+
+
+def stream_int_rows(db: Session, stmt: Select, batch_size: int) -> Iterator["np.ndarray"]:
+    """
+    Rows of a SELECT of integer columns as (rows, columns) int64 arrays of up
+    to batch_size rows. Plain tuples are fetched from the DB-API cursor (a
+    server-side one on Postgres): building SQLAlchemy Row objects would cost
+    more than all of the analytics.
+    """
+    columns = len(stmt.selected_columns)
+    sql = str(stmt.compile(dialect=db.get_bind().dialect, compile_kwargs={"literal_binds": True}))
+    connection = db.connection().connection
+    cursor = connection.cursor("rating_analytics") if settings.DB_TYPE == "postgres" else connection.cursor()
+    try:
+        cursor.execute(sql)
+        while rows := cursor.fetchmany(batch_size):
+            flat = np.fromiter(itertools.chain.from_iterable(rows), np.int64, count=len(rows) * columns)
+            yield flat.reshape(len(rows), columns)
+    finally:
+        cursor.close()
+
+
+def genre_lookup(db: Session) -> Tuple[List[str], "np.ndarray"]:
+    """Genre names, and an array mapping book ids to genre codes (-1: no such book)"""
+    rows = db.execute(select(Book.id, Book.genre)).all()
+    codes: Dict[str, int] = {}
+    ids = np.fromiter((row.id for row in rows), np.int64, count=len(rows))
+    genre_codes = np.fromiter(
+        (codes.setdefault(row.genre, len(codes)) for row in rows), np.int64, count=len(rows)
+    )
+    lookup = np.full(ids.max() + 1 if len(rows) else 0, -1, dtype=np.int64)
+    lookup[ids] = genre_codes
+    return list(codes), lookup
+
+
+def _count(total: "np.ndarray", keys: "np.ndarray") -> "np.ndarray":
+    """
+    Add one to total at each key, in place (np.add.at, no per-batch array the
+    size of total), growing total first if a key is past its end
+    """
+    if len(keys) and keys.max() >= len(total):
+        total = np.pad(total, (0, max(int(keys.max()) + 1, 2 * len(total)) - len(total)))
+    np.add.at(total, keys, 1)
+    return total
+
+
+def _histograms(counts: "np.ndarray") -> "np.ndarray":
+    """Counts over key * RATING_LEVELS + rating - 1 -> (keys, RATING_LEVELS) array"""
+    return np.pad(counts, (0, -len(counts) % RATING_LEVELS)).reshape(-1, RATING_LEVELS)
+
+
+def fold_ratings(batches: Iterable["np.ndarray"]) -> Tuple["np.ndarray", "np.ndarray"]:
+    """
+    Histograms of the 1 to 5 star ratings in (book_id, rating, month_index)
+    row batches, by book (indexed by book id) and by month (indexed by month
+    index)
+    """
+    by_book = np.zeros(0, dtype=np.int64)
+    by_month = np.zeros(0, dtype=np.int64)
+    for batch in batches:
+        level = batch[:, 1] - 1
+        by_book = _count(by_book, batch[:, 0] * RATING_LEVELS + level)
+        by_month = _count(by_month, batch[:, 2] * RATING_LEVELS + level)
+    return _histograms(by_book), _histograms(by_month)
+
+
+def rating_histograms(db: Session, batch_size: int) -> Tuple["np.ndarray", "np.ndarray"]:
+    """fold_ratings() of every review, read batch_size rows at a time"""
+    stmt = select(
+        Review.book_id, Review.rating, month_index(Review.created_at)
+    ).where(Review.rating.between(1, RATING_LEVELS))
+    return fold_ratings(stream_int_rows(db, stmt, batch_size))
+
+
+def summarize(histograms: "np.ndarray") -> Dict[str, Any]:
+    """
+    Rating count, sum, mean, population variance and nearest-rank percentiles
+    of each row of a (rows, RATING_LEVELS) histogram array. Rows must have
+    ratings (the mean of an empty row is NaN).
+    """
+    levels = np.arange(1, RATING_LEVELS + 1)
+    ratings = histograms.sum(axis=1)
+    sums = histograms @ levels
+    mean = sums / ratings
+    variance = np.maximum(histograms @ levels**2 / ratings - mean**2, 0.0)
+    cumulative = histograms.cumsum(axis=1)
+    percentiles = {
+        # The rank-th smallest rating, rank = ceil(p% of the ratings)
+        f"p{p}": 1 + (cumulative < ((ratings * p + 99) // 100)[:, None]).sum(axis=1)
+        for p in PERCENTILES
+    }
+    return {"ratings": ratings, "sum": sums, "mean": mean, "variance": variance, "percentiles": percentiles}
+
+
+def distributions(histograms: "np.ndarray") -> List[Dict[str, Any]]:
+    """summarize() of each histogram as JSON-ready dicts"""
+    summary = summarize(histograms)
+    columns = {
+        "ratings": summary["ratings"].tolist(),
+        "histogram": histograms.tolist(),
+        "mean": summary["mean"].round(4).tolist(),
+        "variance": summary["variance"].round(4).tolist(),
+    }
+    percentiles = {name: values.tolist() for name, values in summary["percentiles"].items()}
+    return [
+        {
+            **{name: values[i] for name, values in columns.items()},
+            "percentiles": {name: values[i] for name, values in percentiles.items()},
+        }
+        for i in range(len(histograms))
+    ]
+
+
+def month_label(index: int) -> str:
+    return f"{index // 12:04d}-{index % 12 + 1:02d}"
+
+
+def replace_book_rating_statistics(
+    db: Session, book_ids: "np.ndarray", histograms: "np.ndarray", bayesian: "np.ndarray"
+) -> None:
+    """Replace the rows of book_rating_statistics, in the current transaction"""
+    db.execute(delete(BookRatingStatistics))
+    for start in range(0, len(book_ids), WRITE_CHUNK_SIZE):
+        chunk = slice(start, start + WRITE_CHUNK_SIZE)
+        rows = [
+            {**row, "book_id": book_id, "bayesian_average": average}
+            for row, book_id, average in zip(
+                distributions(histograms[chunk]),
+                book_ids[chunk].tolist(),
+                bayesian[chunk].round(4).tolist(),
+            )
+        ]
+        db.execute(insert(BookRatingStatistics), rows)
+
+
+class BookRatings(NamedTuple):
+    """Rated catalog books, their rating histograms and Bayesian averages"""
+    book_ids: "np.ndarray"
+    histograms: "np.ndarray"
+    bayesian_averages: "np.ndarray"
+
+
+def analyze(
+    by_book: "np.ndarray", by_month: "np.ndarray", genres: List[str], genre_of: "np.ndarray"
+) -> Tuple[Dict[str, Any], BookRatings]:
+    """
+    The rating analytics stored in the statistics snapshot, from the
+    histograms of fold_ratings() and the genre_lookup() of the catalog.
+    Reviews of books missing from the catalog only count in the overall and
+    monthly distributions.
+    """
+    book_genres = np.full(len(by_book), -1, dtype=np.int64)
+    known = min(len(by_book), len(genre_of))
+    book_genres[:known] = genre_of[:known]
+    book_ids = np.flatnonzero(by_book.any(axis=1) & (book_genres >= 0))
+    book_histograms = by_book[book_ids]
+    book_genres = book_genres[book_ids]
+
+    overall = by_month.sum(axis=0)
+    ratings = int(overall.sum())
+    prior_mean = float(overall @ np.arange(1, RATING_LEVELS + 1) / ratings) if ratings else 0.0
+    prior_weight = settings.RATING_ANALYTICS_PRIOR_WEIGHT
+    if prior_weight is None:
+        prior_weight = float(book_histograms.sum() / len(book_ids)) if len(book_ids) else 0.0
+    per_book = summarize(book_histograms)
+    bayesian = (prior_weight * prior_mean + per_book["sum"]) / (prior_weight + per_book["ratings"])
+
+    # Book histograms summed per genre: sort the books by genre and reduce each run
+    order = np.argsort(book_genres, kind="stable")
+    sorted_genres = book_genres[order]
+    starts = np.flatnonzero(np.diff(sorted_genres, prepend=-1))
+    genre_histograms = np.add.reduceat(book_histograms[order], starts, axis=0) if len(starts) else book_histograms
+    books_rated = np.diff(np.append(starts, len(order)))
+
+    months = np.flatnonzero(by_month[1:].any(axis=1)) + 1  # 0: no created_at
+    top_count = min(settings.RATING_ANALYTICS_TOP_BOOKS, len(book_ids))
+    top = np.argpartition(-bayesian, top_count - 1)[:top_count] if top_count else np.zeros(0, dtype=np.int64)
+    top = top[np.argsort(-bayesian[top], kind="stable")]
+
+    analytics = {
+        "ratings": ratings,
+        "books_rated": len(book_ids),
+        "prior_mean": round(prior_mean, 4),
+        "prior_weight": round(prior_weight, 4),
+        "overall": distributions(overall[None, :])[0] if ratings else None,
+        "genres": {
+            genres[code]: {"books_rated": count, **distribution}
+            for code, count, distribution in zip(
+                sorted_genres[starts].tolist(), books_rated.tolist(), distributions(genre_histograms)
+            )
+        },
+        "monthly": {
+            month_label(month): distribution
+            for month, distribution in zip(months.tolist(), distributions(by_month[months]))
+        },
+        "top_books": [
+            {
+                "book_id": int(book_ids[i]),
+                "ratings": int(per_book["ratings"][i]),
+                "mean": round(float(per_book["mean"][i]), 4),
+                "bayesian_average": round(float(bayesian[i]), 4),
+            }
+            for i in top.tolist()
+        ],
+    }
+    return analytics, BookRatings(book_ids, book_histograms, bayesian)
+
+
+def compute_rating_analytics(db: Session, snapshot: BookStatistics) -> Dict[str, Any]:
+    """
+    Compute the rating analytics of every review, store them on the snapshot
+    (rating_analytics) and replace book_rating_statistics. Commits.
+    """
+    started = time.perf_counter()
+    genres, genre_of = genre_lookup(db)
+    by_book, by_month = rating_histograms(db, settings.RATING_ANALYTICS_BATCH_SIZE)
+    analytics, books = analyze(by_book, by_month, genres, genre_of)
+    replace_book_rating_statistics(db, *books)
+    analytics["duration_seconds"] = round(time.perf_counter() - started, 3)
+    snapshot.rating_analytics = analytics
+    db.commit()
+    return analytics
@@ -44,6 +44,26 @@ celery.conf.update(
             }
         },
         
+        # Retrain the item-item recommender every day at 4 AM
+        'train-book-similarity-daily': {
+            'task': 'app.tasks.tasks.train_book_similarity',
+            'schedule': crontab(minute=0, hour=4),  # Daily at 4 AM
+            'options': {
+                'queue': 'periodic',
+                'priority': 3,
+            }
+        },
+        
+        # Retrain the personalized recommender every day at 4:30 AM
+        'train-book-recommender-daily': {
+            'task': 'app.tasks.tasks.train_book_recommender',
+            'schedule': crontab(minute=30, hour=4),  # Daily at 4:30 AM
+            'options': {
+                'queue': 'periodic',
+                'priority': 3,
+            }
+        },
+        
         # Optional: Refresh seed data weekly (Sunday at 3 AM)
         'refresh-seed-data-weekly': {
             'task': 'app.tasks.tasks.refresh_book_data_from_source',
@@ -58,8 +78,13 @@ celery.conf.update(
     # Queue configuration
     task_routes={
         'app.tasks.tasks.refresh_book_data_from_google_books': {'queue': 'periodic'},
+        'app.tasks.tasks.enrich_google_books_chunk': {'queue': 'periodic'},
+        'app.tasks.tasks.summarize_google_books_enrichment': {'queue': 'periodic'},
         'app.tasks.tasks.calculate_book_statistics': {'queue': 'periodic'},
         'app.tasks.tasks.refresh_book_data_from_source': {'queue': 'periodic'},
+        'app.tasks.tasks.recalculate_book_rating_aggregates': {'queue': 'periodic'},
+        'app.tasks.tasks.train_book_similarity': {'queue': 'periodic'},
+        'app.tasks.tasks.train_book_recommender': {'queue': 'periodic'},
         'app.tasks.tasks.send_new_book_notification': {'queue': 'notifications'},
     },
 )
@@ -71,4 +96,9 @@ celery.conf.task_annotations = {
         'time_limit': 300,  # 5 minutes max execution time
         'soft_time_limit': 240,  # Soft limit at 4 minutes
     },
+    # Each chunk stops starting new batches after GOOGLE_BOOKS_ENRICHMENT_TIME_BUDGET_SECONDS
+    'app.tasks.tasks.enrich_google_books_chunk': {
+        'time_limit': 300,
+        'soft_time_limit': 240,
+    },
 }
\ No newline at end of file
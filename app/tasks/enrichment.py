@@ -0,0 +1,279 @@
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from loguru import logger
+from sqlalchemy import and_, bindparam, case, exists, func, or_, select, update
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.crud.crud_statistics import apply_deltas_sync, new_deltas
+from app.db.models import Book
+from app.services.google_books_service import GoogleBooksUnavailable, google_books_service
+from app.services.response_cache import CATALOG_TAG, response_cache
+from app.tasks.worker import run_async
+
+book_table = Book.__table__
+
+
+class Candidate(NamedTuple):
+    id: int
+    title: str
+    author: str
+    google_books_id: Optional[str]
+    genre: str
+
+
+class ChunkResult(NamedTuple):
+    enriched: int
+    unmatched: int
+    # Left pending for a later run: lookup errors, and lookups refused while
+    # Google Books was unavailable
+    failed_ids: List[int]
+    unavailable: bool
+
+
+def pending_books_stmt(*, stale_before: datetime):
+    """Books never enriched, or last enriched before `stale_before`, in id order"""
+    return (
+        select(Book.id, Book.title, Book.author, Book.google_books_id, Book.genre)
+        .where(or_(Book.enriched_at.is_(None), Book.enriched_at < stale_before))
+        .order_by(Book.id)
+    )
+
+
+def stale_before() -> datetime:
+    return datetime.now(timezone.utc) - timedelta(days=settings.GOOGLE_BOOKS_ENRICHMENT_STALE_DAYS)
+
+
+def pending_id_ranges(db: Session, *, range_size: int) -> List[Tuple[int, int, int]]:
+    """
+    Partition the pending books into consecutive id ranges of `range_size`
+    books each, as (first_id, last_id, books). Only ids are read, streamed.
+    """
+    ids = db.execute(
+        select(Book.id)
+        .where(pending_books_stmt(stale_before=stale_before()).whereclause)
+        .order_by(Book.id)
+        .execution_options(yield_per=10_000)
+    ).scalars()
+    ranges: List[Tuple[int, int, int]] = []
+    first_id = last_id = None
+    books = 0
+    for book_id in ids:
+        if first_id is None:
+            first_id = book_id
+        last_id = book_id
+        books += 1
+        if books == range_size:
+            ranges.append((first_id, last_id, books))
+            first_id, books = None, 0
+    if books:
+        ranges.append((first_id, last_id, books))
+    return ranges
+
+
+async def lookup_books(candidates: Sequence[Candidate], *, concurrency: int) -> List[Any]:
+    """
+    Look every candidate up concurrently, at most `concurrency` at a time, over
+    the service's pooled client. Books already linked are refreshed from their
+    volume, others searched by title and author. Returns per candidate the
+    matched volume, None, or the exception raised.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def lookup(book: Candidate) -> Optional[Dict[str, Any]]:
+        async with semaphore:
+            if book.google_books_id:
+                return await google_books_service.get_book_details(book.google_books_id)
+            results = await google_books_service.search_books(
+                query=f"{book.title} {book.author}", max_results=3
+            )
+            # Take the first result as the best match
+            return results[0] if results else None
+
+    return await asyncio.gather(*(lookup(book) for book in candidates), return_exceptions=True)
+
+
+def enrich_books(db: Session, candidates: Sequence[Candidate], *, concurrency: int) -> ChunkResult:
+    """
+    Look up a chunk of books and write the results with two executemany UPDATEs
+    in one transaction, with the catalog statistics counters. Matched and unmatched books get `enriched_at` set, so
+    the next run skips them until they go stale; failed ones stay pending.
+    """
+    outcomes = run_async(lookup_books(candidates, concurrency=concurrency))
+
+    matches: List[Dict[str, Any]] = []
+    unmatched: List[Dict[str, Any]] = []
+    failed_ids: List[int] = []
+    unavailable = False
+    for book, outcome in zip(candidates, outcomes):
+        if isinstance(outcome, GoogleBooksUnavailable):
+            unavailable = True
+            failed_ids.append(book.id)
+        elif isinstance(outcome, Exception):
+            logger.error(f"❌ Error enriching book '{book.title}': {outcome}")
+            failed_ids.append(book.id)
+        elif outcome is None:
+            unmatched.append({"book_id": book.id})
+        else:
+            matches.append({
+                "book_id": book.id,
+                "new_google_books_id": outcome.get("google_books_id"),
+                "new_description": outcome.get("description") or None,
+                "new_page_count": outcome.get("page_count") or None,
+                "new_thumbnail_url": outcome.get("thumbnail") or None,
+                "new_isbn": outcome.get("isbn") or None,
+                "new_author": ", ".join(outcome["authors"]) if outcome.get("authors") else None,
+            })
+
+    _drop_taken_google_books_ids(db, matches)
+    # Books linked to a volume for the first time count in their genre's statistics
+    unlinked_genres = {book.id: book.genre for book in candidates if book.google_books_id is None}
+    statistics = new_deltas()
+    for match in matches:
+        if match["new_google_books_id"] and match["book_id"] in unlinked_genres:
+            statistics[unlinked_genres[match["book_id"]]]["books_with_google_id"] += 1
+    if matches:
+        db.execute(
+            update(book_table)
+            .where(book_table.c.id == bindparam("book_id"))
+            .values(
+                google_books_id=func.coalesce(bindparam("new_google_books_id"), book_table.c.google_books_id),
+                description=func.coalesce(bindparam("new_description"), book_table.c.description),
+                page_count=func.coalesce(bindparam("new_page_count"), book_table.c.page_count),
+                thumbnail_url=func.coalesce(bindparam("new_thumbnail_url"), book_table.c.thumbnail_url),
+                isbn=func.coalesce(bindparam("new_isbn"), book_table.c.isbn),
+                author=case(
+                    (and_(bindparam("new_author").isnot(None), ~_title_author_taken()), bindparam("new_author")),
+                    else_=book_table.c.author,
+                ),
+                enriched_at=func.now(),
+            ),
+            matches,
+        )
+    if unmatched:
+        db.execute(
+            update(book_table).where(book_table.c.id == bindparam("book_id")).values(enriched_at=func.now()),
+            unmatched,
+        )
+    apply_deltas_sync(db, statistics)
+    db.commit()
+    if matches:
+        response_cache.invalidate_sync(CATALOG_TAG)
+    return ChunkResult(len(matches), len(unmatched), failed_ids, unavailable)
+
+
+def _title_author_taken():
+    """
+    Whether another book already has the book's title with the new author:
+    (title, author) is unique, so such books keep their author
+    """
+    other = book_table.alias("other")
+    return exists().where(
+        func.lower(func.trim(other.c.title)) == func.lower(func.trim(book_table.c.title)),
+        func.lower(func.trim(other.c.author)) == func.lower(func.trim(bindparam("new_author"))),
+        other.c.id != book_table.c.id,
+    )
+
+
+def _drop_taken_google_books_ids(db: Session, matches: List[Dict[str, Any]]) -> None:
+    """
+    google_books_id is unique: keep the book's own id when the matched volume
+    already belongs to another book, or to an earlier book of the chunk
+    """
+    wanted = {m["new_google_books_id"] for m in matches if m["new_google_books_id"]}
+    if not wanted:
+        return
+    owners = dict(db.execute(
+        select(Book.google_books_id, Book.id).where(Book.google_books_id.in_(wanted))
+    ).all())
+    for match in matches:
+        google_books_id = match["new_google_books_id"]
+        owner = owners.get(google_books_id)
+        if owner is not None and owner != match["book_id"]:
+            logger.warning(
+                f"⚠️ Google Books volume {google_books_id} already belongs to book {owner}, "
+                f"not linking book {match['book_id']}"
+            )
+            match["new_google_books_id"] = None
+        elif google_books_id:
+            owners[google_books_id] = match["book_id"]
+
+
+def enrich_pending_books(
+    db: Session,
+    *,
+    first_id: int = 0,
+    last_id: Optional[int] = None,
+    book_ids: Sequence[int] = (),
+    chunk_size: Optional[int] = None,
+    concurrency: Optional[int] = None,
+    time_budget: Optional[float] = None,
+) -> Dict[str, Any]:
+    """
+    Enrich pending books chunk by chunk, in id order, committing each chunk.
+    The committed `enriched_at` values are the checkpoint: a run that stops
+    (time budget spent, Google Books unavailable, worker killed) loses at most
+    the chunk in flight, and the next run resumes with the books still pending.
+
+    Only pending books with ids in [first_id, last_id], or among `book_ids`,
+    are enriched; by default all of them.
+    """
+    chunk_size = chunk_size or settings.GOOGLE_BOOKS_ENRICHMENT_CHUNK_SIZE
+    concurrency = concurrency or settings.GOOGLE_BOOKS_ENRICHMENT_CONCURRENCY
+    time_budget = time_budget if time_budget is not None else settings.GOOGLE_BOOKS_ENRICHMENT_TIME_BUDGET_SECONDS
+    started = time.monotonic()
+    in_scope = Book.id >= first_id
+    if last_id is not None:
+        in_scope = in_scope & (Book.id <= last_id)
+    if book_ids:
+        in_scope = or_(in_scope, Book.id.in_(book_ids))
+    stmt = pending_books_stmt(stale_before=stale_before()).where(in_scope)
+
+    summary = {"books_enriched": 0, "books_unmatched": 0, "books_failed": 0, "chunks": 0}
+    failed_ids: List[int] = []
+    stopped_by = None
+    cursor = 0
+    while True:
+        if time.monotonic() - started > time_budget:
+            stopped_by = "time_budget"
+            break
+        # Keyset chunks rather than one cursor held open across the commits
+        candidates = [
+            Candidate(*row) for row in db.execute(stmt.where(Book.id > cursor).limit(chunk_size))
+        ]
+        if not candidates:
+            break
+        cursor = candidates[-1].id
+
+        result = enrich_books(db, candidates, concurrency=concurrency)
+        summary["chunks"] += 1
+        summary["books_enriched"] += result.enriched
+        summary["books_unmatched"] += result.unmatched
+        summary["books_failed"] += len(result.failed_ids)
+        failed_ids.extend(result.failed_ids)
+        logger.info(
+            f"📦 Enriched chunk up to book {cursor}: {result.enriched} matched, "
+            f"{result.unmatched} unmatched, {len(result.failed_ids)} failed"
+        )
+        if result.unavailable:
+            # Throttled or down: stop, the remaining books stay pending
+            stopped_by = "google_books_unavailable"
+            logger.warning(f"⏸️ Google Books unavailable, stopping enrichment after book {cursor}")
+            break
+
+    elapsed = time.monotonic() - started
+    processed = summary["books_enriched"] + summary["books_unmatched"]
+    summary.update({
+        "total_processed": processed,
+        "complete": stopped_by is None,
+        "stopped_by": stopped_by,
+        # Every pending book up to here was looked up, except failed_ids
+        "last_book_id": cursor,
+        "failed_ids": failed_ids,
+        "elapsed_seconds": round(elapsed, 2),
+        "books_per_second": round(processed / elapsed, 1) if elapsed else None,
+    })
+    return summary
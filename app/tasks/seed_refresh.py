@@ -0,0 +1,181 @@
+import json
+from typing import IO, Any, Dict, Iterable, Iterator, List
+
+from loguru import logger
+from pydantic import ValidationError
+from sqlalchemy import Column, MetaData, Table, and_, delete, func, insert, select, true, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import Connection
+
+from app.core.config import settings
+from app.crud.crud_statistics import apply_deltas_sync, count_book, new_deltas
+from app.db.models import Book
+from app.schemas.book import BookCreate
+
+book_table = Book.__table__
+SEED_COLUMNS = list(BookCreate.model_fields)
+
+# Per-connection staging table for one batch of the feed
+staging_metadata = MetaData()
+seed_staging = Table(
+    "book_seed_staging",
+    staging_metadata,
+    *(Column(name, book_table.c[name].type) for name in SEED_COLUMNS),
+    prefixes=["TEMPORARY"],
+)
+
+
+def iter_feed(path: str) -> Iterator[Dict[str, Any]]:
+    """
+    Stream the books of a feed file: NDJSON (.ndjson/.jsonl, one object per
+    line) or a JSON array of objects, read incrementally either way.
+    """
+    with open(path, encoding="utf-8") as f:
+        if path.endswith((".ndjson", ".jsonl")):
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            yield from _iter_json_array(f)
+
+
+def _iter_json_array(f: IO[str], read_size: int = 1 << 16) -> Iterator[Any]:
+    decoder = json.JSONDecoder()
+    buffer = f.read(read_size).lstrip()
+    if not buffer.startswith("["):
+        raise ValueError("Feed must be a JSON array of books")
+    buffer = buffer[1:]
+    expect_comma = False
+    while True:
+        buffer = buffer.lstrip()
+        if not buffer:
+            more = f.read(read_size)
+            if not more:
+                raise ValueError("Feed ends inside the JSON array")
+            buffer = more
+            continue
+        if buffer[0] == "]":
+            return
+        if expect_comma:
+            if buffer[0] != ",":
+                raise ValueError(f"Expected ',' in feed, got {buffer[:20]!r}")
+            buffer = buffer[1:]
+            expect_comma = False
+            continue
+        try:
+            item, end = decoder.raw_decode(buffer)
+        except json.JSONDecodeError:
+            # Most likely an item cut by the read; fail only at end of file
+            more = f.read(read_size)
+            if not more:
+                raise
+            buffer += more
+            continue
+        yield item
+        buffer = buffer[end:]
+        expect_comma = True
+
+
+def _batches(items: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _same_book():
+    """Join condition of staging rows to books, matching uq_book_title_author"""
+    return and_(
+        func.lower(func.trim(book_table.c.title)) == func.lower(func.trim(seed_staging.c.title)),
+        func.lower(func.trim(book_table.c.author)) == func.lower(func.trim(seed_staging.c.author)),
+    )
+
+
+def merge_batch(conn: Connection, rows: List[Dict[str, Any]]) -> Dict[str, int]:
+    """
+    Merge one batch of validated, de-duplicated rows into the book table: load
+    them into the staging table, update the genre of known books with one
+    UPDATE ... FROM and add the others with one INSERT ... SELECT ... ON
+    CONFLICT DO NOTHING. Counts come from the statements' results, and the
+    catalog statistics counters are adjusted in the same transaction.
+    """
+    conn.execute(delete(seed_staging))
+    conn.execute(insert(seed_staging), rows)
+    changed_genre = book_table.c.genre != seed_staging.c.genre
+    statistics = new_deltas()
+    # Books changing genre move between their genres' counters
+    for book in conn.execute(
+        select(
+            book_table.c.genre,
+            seed_staging.c.genre.label("new_genre"),
+            book_table.c.google_books_id,
+            book_table.c.rating_count,
+        ).where(_same_book(), changed_genre)
+    ):
+        counts = {"google_books_id": book.google_books_id, "rating_count": book.rating_count}
+        count_book(statistics, book.genre, **counts, sign=-1)
+        count_book(statistics, book.new_genre, **counts)
+    updated = conn.execute(
+        update(book_table)
+        .values(genre=seed_staging.c.genre)
+        .where(_same_book(), changed_genre)
+    ).rowcount
+    dialect_insert = pg_insert if settings.DB_TYPE == "postgres" else sqlite_insert
+    added = conn.execute(
+        dialect_insert(book_table)
+        .from_select(
+            SEED_COLUMNS,
+            # The WHERE keeps SQLite from parsing ON CONFLICT as a join constraint
+            select(*(seed_staging.c[name] for name in SEED_COLUMNS)).where(true()),
+        )
+        .on_conflict_do_nothing()
+        .returning(book_table.c.genre, book_table.c.google_books_id)
+    ).all()
+    for book in added:
+        count_book(statistics, book.genre, google_books_id=book.google_books_id)
+    apply_deltas_sync(conn, statistics)
+    return {"added": len(added), "updated": updated}
+
+
+def refresh_from_feed(conn: Connection, path: str, *, batch_size: int) -> Dict[str, int]:
+    """
+    Stream the feed at `path` into the catalog batch by batch, committing each
+    batch. Invalid rows are skipped; of rows repeating a (title, author) within
+    a batch, the last one wins. Returns the counts over the whole feed.
+    """
+    totals = {"processed": 0, "added": 0, "updated": 0, "invalid": 0, "duplicates": 0}
+    seed_staging.create(conn)
+    try:
+        for batch in _batches(iter_feed(path), batch_size):
+            rows: Dict[tuple, Dict[str, Any]] = {}
+            invalid = 0
+            for book_data in batch:
+                try:
+                    book_in = BookCreate(**book_data)
+                except (TypeError, ValidationError) as e:
+                    invalid += 1
+                    logger.debug(f"Skipping invalid feed row {book_data!r}: {e}")
+                    continue
+                rows[(book_in.title.strip().lower(), book_in.author.strip().lower())] = book_in.model_dump()
+            totals["processed"] += len(batch)
+            totals["invalid"] += invalid
+            totals["duplicates"] += len(batch) - invalid - len(rows)
+            if rows:
+                counts = merge_batch(conn, list(rows.values()))
+                totals["added"] += counts["added"]
+                totals["updated"] += counts["updated"]
+            conn.commit()
+            logger.debug(f"Merged feed batch: {totals}")
+    finally:
+        conn.rollback()
+        seed_staging.drop(conn)
+        conn.commit()
+    totals["unchanged"] = (
+        totals["processed"] - totals["invalid"] - totals["duplicates"] - totals["added"] - totals["updated"]
+    )
+    return totals
@@ -0,0 +1,145 @@
+"""
+Item-item collaborative filtering: the books most similar to each book, by
+the similarity of the ratings users gave them.
+
+The reviews are loaded into a sparse user x book rating matrix whose columns
+are scaled to unit length, so that its transpose times itself is the cosine
+similarity of every pair of books (adjusted cosine when each user's ratings
+are first centered on their mean). That product is computed a block of books
+at a time, and only the top RECOMMENDER_NEIGHBORS of each book are kept, so
+memory stays bounded by a block of similarities rather than books squared.
+The neighbors are stored in book_similarity, which GET /books/{book_id}/similar
+reads with one primary key range scan.
+"""
+import time
+from typing import Any, Dict, Iterator, NamedTuple, Tuple
+
+import numpy as np
+from scipy import sparse
+from sqlalchemy import delete, insert, select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.models import BookSimilarity, Review
+from app.tasks.analytics import stream_int_rows
+
+# Reviews read per fetch while loading the rating matrix
+READ_BATCH_SIZE = 100_000
+
+
+class Neighbors(NamedTuple):
+    """Top neighbors of a block of books, as column indices of the rating matrix"""
+    sources: "np.ndarray"
+    ranks: "np.ndarray"
+    targets: "np.ndarray"
+    scores: "np.ndarray"
+
+
+def load_ratings(db: Session) -> Tuple["np.ndarray", "np.ndarray", "np.ndarray"]:
+    """user_id, book_id and rating arrays of every review"""
+    stmt = select(Review.user_id, Review.book_id, Review.rating)
+    batches = [batch.astype(np.int32) for batch in stream_int_rows(db, stmt, READ_BATCH_SIZE)]
+    rows = np.concatenate(batches) if batches else np.zeros((0, 3), dtype=np.int32)
+    return rows[:, 0], rows[:, 1], rows[:, 2]
+
+
+def rating_matrix(
+    user_ids: "np.ndarray", book_ids: "np.ndarray", ratings: "np.ndarray", similarity: str
+) -> Tuple["sparse.csr_matrix", "np.ndarray"]:
+    """
+    Sparse users x books matrix of the ratings, with unit-length columns, and
+    the book id of each column
+    """
+    users, user_index = np.unique(user_ids, return_inverse=True)
+    books, book_index = np.unique(book_ids, return_inverse=True)
+    values = ratings.astype(np.float32)
+    if similarity == "adjusted_cosine":
+        # Remove how generously each user rates, leaving what they preferred
+        means = np.bincount(user_index, weights=values) / np.bincount(user_index)
+        values = values - means[user_index].astype(np.float32)
+    matrix = sparse.csr_matrix((values, (user_index, book_index)), shape=(len(users), len(books)))
+    matrix.eliminate_zeros()
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=0)).ravel())
+    scale = np.divide(1, norms, out=np.zeros_like(norms), where=norms > 0)
+    return (matrix @ sparse.diags(scale)).tocsr(), books
+
+
+def top_neighbors(matrix: "sparse.csr_matrix", neighbors: int, block_size: int) -> Iterator[Neighbors]:
+    """
+    The `neighbors` most similar columns of each column of a unit-column
+    matrix (positive similarities only), block_size columns at a time
+    """
+    by_book = matrix.T.tocsr()
+    for start in range(0, by_book.shape[0], block_size):
+        # Cosine similarities of the block's books to every book, a row per book
+        block = (by_book[start:start + block_size] @ matrix).tocsr()
+        rows = np.repeat(np.arange(block.shape[0]), np.diff(block.indptr))
+        block.data[(block.data <= 0) | (block.indices == rows + start)] = 0
+        block.eliminate_zeros()
+        yield _top_of_rows(block, start, neighbors)
+
+
+def _top_of_rows(block: "sparse.csr_matrix", start: int, neighbors: int) -> Neighbors:
+    """
+    Top `neighbors` entries of each row, best first. A partial sort per row:
+    sorting all of a block's similarities would cost several times more, as
+    popular books are similar to most others.
+    """
+    sources, ranks, targets, scores = [], [], [], []
+    for row in range(block.shape[0]):
+        low, high = block.indptr[row], block.indptr[row + 1]
+        if low == high:
+            continue
+        values = block.data[low:high]
+        if high - low > neighbors:
+            top = np.argpartition(-values, neighbors - 1)[:neighbors]
+        else:
+            top = np.arange(high - low)
+        top = top[np.argsort(-values[top], kind="stable")]
+        sources.append(np.full(len(top), row + start))
+        ranks.append(np.arange(len(top)))
+        targets.append(block.indices[low:high][top])
+        scores.append(values[top])
+    if not sources:
+        empty = np.zeros(0, dtype=np.int64)
+        return Neighbors(empty, empty, empty, np.zeros(0, dtype=np.float32))
+    return Neighbors(*(np.concatenate(parts) for parts in (sources, ranks, targets, scores)))
+
+
+def replace_book_similarity(db: Session, books: "np.ndarray", blocks: Iterator[Neighbors]) -> int:
+    """Replace the rows of book_similarity, in the current transaction"""
+    db.execute(delete(BookSimilarity))
+    written = 0
+    for block in blocks:
+        if not len(block.sources):
+            continue
+        db.execute(insert(BookSimilarity), [
+            {"book_id": book_id, "rank": rank, "similar_book_id": similar_book_id, "score": score}
+            for book_id, rank, similar_book_id, score in zip(
+                books[block.sources].tolist(),
+                block.ranks.tolist(),
+                books[block.targets].tolist(),
+                block.scores.round(4).tolist(),
+            )
+        ])
+        written += len(block.sources)
+    return written
+
+
+def train_book_similarity(db: Session) -> Dict[str, Any]:
+    """Recompute the neighbors of every rated book from the reviews. Commits."""
+    started = time.perf_counter()
+    user_ids, book_ids, ratings = load_ratings(db)
+    matrix, books = rating_matrix(user_ids, book_ids, ratings, settings.RECOMMENDER_SIMILARITY)
+    neighbors = replace_book_similarity(
+        db, books, top_neighbors(matrix, settings.RECOMMENDER_NEIGHBORS, settings.RECOMMENDER_BLOCK_SIZE)
+    )
+    db.commit()
+    return {
+        "ratings": len(ratings),
+        "users": matrix.shape[0],
+        "books": matrix.shape[1],
+        "neighbors": neighbors,
+        "similarity": settings.RECOMMENDER_SIMILARITY,
+        "duration_seconds": round(time.perf_counter() - started, 3),
+    }
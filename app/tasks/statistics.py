@@ -0,0 +1,76 @@
+import time
+from typing import Any, Dict, List
+
+from sqlalchemy import Row, delete, func, insert, select, text
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.crud.crud_statistics import COUNTERS, summarize_genres
+from app.db.models import Book, BookStatistics, GenreStatistics
+
+counters_table = GenreStatistics.__table__
+
+
+def genre_counts(db: Session) -> List[Row]:
+    """
+    The genre_statistics counters recomputed in one scan of the book table,
+    grouped by genre. Review counts come from the denormalized `rating_count`
+    of each book, kept in the same transaction as every review write, so the
+    review table is not read and the cost does not grow with the number of
+    reviews.
+    """
+    return db.execute(
+        select(
+            Book.genre,
+            func.count().label("books"),
+            func.count().filter(Book.rating_count > 0).label("books_with_reviews"),
+            func.count(Book.google_books_id).label("books_with_google_id"),
+            func.coalesce(func.sum(Book.rating_count), 0).label("reviews"),
+        ).group_by(Book.genre)
+    ).all()
+
+
+def compute_statistics(db: Session) -> Dict[str, Any]:
+    return summarize_genres(genre_counts(db))
+
+
+def reconcile_counters(db: Session) -> BookStatistics:
+    """
+    Recompute the genre_statistics counters from the book table, replace the
+    maintained ones with them, and store the result as a book_statistics row
+    along with the drift found. The counters are deleted (and read back) first:
+    that takes their locks, so book and review writes made meanwhile wait and
+    add their deltas to the recomputed counters instead of being lost.
+    """
+    started = time.perf_counter()
+    if settings.DB_TYPE == "postgres":
+        # Also holds back writes that would create a genre's counter row
+        db.execute(text(f"LOCK TABLE {counters_table.name} IN EXCLUSIVE MODE"))
+    counted = {
+        row.genre: row
+        for row in db.execute(delete(counters_table).returning(*counters_table.c))
+    }
+    actual = {row.genre: row for row in genre_counts(db)}
+    if actual:
+        db.execute(insert(counters_table), [row._asdict() for row in actual.values()])
+
+    discrepancies: Dict[str, Dict[str, Dict[str, int]]] = {}
+    for genre in sorted(counted.keys() | actual.keys()):
+        drift = {}
+        for counter in COUNTERS:
+            was = getattr(counted[genre], counter) if genre in counted else 0
+            should_be = getattr(actual[genre], counter) if genre in actual else 0
+            if was != should_be:
+                drift[counter] = {"counted": was, "actual": should_be}
+        if drift:
+            discrepancies[genre] = drift
+
+    snapshot = BookStatistics(
+        **summarize_genres(actual.values()),
+        duration_seconds=round(time.perf_counter() - started, 3),
+        discrepancies=discrepancies,
+    )
+    db.add(snapshot)
+    db.commit()
+    db.refresh(snapshot)
+    return snapshot
@@ -1,177 +1,154 @@
-import json
-import asyncio
-from celery import shared_task
+from celery import chord, shared_task
 from celery.schedules import crontab
 from loguru import logger
-from sqlalchemy import create_engine, select, func
-from sqlalchemy.orm import sessionmaker
 from app.core.config import settings
-from app.schemas.book import BookCreate
-from typing import Optional
+from app.services.response_cache import CATALOG_TAG, response_cache
+from app.tasks.worker import db_session, get_engine
+from typing import Any, Dict, List, Optional
 
 @shared_task
 def refresh_book_data_from_google_books():
     """
-    Background task to find books without a Google Books ID, search for them,
-    and update them with the retrieved data.
+    Background task to find books without Google Books data (or with data older
+    than GOOGLE_BOOKS_ENRICHMENT_STALE_DAYS), split them into id ranges, and
+    fan the ranges out as a chord of enrichment subtasks whose results are
+    summarized by `summarize_google_books_enrichment`.
     """
     logger.info("🎯 Starting enrichment task: Finding books WITHOUT Google Books data...")
-    
+
     try:
-        # Create sync database URL
-        if settings.DB_TYPE == "postgres":
-            sync_db_url = settings.SQLALCHEMY_DATABASE_URI.replace("+asyncpg", "+psycopg2")
-        else:
-            sync_db_url = settings.SQLALCHEMY_DATABASE_URI.replace("+aiosqlite", "")
-            
-        engine = create_engine(sync_db_url)
-        SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-        
-        db = SessionLocal()
-        
-        from app.db.models import Book
-        from app.services.google_books_service import google_books_service
+        from app.tasks.enrichment import pending_id_ranges
 
-        books_to_enrich = db.execute(select(Book)).scalars().all()
-        if not books_to_enrich:
-            logger.info("✅ No books to enrich. All books already have Google Books IDs.")
+        with db_session() as db:
+            ranges = pending_id_ranges(db, range_size=settings.GOOGLE_BOOKS_ENRICHMENT_RANGE_SIZE)
+        if not ranges:
+            logger.info("✅ No books to enrich. All books have current Google Books data.")
             return {"status": "success", "message": "No books needed enrichment."}
 
-        logger.info(f"📚 Found {len(books_to_enrich)} books WITHOUT Google Books ID to enrich.")
+        books_pending = sum(books for _, _, books in ranges)
+        logger.info(f"📚 Found {books_pending} books to enrich, dispatching {len(ranges)} chunk tasks.")
+        summary = chord(
+            [enrich_google_books_chunk.s(first_id, last_id) for first_id, last_id, _ in ranges]
+        )(summarize_google_books_enrichment.s(books_pending=books_pending))
 
-        # Process books
-        books_enriched = 0
-        books_failed = 0
+        return {
+            "status": "dispatched",
+            "books_pending": books_pending,
+            "chunks": len(ranges),
+            # Poll /tasks/status/{summary_task_id} for the aggregated result
+            "summary_task_id": summary.id,
+        }
+
+    except Exception as e:
+        logger.error(f"❌ Critical error in enrichment task: {e}")
+        return {"status": "error", "message": str(e)}
 
-        for book in books_to_enrich:
-            try:
-                logger.info(f"🔍 Searching Google Books for: '{book.title}' by {book.author}")
-                
-                # Search Google Books API
-                search_query = f"{book.title} {book.author}"
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
-                
-                try:
-                    # Search for the book
-                    results = loop.run_until_complete(
-                        google_books_service.search_books(query=search_query, max_results=3)
-                    )
-                    
-                    if results and len(results) > 0:
-                        # Take the first result as the best match
-                        api_data = results[0]
-                        
-                        # Update the book with Google Books data
-                        book.google_books_id = api_data.get("google_books_id")
-                        book.description = api_data.get("description") or book.description
-                        book.page_count = api_data.get("page_count") or book.page_count
-                        book.thumbnail_url = api_data.get("thumbnail") or book.thumbnail_url
-                        book.isbn = api_data.get("isbn") or book.isbn
-                        
-                        # Handle authors list
-                        if api_data.get("authors"):
-                            book.author = ", ".join(api_data["authors"])
-                        
-                        books_enriched += 1
-                        logger.info(f"✅ Enriched: '{book.title}' with Google Books ID: {book.google_books_id}")
-                    else:
-                        logger.warning(f"⚠️ No Google Books match found for: '{book.title}'")
-                        books_failed += 1
-                        
-                finally:
-                    loop.close()
-                    
-            except Exception as e:
-                logger.error(f"❌ Error enriching book '{book.title}': {e}")
-                books_failed += 1
-                continue
+@shared_task(bind=True, max_retries=settings.GOOGLE_BOOKS_ENRICHMENT_CHUNK_MAX_RETRIES)
+def enrich_google_books_chunk(
+    self,
+    first_id: int,
+    last_id: int,
+    book_ids: Optional[List[int]] = None,
+    totals: Optional[Dict[str, int]] = None,
+):
+    """
+    Enrichment subtask: enrich the pending books with ids in [first_id, last_id].
+    When books fail, or the run stops early (Google Books unavailable, time
+    budget spent), the task is retried with backoff for only the failed ids
+    and the part of the range it did not reach.
+    """
+    logger.info(f"🧩 Enriching books {first_id}-{last_id}" + (f" and {len(book_ids)} to retry" if book_ids else ""))
+    totals = totals or {"books_enriched": 0, "books_unmatched": 0}
 
-        # Commit all changes
-        db.commit()
+    try:
+        from app.tasks.enrichment import enrich_pending_books
 
-        result_summary = {
-            "status": "success",
-            "books_enriched": books_enriched,
-            "books_failed": books_failed,
-            "total_processed": len(books_to_enrich),
+        with db_session() as db:
+            run = enrich_pending_books(db, first_id=first_id, last_id=last_id, book_ids=book_ids or ())
+        totals = {
+            "books_enriched": totals["books_enriched"] + run["books_enriched"],
+            "books_unmatched": totals["books_unmatched"] + run["books_unmatched"],
         }
-        logger.info(f"✅ Book enrichment completed: {result_summary}")
-        return result_summary
+        retry_ids = run["failed_ids"]
+        if run["stopped_by"]:
+            # Retried ids beyond where this run stopped were not looked up yet
+            retry_ids += [book_id for book_id in book_ids or () if book_id > run["last_book_id"]]
+            first_id = max(first_id, run["last_book_id"] + 1)
+        else:
+            first_id = last_id + 1
 
     except Exception as e:
-        logger.error(f"❌ Critical error in enrichment task: {e}")
-        if db:
-            db.rollback()
-        return {"status": "error", "message": str(e)}
-    finally:
-        if db:
-            db.close()
+        logger.error(f"❌ Error enriching books {first_id}-{last_id}: {e}")
+        run, retry_ids = {"stopped_by": "error"}, list(book_ids or ())
+
+    if (retry_ids or first_id <= last_id) and self.request.retries < self.max_retries:
+        # A time budget stop continues right away; failures back off past the breaker's reset
+        countdown = 0 if run["stopped_by"] == "time_budget" else (
+            settings.GOOGLE_BOOKS_BREAKER_RESET_SECONDS * 2 ** self.request.retries
+        )
+        logger.warning(f"🔁 Retrying {len(retry_ids)} failed books of {first_id}-{last_id} in {countdown}s")
+        raise self.retry(
+            args=(first_id, last_id),
+            kwargs={"book_ids": retry_ids, "totals": totals},
+            countdown=countdown,
+        )
+
+    result = {
+        "status": "success" if not retry_ids and first_id > last_id else "incomplete",
+        **totals,
+        "books_failed": len(retry_ids),
+        "failed_ids": retry_ids,
+        # Part of the range still unvisited when retries ran out
+        "unreached_range": [first_id, last_id] if first_id <= last_id else None,
+        "attempts": self.request.retries + 1,
+    }
+    logger.info(f"✅ Enriched chunk: {result}")
+    return result
+
+@shared_task
+def summarize_google_books_enrichment(results: List[Dict[str, Any]], books_pending: int):
+    """
+    Chord callback of the enrichment fan-out: add up the chunk results
+    """
+    summary = {
+        "status": "success" if all(r["status"] == "success" for r in results) else "incomplete",
+        "books_pending": books_pending,
+        "chunks": len(results),
+        "chunks_incomplete": sum(r["status"] != "success" for r in results),
+        "books_enriched": sum(r["books_enriched"] for r in results),
+        "books_unmatched": sum(r["books_unmatched"] for r in results),
+        "books_failed": sum(r["books_failed"] for r in results),
+        "retries": sum(r["attempts"] - 1 for r in results),
+    }
+    logger.info(f"✅ Book enrichment completed: {summary}")
+    return summary
 
 @shared_task
 def refresh_book_data_from_source():
     """
-    Background task to refresh book data from the seed file
-    This simulates refreshing from an external API
+    Background task to refresh book data from the seed feed (SEED_FEED_PATH).
+    This simulates refreshing from an external API: the feed is streamed and
+    merged in set-based batches keyed on the normalized (title, author).
     """
     logger.info("🎯 Starting background task: Refreshing book data from seed file...")
     
     try:
-        # Create sync database URL
-        if settings.DB_TYPE == "postgres":
-            sync_db_url = settings.SQLALCHEMY_DATABASE_URI.replace("+asyncpg", "+psycopg2")
-        else:
-            sync_db_url = settings.SQLALCHEMY_DATABASE_URI.replace("+aiosqlite", "")
-            
-        engine = create_engine(sync_db_url)
-        SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-        
-        db = SessionLocal()
-        
-        # Import models inside function to avoid circular imports
-        from app.db.models import Book
+        from app.tasks.seed_refresh import refresh_from_feed
         
-        # Count existing books
-        book_count = db.scalar(select(func.count()).select_from(Book))
-        logger.info(f"📚 Found {book_count} existing books in database")
-        
-        # Load books from seed file
-        with open("data/books_seed.json") as f:
-            books_data = json.load(f)
-        
-        books_added = 0
-        books_updated = 0
-        
-        for book_data in books_data:
-            # Check if book already exists
-            existing_book = db.scalar(
-                select(Book).where(
-                    (Book.title == book_data["title"]) & 
-                    (Book.author == book_data["author"])
-                )
-            )
-            
-            if existing_book:
-                # Update existing book
-                existing_book.genre = book_data["genre"]
-                books_updated += 1
-                logger.debug(f"Updated book: {book_data['title']}")
-            else:
-                # Create new book
-                book_in = BookCreate(**book_data)
-                db_book = Book(**book_in.model_dump())
-                db.add(db_book)
-                books_added += 1
-                logger.debug(f"Added new book: {book_data['title']}")
-        
-        db.commit()
+        # One connection throughout: the staging table is temporary, per connection
+        with get_engine().connect() as conn:
+            counts = refresh_from_feed(conn, settings.SEED_FEED_PATH, batch_size=settings.SEED_REFRESH_BATCH_SIZE)
+        response_cache.invalidate_sync(CATALOG_TAG)
         
         result = {
             "status": "success",
-            "books_added": books_added,
-            "books_updated": books_updated,
-            "total_processed": len(books_data),
-            "message": f"Successfully refreshed book data. Added: {books_added}, Updated: {books_updated}"
+            "books_added": counts["added"],
+            "books_updated": counts["updated"],
+            "books_unchanged": counts["unchanged"],
+            "rows_invalid": counts["invalid"],
+            "rows_duplicate": counts["duplicates"],
+            "total_processed": counts["processed"],
+            "message": f"Successfully refreshed book data. Added: {counts['added']}, Updated: {counts['updated']}"
         }
         
         logger.info(f"✅ Book refresh completed: {result}")
@@ -180,71 +157,119 @@ def refresh_book_data_from_source():
     except Exception as e:
         logger.error(f"❌ Error during book data refresh: {e}")
         return {"status": "error", "message": str(e)}
-    finally:
-        db.close()
 
 @shared_task
 def calculate_book_statistics():
     """
-    Background task to calculate book statistics
+    Background task to correct drift in the catalog statistics: the counters
+    served by GET /statistics are maintained by the write paths, this
+    recomputes them from the book table, reports any discrepancies, replaces
+    the counters and records the run in the book_statistics table. The rating
+    analytics (app/tasks/analytics.py) are added to
+    the same snapshot.
     """
-    logger.info("📊 Starting background task: Calculating book statistics...")
+    logger.info("📊 Starting background task: Reconciling book statistics...")
     
     try:
-        # Create sync database URL
-        if settings.DB_TYPE == "postgres":
-            sync_db_url = settings.SQLALCHEMY_DATABASE_URI.replace("+asyncpg", "+psycopg2")
-        else:
-            sync_db_url = settings.SQLALCHEMY_DATABASE_URI.replace("+aiosqlite", "")
-            
-        engine = create_engine(sync_db_url)
-        SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-        
-        db = SessionLocal()
-        
-        # Import models
-        from app.db.models import Book, Review
-        
-        # Calculate statistics
-        total_books = db.scalar(select(func.count()).select_from(Book))
-        total_reviews = db.scalar(select(func.count()).select_from(Review))
-        
-        # Books with Google Books ID
-        books_with_google_id = db.scalar(
-            select(func.count()).select_from(Book).where(Book.google_books_id.isnot(None))
-        )
-        
-        # Average rating per book
-        books_with_reviews = db.scalar(
-            select(func.count()).select_from(Book).where(Book.reviews.any())
-        )
+        from app.tasks import analytics
+        from app.tasks.statistics import reconcile_counters
+
+        with db_session() as db:
+            snapshot = reconcile_counters(db)
+            result = {
+                "status": "success",
+                "total_books": snapshot.total_books,
+                "total_reviews": snapshot.total_reviews,
+                "genres_with_discrepancies": len(snapshot.discrepancies),
+                "discrepancies": snapshot.discrepancies,
+                "duration_seconds": snapshot.duration_seconds,
+            }
+            rating_analytics = analytics.compute_rating_analytics(db, snapshot)
+            result["ratings_analyzed"] = rating_analytics["ratings"]
+            result["rating_analytics_seconds"] = rating_analytics["duration_seconds"]
         
-        # Genre distribution
-        genre_stats = db.execute(
-            select(Book.genre, func.count(Book.id))
-            .group_by(Book.genre)
-            .order_by(func.count(Book.id).desc())
-        ).all()
+        if result["discrepancies"]:
+            logger.warning(f"⚠️ Statistics counters had drifted, corrected: {result['discrepancies']}")
+        logger.info(f"✅ Statistics reconciled: {result}")
+        return result
         
-        statistics = {
-            "total_books": total_books,
-            "total_reviews": total_reviews,
-            "books_with_reviews": books_with_reviews,
-            "books_without_reviews": total_books - books_with_reviews,
-            "books_with_google_id": books_with_google_id,
-            "books_without_google_id": total_books - books_with_google_id,
-            "genre_distribution": {genre: count for genre, count in genre_stats},
-            "average_reviews_per_book": round(total_reviews / total_books, 2) if total_books > 0 else 0
+    except Exception as e:
+        logger.error(f"❌ Error reconciling statistics: {e}")
+        return {"status": "error", "message": str(e)}
+
+@shared_task
+def recalculate_book_rating_aggregates():
+    """
+    Background task to re-derive the denormalized rating aggregates on every book
+    from the review table, repairing any drift
+    """
+    logger.info("🔧 Starting background task: Recalculating book rating aggregates...")
+
+    try:
+        from app.crud.crud_book import rating_aggregates_backfill_stmt
+        from app.tasks.statistics import reconcile_counters
+
+        with db_session() as db:
+            result = db.execute(rating_aggregates_backfill_stmt())
+            db.commit()
+            # Repaired review counts change the statistics counters too
+            snapshot = reconcile_counters(db)
+        response_cache.invalidate_sync(CATALOG_TAG)
+
+        summary = {
+            "status": "success",
+            "books_updated": result.rowcount,
+            "statistics_discrepancies": snapshot.discrepancies,
         }
-        
-        logger.info(f"✅ Statistics calculated: {statistics}")
-        return statistics
-        
+        logger.info(f"✅ Rating aggregates recalculated: {summary}")
+        return summary
+
+    except Exception as e:
+        logger.error(f"❌ Error recalculating rating aggregates: {e}")
+        return {"status": "error", "message": str(e)}
+
+@shared_task
+def train_book_similarity():
+    """
+    Background task to retrain the item-item recommender: recomputes the
+    nearest neighbors of every rated book from the review table
+    (app/tasks/similarity.py) for GET /books/{book_id}/similar
+    """
+    logger.info("🧮 Starting background task: Training book similarity...")
+
+    try:
+        from app.tasks import similarity
+
+        with db_session() as db:
+            summary = {"status": "success", **similarity.train_book_similarity(db)}
+        logger.info(f"✅ Book similarity trained: {summary}")
+        return summary
+
+    except Exception as e:
+        logger.error(f"❌ Error training book similarity: {e}")
+        return {"status": "error", "message": str(e)}
+
+@shared_task
+def train_book_recommender():
+    """
+    Background task to retrain the personalized recommender: factorizes the
+    review ratings with ALS (app/tasks/factorization.py) and publishes the
+    factors as a new version of the memory-mapped model files behind
+    GET /users/me/recommendations
+    """
+    logger.info("🧮 Starting background task: Training book recommender...")
+
+    try:
+        from app.tasks import factorization
+
+        with db_session() as db:
+            summary = {"status": "success", **factorization.train_book_recommender(db)}
+        logger.info(f"✅ Book recommender trained: {summary}")
+        return summary
+
     except Exception as e:
-        logger.error(f"❌ Error calculating statistics: {e}")
+        logger.error(f"❌ Error training book recommender: {e}")
         return {"status": "error", "message": str(e)}
-    finally:
-        db.close()
 
 @shared_task
 def send_new_book_notification(book_title: str, book_author: str):
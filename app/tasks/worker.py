@@ -0,0 +1,117 @@
+import asyncio
+import os
+from contextlib import contextmanager
+from typing import Any, Coroutine, Iterator, Optional
+
+from celery.signals import worker_process_init, worker_process_shutdown
+from loguru import logger
+from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.core.config import settings
+from app.services.google_books_service import google_books_service
+
+# One event loop per worker process, kept across tasks so that async clients
+# bound to it (the pooled Google Books client) keep their connections
+_loop: Optional[asyncio.AbstractEventLoop] = None
+
+# One sync engine and session factory per worker process, kept across tasks so
+# that tasks reuse pooled connections instead of opening their own
+_engine: Optional[Engine] = None
+_SessionLocal: Optional[sessionmaker] = None
+
+
+def get_worker_loop() -> asyncio.AbstractEventLoop:
+    global _loop
+    if _loop is None or _loop.is_closed():
+        _loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(_loop)
+    return _loop
+
+
+def run_async(coro: Coroutine[Any, Any, Any]) -> Any:
+    """Run a coroutine to completion on the worker process's event loop"""
+    return get_worker_loop().run_until_complete(coro)
+
+
+def sync_database_url() -> str:
+    if settings.DB_TYPE == "postgres":
+        return settings.SQLALCHEMY_DATABASE_URI.replace("+asyncpg", "+psycopg2")
+    return settings.SQLALCHEMY_DATABASE_URI.replace("+aiosqlite", "")
+
+
+def tasks_per_process() -> int:
+    """
+    Tasks a process runs at once outside prefork children (thread or gevent
+    pools, eager runs): the worker concurrency
+    """
+    from app.tasks.celery_app import celery
+
+    return celery.conf.worker_concurrency or os.cpu_count() or 1
+
+
+def init_engine(pool_size: int) -> Engine:
+    """Create the process's engine, with a connection per task it runs at once"""
+    global _engine, _SessionLocal
+    pool_size = settings.CELERY_DB_POOL_SIZE or pool_size
+    _engine = create_engine(
+        sync_database_url(),
+        pool_size=pool_size,
+        max_overflow=settings.CELERY_DB_MAX_OVERFLOW,
+        # Connections live across tasks; check them before use
+        pool_pre_ping=True,
+    )
+    _SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=_engine)
+    return _engine
+
+
+def get_engine() -> Engine:
+    if _engine is None:
+        init_engine(tasks_per_process())
+    return _engine
+
+
+def dispose_engine() -> None:
+    global _engine, _SessionLocal
+    if _engine is not None:
+        _engine.dispose()
+    _engine = _SessionLocal = None
+
+
+@contextmanager
+def db_session() -> Iterator[Session]:
+    """A session from the process's engine, rolled back on error and closed on exit"""
+    get_engine()
+    db = _SessionLocal()
+    try:
+        yield db
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+@worker_process_init.connect
+def open_worker_resources(**_):
+    global _engine
+    if _engine is not None:
+        # Inherited from the parent across fork: leave its connections to it
+        _engine.dispose(close=False)
+        _engine = None
+    # A prefork child runs one task at a time
+    init_engine(pool_size=1)
+    run_async(google_books_service.start())
+    logger.info("🔌 Worker process opened the database engine and the Google Books client")
+
+
+@worker_process_shutdown.connect
+def close_worker_resources(**_):
+    global _loop
+    dispose_engine()
+    if _loop is None or _loop.is_closed():
+        return
+    run_async(google_books_service.aclose())
+    _loop.close()
+    _loop = None
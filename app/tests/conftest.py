@@ -9,6 +9,9 @@ def mock_books_with_reviews() -> List[Book]:
         title="The Test Book", 
         author="Author A", 
         genre="Fiction", 
+        rating_sum=8,
+        rating_count=2,
+        average_rating=4.0,
         reviews=[
             Review(id=1, rating=5, review_text="Excellent!", book_id=1, user_id=1),
             Review(id=2, rating=3, review_text="It was okay.", book_id=1, user_id=2),
@@ -19,6 +22,9 @@ def mock_books_with_reviews() -> List[Book]:
         title="Another Test", 
         author="Author B", 
         genre="Sci-Fi", 
+        rating_sum=1,
+        rating_count=1,
+        average_rating=1.0,
         reviews=[
             Review(id=3, rating=1, review_text="Not for me.", book_id=2, user_id=1)
         ]
@@ -28,6 +34,9 @@ def mock_books_with_reviews() -> List[Book]:
         title="Empty Reviews", 
         author="Author C", 
         genre="Fantasy", 
+        rating_sum=0,
+        rating_count=0,
+        average_rating=None,
         reviews=[]
     )
     return [book1, book2, book3]
\ No newline at end of file
@@ -0,0 +1,52 @@
+from unittest.mock import patch
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql, sqlite
+
+from app.crud.crud_book import book as book_crud
+from app.db.models import Book
+
+
+def compile_sql(query, dialect) -> str:
+    return str(query.compile(dialect=dialect, compile_kwargs={"literal_binds": True}))
+
+
+def test_fts_search_matches_last_word_as_prefix_on_sqlite():
+    """
+    Test that the SQLite full-text match strips punctuation, requires every
+    word and matches the last one as an FTS5 prefix, ranked by bm25.
+    """
+    with patch('app.crud.crud_book.settings.DB_TYPE', "sqlite"):
+        matches = book_crud.search_matches("Harry  Pott-er!")
+
+    sql = compile_sql(select(matches), sqlite.dialect())
+    assert "book_fts MATCH '\"harry\" \"pott\" \"er\"*'" in sql
+    assert "bm25(book_fts" in sql
+
+
+def test_fts_search_matches_uses_tsquery_on_postgres():
+    """
+    Test that the Postgres full-text match queries the tsvector column with
+    an AND of the words, the last one as a prefix.
+    """
+    with patch('app.crud.crud_book.settings.DB_TYPE', "postgres"):
+        matches = book_crud.search_matches("harry pott")
+
+    compiled = select(matches).compile(dialect=postgresql.dialect())
+    assert "book.search_vector @@ to_tsquery(" in str(compiled)
+    assert "ts_rank_cd" in str(compiled)
+    assert "harry & pott:*" in compiled.params.values()
+
+
+def test_search_without_words_falls_back_to_ilike():
+    """
+    Test that a search with no indexable words uses the substring filter,
+    and that relevance order then degrades to id order.
+    """
+    query = book_crud._filtered_page(
+        select(Book), sort="relevance", skip=0, limit=10, search="!!", after=None
+    )
+
+    sql = compile_sql(query, sqlite.dialect())
+    assert "book_fts" not in sql
+    assert "lower(book.title) LIKE lower('%!!%')" in sql
+    assert "ORDER BY book.id" in sql
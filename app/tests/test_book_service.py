@@ -1,9 +1,16 @@
 import pytest
+from collections import namedtuple
 from unittest.mock import AsyncMock, patch
+from datetime import datetime
+from decimal import Decimal
+from types import SimpleNamespace
 from typing import List
 
-from app.services.book_service import BookService
-from app.db.models import Book
+from app.core.pagination import decode_cursor, encode_cursor
+from app.services.book_service import EXPORT_BOOK_FIELDS, BookService
+from app.services.search_index import SearchResult
+from app.db.models import Book, Review as ReviewModel
+from app.schemas.review import ReviewCreate
 
 @pytest.mark.asyncio
 async def test_get_books_calculates_average_rating(mock_books_with_reviews: List[Book]):
@@ -16,9 +23,9 @@ async def test_get_books_calculates_average_rating(mock_books_with_reviews: List
     service = BookService()
     
     # 2. Act - Use patch to mock the CRUD function
-    with patch('app.crud.crud_book.book.get_multi_with_reviews', 
+    with patch('app.crud.crud_book.book.get_multi_with_ratings', 
                new_callable=AsyncMock) as mock_get_multi:
-        mock_get_multi.return_value = mock_books_with_reviews
+        mock_get_multi.return_value = [(b, b.id) for b in mock_books_with_reviews]
         
         result = await service.get_books(
             db=mock_db_session, skip=0, limit=10, search=None
@@ -33,4 +40,395 @@ async def test_get_books_calculates_average_rating(mock_books_with_reviews: List
     assert result[1].average_rating == 1.0  # Only one review of 1
     
     assert result[2].id == 3
-    assert result[2].average_rating is None  # No reviews
\ No newline at end of file
+    assert result[2].average_rating is None  # No reviews
+
+@pytest.mark.asyncio
+async def test_review_writes_maintain_rating_aggregates():
+    """
+    Test that upserting and deleting a review adjust the book's rating aggregates,
+    and that a review for a missing book is neither written nor counted.
+    """
+    mock_db_session = AsyncMock()
+    service = BookService()
+
+    with patch('app.crud.crud_book.book.apply_review_rating', new_callable=AsyncMock) as mock_apply_rating, \
+         patch('app.crud.crud_book.book.apply_rating_delta', new_callable=AsyncMock) as mock_delta, \
+         patch('app.crud.crud_review.review.upsert', new_callable=AsyncMock) as mock_upsert, \
+         patch('app.crud.crud_book.book.lock_existing_ids', new_callable=AsyncMock), \
+         patch('app.crud.crud_review.review.delete_by_book_and_user', new_callable=AsyncMock) as mock_delete:
+        # Upsert
+        mock_apply_rating.return_value = True
+        mock_upsert.return_value = ReviewModel(id=1, rating=4, book_id=1, user_id=1)
+        review = await service.add_or_update_review(
+            db=mock_db_session, book_id=1, user_id=1, review_in=ReviewCreate(rating=4)
+        )
+        assert review.rating == 4
+        mock_apply_rating.assert_awaited_with(mock_db_session, book_id=1, user_id=1, rating=4)
+
+        # Missing book
+        mock_apply_rating.return_value = False
+        mock_upsert.reset_mock()
+        review = await service.add_or_update_review(
+            db=mock_db_session, book_id=99, user_id=1, review_in=ReviewCreate(rating=4)
+        )
+        assert review is None
+        mock_upsert.assert_not_awaited()
+
+        # Delete
+        mock_delete.return_value = 2
+        assert await service.delete_review(db=mock_db_session, book_id=1, user_id=1)
+        mock_delta.assert_awaited_with(mock_db_session, book_id=1, sum_delta=-2, count_delta=-1)
+
+        # Delete of a review already removed by a concurrent delete
+        mock_delete.return_value = None
+        mock_delta.reset_mock()
+        assert not await service.delete_review(db=mock_db_session, book_id=1, user_id=1)
+        mock_delta.assert_not_awaited()
+
+@pytest.mark.asyncio
+async def test_get_books_aggregate_path_builds_books_from_rows():
+    """
+    Test that the SQL aggregation listing path turns plain stats rows into
+    Book schemas, rounding AVG results and leaving unreviewed books unrated.
+    """
+    mock_db_session = AsyncMock()
+    service = BookService()
+    rows = [
+        {"id": 1, "title": "The Test Book", "author": "Author A", "genre": "Fiction",
+         "google_books_id": None, "average_rating": Decimal("3.6666666667"), "review_count": 3},
+        {"id": 3, "title": "Empty Reviews", "author": "Author C", "genre": "Fantasy",
+         "google_books_id": None, "average_rating": None, "review_count": 0},
+    ]
+
+    with patch('app.services.book_service.settings.BOOK_RATING_SOURCE', "aggregate"), \
+         patch('app.crud.crud_book.book.get_multi_with_rating_stats',
+               new_callable=AsyncMock) as mock_get_stats:
+        mock_get_stats.return_value = rows
+        result = await service.get_books(
+            db=mock_db_session, skip=0, limit=10, search=None
+        )
+
+    assert [b.id for b in result] == [1, 3]
+    assert result[0].average_rating == 3.67
+    assert result[0].review_count == 3
+    assert result[1].average_rating is None
+    assert result[1].review_count == 0
+
+@pytest.mark.asyncio
+async def test_get_books_page_returns_cursor_for_next_page(mock_books_with_reviews: List[Book]):
+    """
+    Test that a full page yields a cursor encoding the last row's (sort_key, id),
+    which decodes back to the keyset the CRUD layer continues after.
+    """
+    mock_db_session = AsyncMock()
+    service = BookService()
+
+    with patch('app.crud.crud_book.book.get_multi_with_ratings',
+               new_callable=AsyncMock) as mock_get_multi:
+        mock_get_multi.return_value = [(b, b.title) for b in mock_books_with_reviews]
+        books, next_cursor = await service.get_books_page(
+            db=mock_db_session, skip=0, limit=2, search=None, sort="title"
+        )
+
+    # One extra row is requested to detect the next page
+    assert mock_get_multi.await_args.kwargs["limit"] == 3
+    assert [b.id for b in books] == [1, 2]
+    assert decode_cursor(next_cursor, "title") == ("Another Test", 2)
+    with pytest.raises(ValueError):
+        decode_cursor(next_cursor, "rating")
+
+    with patch('app.crud.crud_book.book.get_multi_with_ratings',
+               new_callable=AsyncMock) as mock_get_multi:
+        mock_get_multi.return_value = [(b, b.title) for b in mock_books_with_reviews[2:]]
+        books, last_cursor = await service.get_books_page(
+            db=mock_db_session, skip=0, limit=2, search=None, sort="title", cursor=next_cursor
+        )
+
+    assert mock_get_multi.await_args.kwargs["after"] == ("Another Test", 2)
+    assert [b.id for b in books] == [3]
+    assert last_cursor is None
+
+@pytest.mark.asyncio
+async def test_get_reviews_for_book_pages_by_created_at(mock_books_with_reviews: List[Book]):
+    """
+    Test that review listing returns one page plus a (created_at, id) cursor,
+    taking the rating summary from the book rather than the listed reviews.
+    """
+    mock_db_session = AsyncMock()
+    service = BookService()
+    rows = [
+        SimpleNamespace(id=i, rating=5, review_text=None, book_id=1, user_id=i,
+                        created_at=datetime(2024, 1, 1, 12, 0, i))
+        for i in (1, 2, 3)
+    ]
+
+    with patch('app.crud.crud_book.book.get', new_callable=AsyncMock) as mock_get_book, \
+         patch('app.crud.crud_review.review.get_page_by_book',
+               new_callable=AsyncMock) as mock_get_page:
+        mock_get_book.return_value = mock_books_with_reviews[0]
+        mock_get_page.return_value = rows
+        book, next_cursor = await service.get_reviews_for_book(
+            db=mock_db_session, book_id=1, limit=2
+        )
+
+        assert mock_get_page.await_args.kwargs["limit"] == 3
+        assert [r.id for r in book.reviews] == [1, 2]
+        assert book.average_rating == 4.0
+        assert book.review_count == 2
+        assert decode_cursor(next_cursor, "created_at") == ("2024-01-01T12:00:02", 2)
+
+        mock_get_page.return_value = rows[2:]
+        book, last_cursor = await service.get_reviews_for_book(
+            db=mock_db_session, book_id=1, limit=2, cursor=next_cursor
+        )
+
+    assert mock_get_page.await_args.kwargs["after"] == (datetime(2024, 1, 1, 12, 0, 2), 2)
+    assert [r.id for r in book.reviews] == [3]
+    assert last_cursor is None
+
+@pytest.mark.asyncio
+async def test_add_reviews_batch_reports_status_per_item():
+    """
+    Test that a review batch validates every item, lets the last item for a book
+    win, skips missing books, applies aggregate deltas for the written reviews
+    and reports a write the upsert returned no row for as failed.
+    """
+    mock_db_session = AsyncMock()
+    service = BookService()
+    items = [
+        {"book_id": 1, "rating": 4},
+        {"book_id": 2, "rating": 9},
+        {"book_id": 3, "rating": 2},
+        {"book_id": 1, "rating": 5, "review_text": "Changed my mind"},
+        {"book_id": 99, "rating": 3},
+        {"book_id": 4, "rating": 1},
+    ]
+
+    with patch('app.crud.crud_book.book.lock_existing_ids', new_callable=AsyncMock) as mock_existing, \
+         patch('app.crud.crud_book.book.apply_rating_deltas', new_callable=AsyncMock) as mock_deltas, \
+         patch('app.crud.crud_review.review.get_ratings_by_user', new_callable=AsyncMock) as mock_previous, \
+         patch('app.crud.crud_review.review.upsert_many', new_callable=AsyncMock) as mock_upsert:
+        mock_existing.return_value = {1, 3, 4}
+        mock_previous.return_value = {3: 4}
+        mock_upsert.return_value = [
+            SimpleNamespace(id=10, book_id=1), SimpleNamespace(id=11, book_id=3)
+        ]
+        result = await service.add_reviews_batch(db=mock_db_session, user_id=1, items=items)
+
+    # Book 4 was deleted after it was locked, so the upsert returned no row for it
+    assert [item.status for item in result.items] == [
+        "superseded", "invalid", "updated", "created", "not_found", "failed"
+    ]
+    assert result.items[3].review_id == 10
+    assert (result.created, result.updated, result.failed) == (1, 1, 3)
+    assert [w["book_id"] for w in mock_upsert.await_args.kwargs["items"]] == [1, 3, 4]
+    # Book 1 gains a review; book 3's review goes from 4 to 2
+    mock_deltas.assert_awaited_once_with(mock_db_session, {1: (5, 1), 3: (-2, 0), 4: (1, 1)})
+    mock_db_session.commit.assert_awaited_once()
+
+@pytest.mark.asyncio
+async def test_books_page_etag_tracks_book_versions():
+    """
+    Test that a listing page's ETag is stable while the versions of the books
+    on it are unchanged, and changes when one of them is bumped.
+    """
+    mock_db_session = AsyncMock()
+    service = BookService()
+    rows = [
+        SimpleNamespace(id=1, version=3, updated_at=datetime(2024, 1, 1)),
+        SimpleNamespace(id=2, version=1, updated_at=datetime(2024, 1, 2)),
+    ]
+
+    with patch('app.crud.crud_book.book.get_page_versions',
+               new_callable=AsyncMock) as mock_versions:
+        mock_versions.return_value = rows
+        etag, last_modified = await service.get_books_page_etag(
+            db=mock_db_session, skip=0, limit=10, search=None
+        )
+        assert (etag, last_modified) == await service.get_books_page_etag(
+            db=mock_db_session, skip=0, limit=10, search=None
+        )
+        assert last_modified == datetime(2024, 1, 2)
+
+        rows[0].version = 4
+        bumped_etag, _ = await service.get_books_page_etag(
+            db=mock_db_session, skip=0, limit=10, search=None
+        )
+
+    assert etag.startswith('W/"')
+    assert bumped_etag != etag
+    # The version query covers the extra row that decides the next cursor
+    assert mock_versions.await_args.kwargs["limit"] == 11
+
+@pytest.mark.asyncio
+async def test_resolved_listing_page_is_shared_by_etag_and_body(mock_books_with_reviews: List[Book]):
+    """
+    Test that a listing page resolved once feeds both the ETag query and the
+    rendered body, so the trigram index is searched once per request.
+    """
+    mock_db_session = AsyncMock()
+    service = BookService()
+    candidates = SearchResult([1, 2], True, False)
+
+    with patch('app.services.book_service.settings.BOOK_SEARCH_BACKEND', "trigram"), \
+         patch('app.services.book_service.response_cache.backend', None), \
+         patch.object(service, '_search_index_candidates', new_callable=AsyncMock) as mock_candidates, \
+         patch('app.crud.crud_book.book.get_page_versions', new_callable=AsyncMock) as mock_versions, \
+         patch('app.crud.crud_book.book.get_multi_with_ratings', new_callable=AsyncMock) as mock_get_multi:
+        mock_candidates.return_value = candidates
+        mock_versions.return_value = [SimpleNamespace(id=1, version=1, updated_at=None)]
+        mock_get_multi.return_value = [(mock_books_with_reviews[0], 1)]
+
+        query = await service.resolve_books_page(mock_db_session, skip=0, search="test")
+        kwargs = {"skip": 0, "limit": 10, "search": "test", "query": query}
+        await service.get_books_page_etag(mock_db_session, **kwargs)
+        body, _ = await service.get_books_page_json(mock_db_session, etag='W/"x"', **kwargs)
+
+    mock_candidates.assert_awaited_once()
+    assert query.sort == "relevance"
+    for mock_query in (mock_versions, mock_get_multi):
+        assert mock_query.await_args.kwargs["candidate_ids"] == [1, 2]
+    assert '"id":1' in body
+
+@pytest.mark.asyncio
+async def test_reviews_etag_varies_with_the_response_it_validates():
+    """
+    Test that a review listing's ETag differs between pages, page sizes and
+    formats of the same book version, and changes when the version is bumped.
+    """
+    mock_db_session = AsyncMock()
+    service = BookService()
+    version = SimpleNamespace(version=3, updated_at=datetime(2024, 1, 1))
+
+    with patch('app.crud.crud_book.book.get_version', new_callable=AsyncMock) as mock_version:
+        mock_version.return_value = version
+
+        async def etag(**kwargs):
+            tag, _ = await service.get_reviews_etag(db=mock_db_session, book_id=1, **kwargs)
+            return tag
+
+        first_page = await etag(limit=10)
+        assert first_page == await etag(limit=10)
+        tags = {
+            first_page,
+            await etag(limit=10, cursor="next"),
+            await etag(limit=20),
+            await etag(limit=10, format="ndjson"),
+        }
+        assert len(tags) == 4
+        # The limit does not apply to streamed responses
+        assert await etag(limit=10, format="ndjson") == await etag(limit=20, format="ndjson")
+
+        version.version = 4
+        assert await etag(limit=10) != first_page
+
+        mock_version.return_value = None
+        assert await service.get_reviews_etag(db=mock_db_session, book_id=99, limit=10) is None
+
+@pytest.mark.asyncio
+async def test_books_page_etag_varies_with_the_listing_over_the_same_rows():
+    """
+    Test that listings reading the same rows, but differing in limit, sort,
+    search or cursor (and so in body or next cursor), get different ETags.
+    """
+    mock_db_session = AsyncMock()
+    service = BookService()
+    rows = [
+        SimpleNamespace(id=1, version=1, updated_at=None),
+        SimpleNamespace(id=2, version=1, updated_at=None),
+    ]
+
+    with patch('app.crud.crud_book.book.get_page_versions',
+               new_callable=AsyncMock) as mock_versions:
+        mock_versions.return_value = rows
+
+        async def etag(**kwargs):
+            tag, _ = await service.get_books_page_etag(
+                db=mock_db_session, **{"skip": 0, "limit": 1, "search": None, **kwargs}
+            )
+            return tag
+
+        tags = {
+            await etag(),
+            await etag(limit=2),
+            await etag(sort="title"),
+            await etag(search="dune"),
+            await etag(cursor=encode_cursor("id", 0, 0)),
+        }
+    assert len(tags) == 5
+
+@pytest.mark.asyncio
+async def test_export_catalog_csv_repeats_books_per_review():
+    """
+    Test that a CSV export with reviews emits a header, one line per review with
+    the book columns repeated, and one line with empty review columns for a book
+    without reviews; and that each batch of books is read with one review query.
+    """
+    service = BookService()
+    BookRow = namedtuple("BookRow", list(EXPORT_BOOK_FIELDS) + ["average_rating", "review_count"])
+    batch = [
+        BookRow(1, "Dune", "Frank Herbert", "Science Fiction", None, None, None, None, None, Decimal("4.5"), 2),
+        BookRow(2, "Emma", "Jane Austen", "Classic", None, None, None, None, None, None, 0),
+    ]
+    reviews = [
+        SimpleNamespace(id=10, book_id=1, user_id=7, rating=5, review_text="Great", created_at=None),
+        SimpleNamespace(id=11, book_id=1, user_id=8, rating=4, review_text=None, created_at=None),
+    ]
+
+    async def stream_export(db, *, with_stats):
+        assert with_stats
+        yield batch
+
+    with patch('app.services.book_service.SessionLocal'), \
+         patch('app.crud.crud_book.book.stream_export', new=stream_export), \
+         patch('app.crud.crud_review.review.get_for_book_range',
+               new_callable=AsyncMock) as mock_reviews:
+        mock_reviews.return_value = reviews
+        chunks = [chunk async for chunk in service.export_catalog(format="csv", include="reviews")]
+
+    lines = "".join(chunks).splitlines()
+    assert lines[0].startswith("id,title,author,") and lines[0].endswith(",review_id,rating,review_text,user_id,review_created_at")
+    assert lines[1:] == [
+        "1,Dune,Frank Herbert,Science Fiction,,,,,,4.5,2,10,5,Great,7,",
+        "1,Dune,Frank Herbert,Science Fiction,,,,,,4.5,2,11,4,,8,",
+        "2,Emma,Jane Austen,Classic,,,,,,,0,,,,,",
+    ]
+    assert mock_reviews.await_args.kwargs == {"first_book_id": 1, "last_book_id": 2}
+
+@pytest.mark.asyncio
+async def test_import_from_google_books_reports_status_per_id():
+    """
+    Test that a batch import skips ids already in the catalog and repeated ids,
+    inserts the fetched volumes with one call, and reports volumes Google does
+    not know as not_found.
+    """
+    mock_db_session = AsyncMock()
+    service = BookService()
+
+    async def get_book_details(google_books_id):
+        if google_books_id == "missing":
+            return None
+        return {"google_books_id": google_books_id, "title": f"Title {google_books_id}", "authors": ["A", "B"]}
+
+    async def create_many_from_google(db, *, rows):
+        return [SimpleNamespace(id=100 + i, **row) for i, row in enumerate(rows)]
+
+    with patch('app.crud.crud_book.book.get_existing_google_books_ids',
+               new_callable=AsyncMock) as mock_existing, \
+         patch('app.services.book_service.google_books_service.get_book_details',
+               side_effect=get_book_details) as mock_details, \
+         patch('app.crud.crud_book.book.create_many_from_google',
+               side_effect=create_many_from_google) as mock_create:
+        mock_existing.return_value = {"old"}
+        result = await service.import_from_google_books(
+            mock_db_session, google_books_ids=["new1", "old", "new1", "missing", "new2"], genre="Fiction"
+        )
+
+    assert [item.status for item in result.items] == ["imported", "exists", "duplicate", "not_found", "imported"]
+    assert [item.book_id for item in result.items] == [100, None, None, None, 101]
+    assert (result.imported, result.existing, result.not_found) == (2, 1, 1)
+    mock_existing.assert_awaited_once_with(mock_db_session, ["new1", "old", "missing", "new2"])
+    assert mock_details.await_count == 3
+    rows = mock_create.await_args.kwargs["rows"]
+    assert [row["google_books_id"] for row in rows] == ["new1", "new2"]
+    assert rows[0]["author"] == "A, B" and rows[0]["genre"] == "Fiction"
@@ -0,0 +1,127 @@
+from datetime import datetime, timezone
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.orm import sessionmaker
+
+from app.db.base_class import Base
+from app.db.models import Book, GenreStatistics
+from app.services.google_books_service import GoogleBooksUnavailable
+from app.tasks.enrichment import enrich_pending_books, pending_id_ranges
+from app.tasks.tasks import enrich_google_books_chunk, summarize_google_books_enrichment
+
+
+def volume(google_books_id: str) -> dict:
+    return {"google_books_id": google_books_id, "description": f"About {google_books_id}", "authors": ["A. Author"]}
+
+
+def test_enrichment_commits_chunks_and_resumes_after_unavailable():
+    """
+    Test that only pending books are looked up, that matched and unmatched
+    books are marked enriched chunk by chunk, that a volume linked to another
+    book is not linked twice nor an author given to a book whose title already
+    has it, and that a run stopped by Google Books being
+    unavailable leaves the rest pending for the next run.
+    """
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine, tables=[Book.__table__, GenreStatistics.__table__])
+    with engine.begin() as conn:
+        conn.execute(insert(Book.__table__), [
+            {"id": id, "title": title, "author": "X", "genre": "Fiction", "google_books_id": None, "enriched_at": None}
+            for id, title in [(1, "Taken"), (2, "Unknown"), (4, "Dune"), (5, "Emma")]
+        ])
+        conn.execute(insert(Book.__table__), [
+            {"id": 3, "title": "Linked", "author": "X", "genre": "Fiction",
+             "google_books_id": "vol-3", "enriched_at": datetime.now(timezone.utc)},
+            {"id": 6, "title": "Taken", "author": "A. Author", "genre": "Fiction",
+             "google_books_id": None, "enriched_at": datetime.now(timezone.utc)},
+        ])
+    db = sessionmaker(bind=engine)()
+    down = True
+
+    async def search_books(query: str, max_results: int):
+        title = query.split()[0]
+        if title == "Taken":
+            return [volume("vol-3")]
+        if title == "Unknown":
+            return []
+        if down:
+            raise GoogleBooksUnavailable("Google Books is rate limiting requests", retry_after=5)
+        return [volume(f"vol-{title.lower()}")]
+
+    search = AsyncMock(side_effect=search_books)
+    with patch("app.tasks.enrichment.google_books_service.search_books", search), \
+            patch("app.tasks.enrichment.response_cache.invalidate_sync"):
+        first = enrich_pending_books(db, chunk_size=2, concurrency=2, time_budget=60)
+        down = False
+        second = enrich_pending_books(db, chunk_size=2, concurrency=2, time_budget=60)
+
+    assert (first["books_enriched"], first["books_unmatched"], first["books_failed"]) == (1, 1, 2)
+    assert first["stopped_by"] == "google_books_unavailable"
+    assert not first["complete"]
+    assert (second["books_enriched"], second["books_unmatched"], second["books_failed"]) == (2, 0, 0)
+    assert second["complete"]
+    searched = [call.kwargs["query"].split()[0] for call in search.call_args_list]
+    assert searched == ["Taken", "Unknown", "Dune", "Emma", "Dune", "Emma"]
+
+    books = {book.id: book for book in db.scalars(select(Book))}
+    assert books[1].google_books_id is None
+    assert books[1].description == "About vol-3"
+    assert books[1].author == "X"
+    assert books[4].author == "A. Author"
+    assert books[2].enriched_at is not None and books[2].description is None
+    assert books[3].description is None
+    assert [books[4].google_books_id, books[5].google_books_id] == ["vol-dune", "vol-emma"]
+    assert all(book.enriched_at is not None for book in books.values())
+    assert db.get(GenreStatistics, "Fiction").books_with_google_id == 2
+    db.close()
+
+
+def test_pending_id_ranges_partition_pending_books():
+    """
+    Test that the fan-out splits only the pending books into consecutive id
+    ranges of the requested size.
+    """
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine, tables=[Book.__table__])
+    with engine.begin() as conn:
+        conn.execute(insert(Book.__table__), [
+            {"id": id, "title": f"T{id}", "author": "A", "genre": "Fiction",
+             "enriched_at": datetime.now(timezone.utc) if id in (3, 4) else None}
+            for id in range(1, 9)
+        ])
+    db = sessionmaker(bind=engine)()
+
+    assert pending_id_ranges(db, range_size=3) == [(1, 5, 3), (6, 8, 3)]
+    assert pending_id_ranges(db, range_size=10) == [(1, 8, 6)]
+    db.close()
+
+
+def test_chunk_task_retries_only_failed_and_unreached_books():
+    """
+    Test that a chunk stopped by Google Books being unavailable is retried for
+    just its failed ids and the rest of its range, and that the counts of all
+    attempts are added up in its result and in the chord summary.
+    """
+    runs = [
+        {"books_enriched": 3, "books_unmatched": 1, "failed_ids": [4], "stopped_by": "google_books_unavailable",
+         "last_book_id": 5},
+        {"books_enriched": 5, "books_unmatched": 0, "failed_ids": [], "stopped_by": None, "last_book_id": 10},
+    ]
+    enrich = MagicMock(side_effect=runs)
+    with patch("app.tasks.enrichment.enrich_pending_books", enrich):
+        result = enrich_google_books_chunk.apply(args=(1, 10)).get()
+
+    assert [call.kwargs for call in enrich.call_args_list] == [
+        {"first_id": 1, "last_id": 10, "book_ids": ()},
+        {"first_id": 6, "last_id": 10, "book_ids": [4]},
+    ]
+    assert result["status"] == "success"
+    assert (result["books_enriched"], result["books_unmatched"], result["books_failed"]) == (8, 1, 0)
+    assert result["attempts"] == 2
+
+    summary = summarize_google_books_enrichment([result, {**result, "status": "incomplete", "books_failed": 2}], 20)
+    assert summary["books_enriched"] == 16
+    assert summary["books_failed"] == 2
+    assert summary["chunks_incomplete"] == 1
+    assert summary["status"] == "incomplete"
@@ -0,0 +1,87 @@
+import time
+
+import pytest
+from unittest.mock import patch
+
+from app.services.google_books_cache import GoogleBooksCache, search_key
+
+
+def make_cache(path) -> GoogleBooksCache:
+    return GoogleBooksCache(
+        max_entries=2, path=str(path), max_bytes=2**20, stale_seconds=100, negative_ttl=10
+    )
+
+
+def fetcher(*values):
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        value = values[min(len(calls), len(values)) - 1]
+        if isinstance(value, Exception):
+            raise value
+        return value
+
+    return fetch, calls
+
+
+@pytest.mark.asyncio
+async def test_disk_tier_serves_other_processes_and_normalizes_queries(tmp_path):
+    """
+    Test that a fetched result is served from memory, that a second cache on
+    the same file (another process) finds it on disk, and that search keys
+    ignore case and extra whitespace.
+    """
+    path = tmp_path / "cache.db"
+    fetch, calls = fetcher([{"title": "Dune"}])
+    cache = make_cache(path)
+    assert await cache.get_or_fetch(search_key("Dune  Herbert", 3), fetch, ttl=60) == [{"title": "Dune"}]
+    assert await cache.get_or_fetch(search_key(" dune herbert", 3), fetch, ttl=60) == [{"title": "Dune"}]
+
+    other_process = make_cache(path)
+    assert await other_process.get_or_fetch(search_key("DUNE HERBERT", 3), fetch, ttl=60) == [{"title": "Dune"}]
+    assert len(calls) == 1
+    assert (cache.stats()["memory_hits"], other_process.stats()["disk_hits"]) == (1, 1)
+    await cache.aclose()
+    await other_process.aclose()
+
+
+@pytest.mark.asyncio
+async def test_stale_entries_are_served_while_refreshing(tmp_path):
+    """
+    Test that an expired entry is returned immediately while one background
+    fetch refreshes it, and that "no results" expire after the negative TTL.
+    """
+    cache = make_cache(tmp_path / "cache.db")
+    fetch, calls = fetcher({"title": "Old"}, {"title": "New"})
+    await cache.get_or_fetch("volume:1", fetch, ttl=60)
+
+    now = time.time()
+    with patch("app.services.google_books_cache.time.time", return_value=now + 61):
+        assert await cache.get_or_fetch("volume:1", fetch, ttl=60) == {"title": "Old"}
+        assert await cache.get_or_fetch("volume:1", fetch, ttl=60) == {"title": "Old"}
+        await next(iter(cache._tasks))
+    assert await cache.get_or_fetch("volume:1", fetch, ttl=60) == {"title": "New"}
+    assert len(calls) == 2
+    assert cache.stats()["revalidations"] == 1
+
+    empty, empty_calls = fetcher([])
+    assert await cache.get_or_fetch("search:missing", empty, ttl=60) == []
+    assert await cache.get_or_fetch("search:missing", empty, ttl=60) == []
+    assert len(empty_calls) == 1
+    with patch("app.services.google_books_cache.time.time", return_value=now + 200):
+        await cache.get_or_fetch("search:missing", empty, ttl=60)
+    assert len(empty_calls) == 2
+    await cache.aclose()
+
+
+@pytest.mark.asyncio
+async def test_fetch_errors_are_not_cached(tmp_path):
+    """Test that a failed fetch propagates and the next lookup fetches again"""
+    cache = make_cache(tmp_path / "cache.db")
+    fetch, calls = fetcher(RuntimeError("429"), {"title": "Dune"})
+    with pytest.raises(RuntimeError):
+        await cache.get_or_fetch("volume:1", fetch, ttl=60)
+    assert await cache.get_or_fetch("volume:1", fetch, ttl=60) == {"title": "Dune"}
+    assert len(calls) == 2
+    await cache.aclose()
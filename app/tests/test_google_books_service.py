@@ -0,0 +1,159 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app.services.google_books_service import GoogleBooksService, GoogleBooksUnavailable
+
+
+def stub_transport(requests: list) -> httpx.MockTransport:
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        volume_id = request.url.path.rsplit("/", 1)[-1]
+        return httpx.Response(200, json={"id": volume_id, "volumeInfo": {"title": "Dune"}})
+
+    return httpx.MockTransport(handler)
+
+
+@pytest.mark.asyncio
+async def test_requests_share_one_client_until_closed():
+    """
+    Test that lookups reuse the client opened by start(), resolve paths against
+    the configured base URL, and that aclose() releases it.
+    """
+    requests = []
+    service = GoogleBooksService()
+    service.base_url = "http://stub.test/books/v1"
+    service.cache = None
+    service._build_client = lambda: httpx.AsyncClient(
+        base_url=service.base_url, transport=stub_transport(requests)
+    )
+
+    await service.start()
+    client = service._client
+    assert (await service.get_book_details("abc"))["title"] == "Dune"
+    assert (await service.get_book_details("def"))["google_books_id"] == "def"
+
+    assert service._client is client
+    assert [str(request.url) for request in requests] == [
+        "http://stub.test/books/v1/volumes/abc",
+        "http://stub.test/books/v1/volumes/def",
+    ]
+    assert service.stats()["requests"] == 2
+    assert service.stats()["errors"] == 0
+
+    await service.aclose()
+    assert client.is_closed
+    assert service.stats()["client_open"] is False
+
+
+def test_client_from_another_event_loop_is_closed_when_replaced():
+    """
+    Test that a call from a new event loop (as after a Celery run_async loop
+    switch) closes the client of the previous loop, whether that loop is still
+    open or already closed, instead of leaking its connection pool.
+    """
+    requests = []
+    service = GoogleBooksService()
+    service.base_url = "http://stub.test/books/v1"
+    service.cache = None
+    service._build_client = lambda: httpx.AsyncClient(
+        base_url=service.base_url, transport=stub_transport(requests)
+    )
+
+    open_loop = asyncio.new_event_loop()
+    try:
+        open_loop.run_until_complete(service.start())
+        first = service._client
+        asyncio.run(service.get_book_details("abc"))
+        second = service._client
+        assert first.is_closed and second is not first
+    finally:
+        open_loop.close()
+
+    # The loop of the second client was closed when asyncio.run returned
+    asyncio.run(service.get_book_details("def"))
+    assert second.is_closed and not service._client.is_closed
+    assert len(requests) == 2
+    asyncio.run(service.aclose())
+
+
+@pytest.mark.asyncio
+async def test_concurrent_identical_lookups_share_one_request():
+    """
+    Test that overlapping lookups of the same volume make one outbound request
+    and all get its result, that a cancelled caller does not cancel it for the
+    others, and that a different volume is fetched separately.
+    """
+    requests = []
+    release = asyncio.Event()
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        await release.wait()
+        return httpx.Response(200, json={"id": request.url.path.rsplit("/", 1)[-1], "volumeInfo": {}})
+
+    service = GoogleBooksService()
+    service.cache = None
+    service._build_client = lambda: httpx.AsyncClient(
+        base_url="http://stub.test", transport=httpx.MockTransport(handler)
+    )
+
+    callers = [asyncio.create_task(service.get_book_details("hot")) for _ in range(10)]
+    other = asyncio.create_task(service.get_book_details("cold"))
+    await asyncio.sleep(0)
+    callers[0].cancel()
+    release.set()
+    results = await asyncio.gather(*callers[1:], other)
+
+    assert [result["google_books_id"] for result in results] == ["hot"] * 9 + ["cold"]
+    assert len(requests) == 2
+    stats = service.stats()["single_flight"]
+    assert (stats["executions"], stats["coalesced"], stats["in_flight"]) == (2, 9, 0)
+    assert stats["top_coalesced_keys"] == {"volume:hot": 9}
+    await service.aclose()
+
+
+def service_with(handler) -> GoogleBooksService:
+    service = GoogleBooksService()
+    service.cache = None
+    service._build_client = lambda: httpx.AsyncClient(
+        base_url="http://stub.test", transport=httpx.MockTransport(handler)
+    )
+    return service
+
+
+@pytest.mark.asyncio
+async def test_throttled_requests_honor_retry_after_and_outages_fail_fast():
+    """
+    Test that a 429 pauses the rate limiter for its Retry-After before the retry
+    succeeds, and that once 5xx answers open the circuit, lookups raise
+    GoogleBooksUnavailable without sending requests instead of returning nothing.
+    """
+    answers = [httpx.Response(429, headers={"Retry-After": "0.05"})]
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        if answers:
+            return answers.pop(0)
+        return httpx.Response(503)
+
+    service = service_with(handler)
+    answers.append(httpx.Response(200, json={"items": [{"id": "abc", "volumeInfo": {"title": "Dune"}}]}))
+    books = await service.search_books("dune")
+    assert [book["google_books_id"] for book in books] == ["abc"]
+    assert service.throttled == 1
+    assert service.rate_limiter.pauses == 1
+    assert service.concurrency.decreases == 1
+
+    for _ in range(service.breaker.failure_threshold):
+        with pytest.raises(GoogleBooksUnavailable):
+            await service.search_books("dune")
+    sent = len(requests)
+    with pytest.raises(GoogleBooksUnavailable) as exc_info:
+        await service.get_book_details("abc")
+    assert len(requests) == sent
+    assert exc_info.value.retry_after > 0
+    assert service.stats()["circuit_breaker"]["state"] == "open"
+    await service.aclose()
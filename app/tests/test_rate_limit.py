@@ -0,0 +1,92 @@
+import asyncio
+
+import pytest
+from unittest.mock import patch
+
+from app.services.rate_limit import (
+    AdaptiveConcurrencyLimiter,
+    CircuitBreaker,
+    CircuitOpenError,
+    MemoryTokenBucket,
+    RateLimiter,
+    RateLimitTimeout,
+)
+
+
+@pytest.mark.asyncio
+async def test_token_bucket_allows_bursts_then_paces_and_pauses():
+    """
+    Test that the bucket grants `burst` tokens at once, then asks callers to wait
+    1/rate per token, and that a pause (Retry-After) makes acquire give up when
+    it is longer than the max wait.
+    """
+    bucket = MemoryTokenBucket(rate=10, burst=2)
+    with patch("app.services.rate_limit.time.monotonic", return_value=100.0):
+        bucket._updated = 100.0
+        assert [await bucket.take() for _ in range(2)] == [0.0, 0.0]
+        assert await bucket.take() == pytest.approx(0.1)
+
+    limiter = RateLimiter(MemoryTokenBucket(rate=1000, burst=1))
+    await limiter.acquire(max_wait=1)
+    await limiter.acquire(max_wait=1)
+    assert limiter.waits == 1
+
+    await limiter.pause(30)
+    with pytest.raises(RateLimitTimeout) as exc_info:
+        await limiter.acquire(max_wait=1)
+    assert exc_info.value.retry_after == pytest.approx(30, abs=0.1)
+
+
+@pytest.mark.asyncio
+async def test_concurrency_limit_grows_additively_and_halves_on_throttling():
+    """
+    Test that fast calls raise the limit by 1/limit, a throttled call halves it
+    (once per cooldown), and callers beyond the limit wait for a release.
+    """
+    limiter = AdaptiveConcurrencyLimiter(initial=4, min_limit=1, max_limit=8, latency_target=1.0)
+    for _ in range(4):
+        await limiter.acquire()
+        limiter.release(latency=0.1)
+    assert limiter.limit == pytest.approx(4.9, abs=0.05)
+
+    await limiter.acquire()
+    limiter.release(latency=0.1, throttled=True)
+    await limiter.acquire()
+    limiter.release(latency=5.0)
+    assert limiter.limit == pytest.approx(2.5, abs=0.1)
+    assert limiter.decreases == 1
+
+    await limiter.acquire()
+    await limiter.acquire()
+    waiting = asyncio.create_task(limiter.acquire())
+    await asyncio.sleep(0)
+    assert not waiting.done()
+    limiter.release(latency=0.1)
+    await asyncio.wait_for(waiting, 1)
+    assert limiter.in_flight == 2
+
+
+def test_circuit_breaker_opens_fails_fast_and_recovers_through_one_trial():
+    """
+    Test that the breaker opens after the failure threshold, rejects calls while
+    open, lets a single trial through once the reset time has passed, and closes
+    again when the trial succeeds.
+    """
+    breaker = CircuitBreaker(failure_threshold=3, reset_seconds=30)
+    with patch("app.services.rate_limit.time.monotonic", return_value=100.0):
+        for _ in range(3):
+            breaker.before_call()
+            breaker.record_failure()
+        assert breaker.state == "open"
+        with pytest.raises(CircuitOpenError) as exc_info:
+            breaker.before_call()
+        assert exc_info.value.retry_after == 30
+
+    with patch("app.services.rate_limit.time.monotonic", return_value=131.0):
+        assert breaker.state == "half_open"
+        breaker.before_call()
+        with pytest.raises(CircuitOpenError):
+            breaker.before_call()
+        breaker.record_success()
+        assert breaker.state == "closed"
+    assert (breaker.opens, breaker.rejected) == (1, 2)
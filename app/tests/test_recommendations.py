@@ -0,0 +1,199 @@
+import numpy as np
+import pytest
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from unittest.mock import patch
+
+from app.db.base_class import Base
+from app.db.models import Book, BookSimilarity, Review
+from app.crud.crud_review import review as review_crud
+from app.services import factor_model
+from app.services.factor_model import FactorModelStore, top_books, write_factor_model
+from app.services.recommendation_service import RecommendationService
+from app.tasks.factorization import train_book_recommender
+from app.tasks.similarity import train_book_similarity
+
+# user_id, book_id, rating
+RATINGS = [
+    (1, 1, 5), (1, 2, 4), (1, 3, 1),
+    (2, 1, 4), (2, 2, 5), (2, 4, 2),
+    (3, 1, 1), (3, 3, 5), (3, 4, 4),
+    (4, 2, 2), (4, 3, 4), (4, 4, 5), (4, 5, 3),
+    (5, 1, 5), (5, 5, 4),
+]
+
+
+def create_catalog(engine):
+    Base.metadata.create_all(engine, tables=[Book.__table__, Review.__table__, BookSimilarity.__table__])
+    with engine.begin() as conn:
+        conn.execute(insert(Book.__table__), [
+            {"id": book_id, "title": f"Book {book_id}", "author": "A", "genre": "Fiction"} for book_id in range(1, 7)
+        ])
+        conn.execute(insert(Review.__table__), [
+            {"user_id": user_id, "book_id": book_id, "rating": rating} for user_id, book_id, rating in RATINGS
+        ])
+
+
+def expected_neighbors(similarity: str, neighbors: int):
+    """Top neighbors computed densely, book by book"""
+    matrix = np.zeros((5, 5))
+    for user_id, book_id, rating in RATINGS:
+        matrix[user_id - 1, book_id - 1] = rating
+    rated = matrix > 0
+    if similarity == "adjusted_cosine":
+        means = matrix.sum(axis=1) / rated.sum(axis=1)
+        matrix = np.where(rated, matrix - means[:, None], 0)
+    matrix = matrix / np.linalg.norm(matrix, axis=0)
+    scores = matrix.T @ matrix
+    expected = {}
+    for book in range(5):
+        others = sorted(
+            ((score, other) for other, score in enumerate(scores[book]) if other != book and score > 1e-9),
+            reverse=True,
+        )
+        expected[book + 1] = [(other + 1, round(score, 4)) for score, other in others[:neighbors]]
+    return expected
+
+
+@pytest.mark.parametrize("similarity", ["cosine", "adjusted_cosine"])
+def test_training_keeps_top_neighbors_by_rating_similarity(similarity):
+    """
+    Test that training stores, for every rated book, its most similar books
+    by (adjusted) cosine similarity of their ratings, best first, computed
+    in blocks of books and replacing the previous neighbors.
+    """
+    engine = create_engine("sqlite://")
+    create_catalog(engine)
+    db = sessionmaker(bind=engine)()
+    db.add(BookSimilarity(book_id=6, rank=0, similar_book_id=1, score=1.0))
+    db.commit()
+
+    with patch.multiple(
+        "app.tasks.similarity.settings",
+        RECOMMENDER_SIMILARITY=similarity, RECOMMENDER_NEIGHBORS=2, RECOMMENDER_BLOCK_SIZE=2,
+    ):
+        summary = train_book_similarity(db)
+
+    stored = {}
+    for row in db.scalars(select(BookSimilarity).order_by(BookSimilarity.book_id, BookSimilarity.rank)):
+        stored.setdefault(row.book_id, []).append((row.similar_book_id, pytest.approx(row.score, abs=1e-4)))
+    expected = {book: neighbors for book, neighbors in expected_neighbors(similarity, 2).items() if neighbors}
+    assert stored == expected
+    assert (summary["ratings"], summary["users"], summary["books"]) == (15, 5, 5)
+    assert summary["neighbors"] == sum(len(neighbors) for neighbors in expected.values())
+    db.close()
+
+
+@pytest.mark.asyncio
+async def test_similar_books_are_read_from_precomputed_neighbors(tmp_path):
+    """
+    Test that similar books come from book_similarity in rank order, up to
+    the limit, that a book without neighbors has none and that an unknown
+    book is reported as missing.
+    """
+    path = tmp_path / "similar.db"
+    create_catalog(create_engine(f"sqlite:///{path}"))
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    service = RecommendationService()
+    async with async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)() as db:
+        await db.execute(insert(BookSimilarity), [
+            {"book_id": 1, "rank": 0, "similar_book_id": 2, "score": 0.9},
+            {"book_id": 1, "rank": 1, "similar_book_id": 5, "score": 0.5},
+            {"book_id": 1, "rank": 2, "similar_book_id": 4, "score": 0.1},
+        ])
+        await db.commit()
+
+        similar = await service.get_similar_books(db, book_id=1, limit=2)
+        assert [(book.id, book.title, book.similarity) for book in similar] == [
+            (2, "Book 2", 0.9), (5, "Book 5", 0.5),
+        ]
+        assert await service.get_similar_books(db, book_id=6, limit=10) == []
+        assert await service.get_similar_books(db, book_id=99, limit=10) is None
+    await engine.dispose()
+
+
+def test_factor_model_versions_and_exact_top_books(tmp_path):
+    """
+    Test that a written factor model becomes the current version, is mapped
+    read-only, that the norm-pruned top books match scoring every book, and
+    that only the newest versions are kept.
+    """
+
+    rng = np.random.default_rng(0)
+    # Factor norms with a long tail, as popular books get in practice
+    book_factors = rng.standard_normal((5000, 8)) * rng.pareto(2.0, 5000)[:, None]
+    book_ids = rng.permutation(np.arange(1, 5001))
+    user_factors = rng.standard_normal((50, 8))
+    store = FactorModelStore(str(tmp_path))
+    assert store.current() is None
+
+    versions = [
+        write_factor_model(
+            str(tmp_path), user_ids=np.arange(100, 50, -1), user_factors=user_factors,
+            book_ids=book_ids, book_factors=book_factors, meta={"mode": "implicit"}, keep_versions=2,
+        )
+        for _ in range(3)
+    ]
+    model = store.current()
+    assert model.version == versions[-1]
+    assert not model.book_factors.flags.writeable
+    assert sorted(path.name for path in tmp_path.iterdir()) == sorted(["CURRENT", *versions[1:]])
+
+    with patch.object(factor_model, "SCORE_BLOCK_SIZE", 256):
+        for user in range(0, 50, 7):
+            # user_ids were written in descending order; the model sorts them
+            factor = model.user_factor(100 - user)
+            np.testing.assert_allclose(factor, user_factors[user], rtol=1e-6)
+            rows, scores = top_books(model, factor, 10)
+            expected = np.argsort(-(book_factors.astype(np.float32) @ user_factors[user].astype(np.float32)))[:10]
+            assert model.book_ids[rows].tolist() == book_ids[expected].tolist()
+            assert list(scores) == sorted(scores, reverse=True)
+    assert model.user_factor(1) is None
+
+
+@pytest.mark.asyncio
+async def test_recommendations_come_from_trained_factors(tmp_path):
+    """
+    Test that the recommender trained over the reviews recommends the books
+    a user's like-minded readers liked, never one the user reviewed, that
+    unknown users get recommendations too, and that none are served before
+    the recommender has been trained.
+    """
+    path = tmp_path / "recommend.db"
+    sync_engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(sync_engine, tables=[Book.__table__, Review.__table__])
+    with sync_engine.begin() as conn:
+        conn.execute(insert(Book.__table__), [
+            {"id": book_id, "title": f"Book {book_id}", "author": "A", "genre": "Fiction"} for book_id in range(1, 21)
+        ])
+        # Two reader groups: odd users read the first ten books, even users the others
+        conn.execute(insert(Review.__table__), [
+            {"user_id": user_id, "book_id": book_id, "rating": 4 + book_id % 2}
+            for user_id in range(1, 41)
+            for book_id in (range(1, 11) if user_id % 2 else range(11, 21))
+            if (user_id + book_id) % 3
+        ])
+
+    store = FactorModelStore(str(tmp_path / "models"))
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    service = RecommendationService()
+    with patch("app.services.recommendation_service.factor_model_store", store):
+        async with async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)() as db:
+            assert await service.get_recommendations(db, user_id=1, limit=3) is None
+
+            with patch.multiple(
+                "app.tasks.factorization.settings",
+                RECOMMENDER_MODEL_DIR=store.directory, RECOMMENDER_FACTORS=4, RECOMMENDER_ALS_ITERATIONS=8,
+            ):
+                with sessionmaker(bind=sync_engine)() as sync_db:
+                    summary = train_book_recommender(sync_db)
+            assert (summary["users"], summary["books"], summary["mode"]) == (40, 20, "implicit")
+
+            reviewed = set(await review_crud.get_book_ids_by_user(db, user_id=1))
+            recommended = await service.get_recommendations(db, user_id=1, limit=3)
+            assert len(recommended) == 3
+            assert {book.id for book in recommended} == set(range(1, 11)) - reviewed
+            assert [book.score for book in recommended] == sorted((book.score for book in recommended), reverse=True)
+            assert len(await service.get_recommendations(db, user_id=999, limit=5)) == 5
+    await engine.dispose()
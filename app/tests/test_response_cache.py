@@ -0,0 +1,81 @@
+import pytest
+from unittest.mock import patch
+
+from app.services.response_cache import MemoryCacheBackend, ResponseCache
+
+
+@pytest.fixture
+def cache() -> ResponseCache:
+    response_cache = ResponseCache()
+    response_cache.backend = MemoryCacheBackend(max_entries=2)
+    return response_cache
+
+
+def counter(value):
+    calls = []
+
+    async def compute():
+        calls.append(value)
+        return value
+
+    return compute, calls
+
+
+@pytest.mark.asyncio
+async def test_entries_are_served_until_one_of_their_tags_is_invalidated(cache: ResponseCache):
+    """
+    Test that a cached value is reused, and that invalidating a tag it carries
+    (but not an unrelated one) forces a recompute.
+    """
+    compute, calls = counter(["page"])
+    tags = lambda _: ["books", "book:1"]
+
+    assert await cache.get_or_compute("k", compute, tags) == ["page"]
+    assert await cache.get_or_compute("k", compute, tags) == ["page"]
+    await cache.invalidate("book:2")
+    assert await cache.get_or_compute("k", compute, tags) == ["page"]
+    assert len(calls) == 1
+
+    await cache.invalidate("book:1")
+    assert await cache.get_or_compute("k", compute, tags) == ["page"]
+    assert len(calls) == 2
+    assert cache.stats()["stale"] == 1
+    assert cache.stats()["hits"] == 2
+
+
+@pytest.mark.asyncio
+async def test_value_invalidated_while_computing_is_not_stored(cache: ResponseCache):
+    """
+    Test that a result whose tags were invalidated during its computation is
+    returned but not cached, so the write that raced it is not hidden.
+    """
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await cache.invalidate("book:1")
+        return "stale page"
+
+    await cache.get_or_compute("k", compute, lambda _: ["book:1"])
+    await cache.get_or_compute("k", compute, lambda _: ["book:1"])
+    assert len(calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_lru_eviction_and_ttl_expiry(cache: ResponseCache):
+    """
+    Test that the least recently used entry is evicted beyond max_entries and
+    that entries expire after the TTL.
+    """
+    for key in ("a", "b"):
+        await cache.get_or_compute(key, counter(key)[0], lambda _: [])
+    await cache.get_or_compute("a", counter("a")[0], lambda _: [])  # "a" is now most recent
+    await cache.get_or_compute("c", counter("c")[0], lambda _: [])
+
+    assert cache.stats()["evictions"] == 1
+    assert await cache.backend.get("b") is None
+    assert await cache.backend.get("a") is not None
+
+    with patch("app.services.response_cache.time.monotonic", return_value=1e12):
+        assert await cache.backend.get("a") is None
+    assert cache.stats()["expirations"] == 1
@@ -0,0 +1,80 @@
+import pytest
+
+from app.services.search_index import BookSearchIndex, TrigramIndex
+
+
+@pytest.fixture
+def search_index() -> BookSearchIndex:
+    service_index = BookSearchIndex()
+    service_index.index = TrigramIndex()
+    for book_id, title, author, genre in [
+        (1, "The Hitchhiker's Guide to the Galaxy", "Douglas Adams", "Science Fiction"),
+        (2, "Project Hail Mary", "Andy Weir", "Science Fiction"),
+        (3, "Pride and Prejudice", "Jane Austen", "Romance"),
+        (4, "Dune", "Frank Herbert", "Science Fiction"),
+    ]:
+        service_index.add_book(book_id, title, author, genre)
+    return service_index
+
+
+def test_exact_search_matches_word_prefixes_across_fields(search_index: BookSearchIndex):
+    """
+    Test that every query word must match the start of a word in the
+    title, author or genre.
+    """
+    assert search_index.search("hitch").ids == [1]
+    assert search_index.search("jane pride").ids == [3]
+    assert search_index.search("science").ids == [1, 2, 4]
+    assert search_index.search("science").exact is True
+    # "ience" is inside a word, not at its start
+    assert search_index.index.search_exact(["ience"], after_id=0, limit=10).ids == []
+
+
+def test_exact_search_pages_after_id_and_reports_truncation(search_index: BookSearchIndex):
+    """
+    Test that candidates continue after the given id and are capped at the limit.
+    """
+    first = search_index.search("science", limit=2)
+    assert first.ids == [1, 2]
+    assert first.truncated is True
+
+    rest = search_index.search("science", after_id=2, limit=2)
+    assert rest.ids == [4]
+    assert rest.truncated is False
+
+
+def test_search_falls_back_to_typo_tolerant_matching(search_index: BookSearchIndex):
+    """
+    Test that a misspelled query with no exact hit still finds the book.
+    """
+    result = search_index.search("hichhiker")
+    assert result.ids == [1]
+    assert result.exact is False
+
+
+def test_reindexing_changed_book_adds_new_text_and_skips_unchanged():
+    """
+    Test that re-adding a book with new text makes it findable by the new
+    text, counts it as stale, and that re-adding identical text is a no-op.
+    """
+    index = TrigramIndex()
+    assert index.add(7, "Old Title", "Author", "Fiction") is True
+    assert index.add(7, "Old Title", "Author", "Fiction") is False
+    assert index.add(7, "New Title", "Author", "Fiction") is True
+
+    assert index.search_exact(["new"], after_id=0, limit=10).ids == [7]
+    assert index.document_count == 1
+    assert index.stale_documents == 1
+
+
+def test_out_of_order_ids_are_sorted_and_deduplicated():
+    """
+    Test that posting lists stay sorted when books are indexed out of id order.
+    """
+    index = TrigramIndex()
+    index.add(5, "Dune", "Frank Herbert", "Science Fiction")
+    index.add(2, "Dune Messiah", "Frank Herbert", "Science Fiction")
+    index.add(2, "Dune Messiah II", "Frank Herbert", "Science Fiction")
+
+    assert list(index.postings(" du")) == [2, 5]
+    assert index.search_exact(["dune"], after_id=0, limit=10).ids == [2, 5]
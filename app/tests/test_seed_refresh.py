@@ -0,0 +1,66 @@
+import io
+import json
+from unittest.mock import patch
+
+from sqlalchemy import create_engine, insert, select
+
+from app.db.base_class import Base
+from app.db.models import Book, GenreStatistics
+from app.tasks.seed_refresh import _iter_json_array, refresh_from_feed
+
+
+def test_json_array_feed_is_parsed_incrementally():
+    """
+    Test that the JSON array parser yields the items of an array read in
+    chunks smaller than one item, whitespace and all.
+    """
+    items = [{"title": "Dune", "author": "Frank Herbert"}, {"title": "Emma, \"Vol. 1\"", "author": "Jane Austen"}]
+    feed = io.StringIO(" [\n" + " ,\n ".join(json.dumps(item) for item in items) + "\n] ")
+
+    assert list(_iter_json_array(feed, read_size=7)) == items
+
+
+def test_refresh_merges_feed_on_normalized_title_and_author(tmp_path):
+    """
+    Test that the feed is merged in batches: a known book (matched ignoring
+    case and spaces) gets its genre updated, an unchanged one is left alone,
+    new books are added, and invalid or repeated rows are counted and skipped.
+    The genre statistics counters follow the added and moved books.
+    """
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine, tables=[Book.__table__, GenreStatistics.__table__])
+    with engine.begin() as conn:
+        conn.execute(insert(Book.__table__), [
+            {"title": "Dune", "author": "Frank Herbert", "genre": "Fiction"},
+            {"title": "Emma", "author": "Jane Austen", "genre": "Classic"},
+        ])
+    feed = tmp_path / "feed.ndjson"
+    feed.write_text("\n".join(json.dumps(row) for row in [
+        {"title": " dune", "author": "FRANK HERBERT ", "genre": "Science Fiction"},
+        {"title": "Emma", "author": "Jane Austen", "genre": "Classic"},
+        {"title": "Ulysses", "author": "James Joyce", "genre": "Modernist"},
+        {"title": "", "author": "Nobody", "genre": "Fiction"},
+        {"title": "Middlemarch", "author": "George Eliot", "genre": "Novel"},
+        {"title": "Middlemarch", "author": "George Eliot", "genre": "Classic"},
+    ]))
+
+    with patch("app.tasks.seed_refresh.settings.DB_TYPE", "sqlite"), engine.connect() as conn:
+        counts = refresh_from_feed(conn, str(feed), batch_size=4)
+
+    assert counts == {
+        "processed": 6, "added": 2, "updated": 1, "unchanged": 1, "invalid": 1, "duplicates": 1,
+    }
+    with engine.connect() as conn:
+        books = {title: (genre, version) for title, genre, version in conn.execute(
+            select(Book.title, Book.genre, Book.version)
+        )}
+    assert books == {
+        "Dune": ("Science Fiction", 1),
+        "Emma": ("Classic", 0),
+        "Ulysses": ("Modernist", 0),
+        "Middlemarch": ("Classic", 0),
+    }
+    # The counters started empty, so they hold the changes: Dune moved genre
+    with engine.connect() as conn:
+        genres = dict(conn.execute(select(GenreStatistics.genre, GenreStatistics.books)).all())
+    assert genres == {"Fiction": -1, "Science Fiction": 1, "Modernist": 1, "Classic": 1}
@@ -0,0 +1,158 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine, insert, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from unittest.mock import AsyncMock, patch
+
+from app.crud.crud_book import book as book_crud
+from app.db.base_class import Base
+from app.db.models import Book, BookRatingStatistics, BookStatistics, GenreStatistics, Review
+from app.schemas.book import BookCreate
+from app.schemas.review import ReviewCreate
+from app.services.book_service import BookService
+from app.tasks.statistics import reconcile_counters
+
+TABLES = [Book.__table__, Review.__table__, BookStatistics.__table__, GenreStatistics.__table__]
+
+
+@pytest.mark.asyncio
+async def test_write_paths_keep_statistics_counters_current(tmp_path):
+    """
+    Test that creating books, writing, replacing and deleting reviews (one by
+    one and in batches) and importing books keep the counters served by the
+    statistics endpoint equal to what a full recompute finds.
+    """
+    path = tmp_path / "statistics.db"
+    sync_engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(sync_engine, tables=TABLES)
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    service = BookService()
+
+    with patch("app.services.book_service.response_cache.invalidate", AsyncMock()):
+        async with async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)() as db:
+            dune = await book_crud.create(db, obj_in=BookCreate(title="Dune", author="A", genre="Sci-Fi"))
+            ubik = await book_crud.create(
+                db, obj_in=BookCreate(title="Ubik", author="B", genre="Sci-Fi", google_books_id="g1")
+            )
+            emma = await book_crud.create(db, obj_in=BookCreate(title="Emma", author="C", genre="Classic"))
+            for user_id, book, rating in [(1, dune, 5), (1, dune, 3), (2, dune, 4), (1, emma, 2)]:
+                await service.add_or_update_review(
+                    db, book_id=book.id, user_id=user_id, review_in=ReviewCreate(rating=rating)
+                )
+            await service.add_reviews_batch(db, user_id=3, items=[
+                {"book_id": dune.id, "rating": 1}, {"book_id": ubik.id, "rating": 2},
+            ])
+            await service.add_reviews_batch(db, user_id=3, items=[{"book_id": ubik.id, "rating": 5}])
+            await service.delete_review(db, book_id=emma.id, user_id=1)
+            await book_crud.create_many_from_google(db, rows=[
+                {"title": "Solaris", "author": "D", "genre": "Sci-Fi", "google_books_id": "g2"},
+            ])
+            statistics = await service.get_statistics(db)
+    await engine.dispose()
+
+    assert statistics.total_books == 4
+    assert statistics.total_reviews == 4
+    assert (statistics.books_with_reviews, statistics.books_without_reviews) == (2, 2)
+    assert (statistics.books_with_google_id, statistics.books_without_google_id) == (2, 2)
+    assert list(statistics.genre_distribution.items()) == [("Sci-Fi", 3), ("Classic", 1)]
+    assert statistics.average_reviews_per_book == 1.0
+
+    db = sessionmaker(bind=sync_engine)()
+    assert reconcile_counters(db).discrepancies == {}
+    db.close()
+
+
+def test_reconcile_reports_and_corrects_drift():
+    """
+    Test that the nightly reconciliation reports counters that drifted from
+    the book table, replaces them, and finds nothing on the next run.
+    """
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine, tables=TABLES)
+    with engine.begin() as conn:
+        conn.execute(insert(Book.__table__), [
+            {"id": 1, "title": "Dune", "author": "A", "genre": "Sci-Fi", "google_books_id": None, "rating_count": 2},
+            {"id": 2, "title": "Emma", "author": "B", "genre": "Classic", "google_books_id": "g1", "rating_count": 0},
+        ])
+        conn.execute(insert(GenreStatistics.__table__), [
+            {"genre": "Sci-Fi", "books": 1, "books_with_reviews": 1, "books_with_google_id": 0, "reviews": 3},
+            {"genre": "Horror", "books": 1, "books_with_reviews": 0, "books_with_google_id": 0, "reviews": 0},
+        ])
+    db = sessionmaker(bind=engine)()
+
+    first = reconcile_counters(db)
+    assert first.discrepancies == {
+        "Classic": {"books": {"counted": 0, "actual": 1}, "books_with_google_id": {"counted": 0, "actual": 1}},
+        "Horror": {"books": {"counted": 1, "actual": 0}},
+        "Sci-Fi": {"reviews": {"counted": 3, "actual": 2}},
+    }
+    assert (first.total_books, first.total_reviews, first.books_with_google_id) == (2, 2, 1)
+
+    db.execute(update(Book).where(Book.id == 1).values(rating_count=3))
+    db.commit()
+    second = reconcile_counters(db)
+    assert second.discrepancies == {"Sci-Fi": {"reviews": {"counted": 2, "actual": 3}}}
+    assert reconcile_counters(db).discrepancies == {}
+    assert db.query(BookStatistics).count() == 3
+    db.close()
+
+
+def test_rating_analytics_histograms_percentiles_and_bayesian_averages():
+    """
+    Test that the rating analytics computed into the statistics snapshot and
+    book_rating_statistics match the reviews' distributions per book, genre
+    and month, and that reviews of unknown books only count overall.
+    """
+    from app.tasks.analytics import compute_rating_analytics
+
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine, tables=TABLES + [BookRatingStatistics.__table__])
+    reviews = [
+        # book_id, rating, created_at
+        (1, 5, "2026-01-03 10:00:00"), (1, 5, "2026-01-20 10:00:00"), (1, 4, "2026-02-01 10:00:00"),
+        (2, 1, "2026-02-11 10:00:00"), (2, 3, "2026-02-12 10:00:00"),
+        (3, 2, "2026-02-13 10:00:00"), (3, 2, None), (3, 2, "2026-02-14 10:00:00"), (3, 5, "2026-02-15 10:00:00"),
+        (9, 4, "2026-02-16 10:00:00"),
+    ]
+    with engine.begin() as conn:
+        conn.execute(insert(Book.__table__), [
+            {"id": 1, "title": "Dune", "author": "A", "genre": "Sci-Fi"},
+            {"id": 2, "title": "Ubik", "author": "B", "genre": "Sci-Fi"},
+            {"id": 3, "title": "Emma", "author": "C", "genre": "Classic"},
+            {"id": 4, "title": "Solaris", "author": "D", "genre": "Sci-Fi"},
+        ])
+        conn.execute(insert(Review.__table__), [
+            {"book_id": book_id, "user_id": user_id, "rating": rating, "created_at": created_at and datetime.fromisoformat(created_at)}
+            for user_id, (book_id, rating, created_at) in enumerate(reviews)
+        ])
+    db = sessionmaker(bind=engine)()
+    with patch("app.tasks.analytics.settings.RATING_ANALYTICS_BATCH_SIZE", 3):
+        analytics = compute_rating_analytics(db, reconcile_counters(db))
+
+    assert (analytics["ratings"], analytics["books_rated"]) == (10, 3)
+    assert analytics["prior_mean"] == 3.3
+    assert analytics["prior_weight"] == 3.0
+    assert analytics["overall"] == {
+        "ratings": 10, "histogram": [1, 3, 1, 2, 3], "mean": 3.3, "variance": 2.01,
+        "percentiles": {"p10": 1, "p25": 2, "p50": 3, "p75": 5, "p90": 5},
+    }
+    assert analytics["genres"]["Sci-Fi"]["books_rated"] == 2
+    assert analytics["genres"]["Sci-Fi"]["histogram"] == [1, 0, 1, 1, 2]
+    assert analytics["genres"]["Classic"]["histogram"] == [0, 3, 0, 0, 1]
+    assert analytics["genres"]["Classic"]["percentiles"]["p75"] == 2
+    assert {month: value["histogram"] for month, value in analytics["monthly"].items()} == {
+        "2026-01": [0, 0, 0, 0, 2], "2026-02": [1, 2, 1, 2, 1],
+    }
+    assert [book["book_id"] for book in analytics["top_books"]] == [1, 3, 2]
+
+    dune = db.get(BookRatingStatistics, 1)
+    assert (dune.ratings, dune.histogram, dune.mean) == (3, [0, 0, 0, 1, 2], 4.6667)
+    assert dune.variance == 0.2222
+    assert dune.percentiles == {"p10": 4, "p25": 4, "p50": 5, "p75": 5, "p90": 5}
+    # (3 * 3.3 + 14) / (3 + 3)
+    assert dune.bayesian_average == 3.9833
+    assert db.get(BookRatingStatistics, 4) is None
+    assert db.query(BookStatistics).one().rating_analytics["ratings"] == 10
+    db.close()
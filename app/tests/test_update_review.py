@@ -1,9 +1,14 @@
 import pytest
 import pytest_asyncio
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from unittest.mock import AsyncMock, patch
+from app.crud.crud_book import book as book_crud
+from app.db.base_class import Base
 from app.services.book_service import BookService
+from app.schemas.book import BookCreate
 from app.schemas.review import ReviewCreate
-from app.db.models import Review as ReviewModel
+from app.db.models import Book, BookStatistics, GenreStatistics, Review as ReviewModel
 
 @pytest.mark.asyncio
 async def test_review_update():
@@ -17,15 +22,6 @@ async def test_review_update():
     book_id = 1
     user_id = 1
     
-    # Existing review data
-    existing_review = ReviewModel(
-        id=1,
-        rating=4,
-        review_text="Initial review",
-        book_id=book_id,
-        user_id=user_id
-    )
-    
     # Updated review data
     updated_review_data = ReviewCreate(
         rating=5,
@@ -42,22 +38,20 @@ async def test_review_update():
     )
     
     # 2. Act - Mock the CRUD operations
-    with patch('app.crud.crud_book.book.get', new_callable=AsyncMock) as mock_get_book:
-        with patch('app.crud.crud_review.review.get_by_book_and_user', new_callable=AsyncMock) as mock_get_review:
-            with patch('app.crud.crud_review.review.update', new_callable=AsyncMock) as mock_update:
-                
-                # Setup mocks
-                mock_get_book.return_value = True  # Book exists
-                mock_get_review.return_value = existing_review  # Review exists
-                mock_update.return_value = updated_review  # Updated review
-                
-                # Call the service method
-                result = await service.add_or_update_review(
-                    db=mock_db_session,
-                    book_id=book_id,
-                    user_id=user_id,
-                    review_in=updated_review_data
-                )
+    with patch('app.crud.crud_book.book.apply_review_rating', new_callable=AsyncMock) as mock_apply_rating:
+        with patch('app.crud.crud_review.review.upsert', new_callable=AsyncMock) as mock_upsert:
+            
+            # Setup mocks
+            mock_apply_rating.return_value = True  # Book exists
+            mock_upsert.return_value = updated_review  # Conflict on (book_id, user_id) updated the review
+            
+            # Call the service method
+            result = await service.add_or_update_review(
+                db=mock_db_session,
+                book_id=book_id,
+                user_id=user_id,
+                review_in=updated_review_data
+            )
     
     # 3. Assert
     assert result is not None
@@ -95,22 +89,20 @@ async def test_review_create_when_none_exists():
     )
     
     # 2. Act - Mock the CRUD operations
-    with patch('app.crud.crud_book.book.get', new_callable=AsyncMock) as mock_get_book:
-        with patch('app.crud.crud_review.review.get_by_book_and_user', new_callable=AsyncMock) as mock_get_review:
-            with patch('app.crud.crud_review.review.create_with_user', new_callable=AsyncMock) as mock_create:
-                
-                # Setup mocks - no existing review
-                mock_get_book.return_value = True  # Book exists
-                mock_get_review.return_value = None  # No existing review
-                mock_create.return_value = created_review  # New review created
-                
-                # Call the service method
-                result = await service.add_or_update_review(
-                    db=mock_db_session,
-                    book_id=book_id,
-                    user_id=user_id,
-                    review_in=new_review_data
-                )
+    with patch('app.crud.crud_book.book.apply_review_rating', new_callable=AsyncMock) as mock_apply_rating:
+        with patch('app.crud.crud_review.review.upsert', new_callable=AsyncMock) as mock_upsert:
+            
+            # Setup mocks - no existing review
+            mock_apply_rating.return_value = True  # Book exists
+            mock_upsert.return_value = created_review  # New review created
+            
+            # Call the service method
+            result = await service.add_or_update_review(
+                db=mock_db_session,
+                book_id=book_id,
+                user_id=user_id,
+                review_in=new_review_data
+            )
     
     # 3. Assert
     assert result is not None
@@ -161,38 +153,34 @@ async def test_multiple_users_can_review_same_book():
     )
     
     # 2. Act - Test user 1 creating review
-    with patch('app.crud.crud_book.book.get', new_callable=AsyncMock) as mock_get_book:
-        with patch('app.crud.crud_review.review.get_by_book_and_user', new_callable=AsyncMock) as mock_get_review:
-            with patch('app.crud.crud_review.review.create_with_user', new_callable=AsyncMock) as mock_create:
-                
-                # User 1 - no existing review
-                mock_get_book.return_value = True
-                mock_get_review.return_value = None  # No existing review for user 1
-                mock_create.return_value = user1_review
-                
-                result1 = await service.add_or_update_review(
-                    db=mock_db_session,
-                    book_id=book_id,
-                    user_id=user1_id,
-                    review_in=user1_review_data
-                )
+    with patch('app.crud.crud_book.book.apply_review_rating', new_callable=AsyncMock) as mock_apply_rating:
+        with patch('app.crud.crud_review.review.upsert', new_callable=AsyncMock) as mock_upsert:
+            
+            # User 1 - no existing review
+            mock_apply_rating.return_value = True
+            mock_upsert.return_value = user1_review
+            
+            result1 = await service.add_or_update_review(
+                db=mock_db_session,
+                book_id=book_id,
+                user_id=user1_id,
+                review_in=user1_review_data
+            )
     
     # 3. Act - Test user 2 creating review
-    with patch('app.crud.crud_book.book.get', new_callable=AsyncMock) as mock_get_book:
-        with patch('app.crud.crud_review.review.get_by_book_and_user', new_callable=AsyncMock) as mock_get_review:
-            with patch('app.crud.crud_review.review.create_with_user', new_callable=AsyncMock) as mock_create:
-                
-                # User 2 - no existing review
-                mock_get_book.return_value = True
-                mock_get_review.return_value = None  # No existing review for user 2
-                mock_create.return_value = user2_review
-                
-                result2 = await service.add_or_update_review(
-                    db=mock_db_session,
-                    book_id=book_id,
-                    user_id=user2_id,
-                    review_in=user2_review_data
-                )
+    with patch('app.crud.crud_book.book.apply_review_rating', new_callable=AsyncMock) as mock_apply_rating:
+        with patch('app.crud.crud_review.review.upsert', new_callable=AsyncMock) as mock_upsert:
+            
+            # User 2 - no existing review
+            mock_apply_rating.return_value = True
+            mock_upsert.return_value = user2_review
+            
+            result2 = await service.add_or_update_review(
+                db=mock_db_session,
+                book_id=book_id,
+                user_id=user2_id,
+                review_in=user2_review_data
+            )
     
     # 4. Assert
     assert result1 is not None
@@ -201,4 +189,39 @@ async def test_multiple_users_can_review_same_book():
     assert result1.user_id == user1_id
     assert result2.user_id == user2_id
     assert result1.book_id == book_id
-    assert result2.book_id == book_id
\ No newline at end of file
+    assert result2.book_id == book_id
+
+@pytest.mark.asyncio
+async def test_repeated_review_upsert_keeps_one_rating_in_aggregates(tmp_path):
+    """
+    Test against a real database that posting the same user's review of a book
+    twice replaces the rating in the book's aggregates instead of counting it again
+    """
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'reviews.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all, tables=[
+            Book.__table__, ReviewModel.__table__, BookStatistics.__table__, GenreStatistics.__table__
+        ])
+    service = BookService()
+
+    with patch("app.services.book_service.response_cache.invalidate", AsyncMock()):
+        async with async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)() as db:
+            book = await book_crud.create(db, obj_in=BookCreate(title="Dune", author="A", genre="Sci-Fi"))
+            first = await service.add_or_update_review(
+                db, book_id=book.id, user_id=1, review_in=ReviewCreate(rating=2)
+            )
+            second = await service.add_or_update_review(
+                db, book_id=book.id, user_id=1, review_in=ReviewCreate(rating=5)
+            )
+            await service.add_or_update_review(
+                db, book_id=book.id, user_id=2, review_in=ReviewCreate(rating=4)
+            )
+            stored = (await db.execute(
+                select(Book.rating_sum, Book.rating_count, Book.average_rating).where(Book.id == book.id)
+            )).one()
+            reviews = (await db.execute(select(ReviewModel.rating).order_by(ReviewModel.user_id))).scalars().all()
+    await engine.dispose()
+
+    assert second.id == first.id
+    assert reviews == [5, 4]
+    assert tuple(stored) == (9, 2, 4.5)
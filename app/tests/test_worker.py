@@ -0,0 +1,37 @@
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from sqlalchemy import text
+
+from app.tasks import worker
+
+
+def test_tasks_share_the_process_engine_and_roll_back_on_error(tmp_path):
+    """
+    Test that sessions come from one engine per process, sized to one
+    connection in a prefork child, that a failing task's work is rolled back,
+    and that the engine is disposed when the process shuts down.
+    """
+    url = f"sqlite:///{tmp_path / 'worker.db'}"
+    with patch("app.tasks.worker.sync_database_url", return_value=url), \
+            patch("app.tasks.worker.google_books_service.start", AsyncMock()), \
+            patch("app.tasks.worker.google_books_service.aclose", AsyncMock()):
+        inherited = worker.get_engine()
+        worker.open_worker_resources()
+        engine = worker.get_engine()
+        assert engine is not inherited
+        assert engine.pool.size() == 1
+
+        with worker.db_session() as db:
+            db.execute(text("CREATE TABLE t (x INTEGER)"))
+            db.commit()
+        with pytest.raises(RuntimeError):
+            with worker.db_session() as db:
+                db.execute(text("INSERT INTO t VALUES (1)"))
+                raise RuntimeError("task failed")
+        with worker.db_session() as db:
+            assert db.scalar(text("SELECT count(*) FROM t")) == 0
+            assert db.get_bind() is engine
+
+        worker.close_worker_resources()
+        assert worker._engine is None
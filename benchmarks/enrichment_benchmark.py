@@ -0,0 +1,125 @@
+"""
+Benchmark the Google Books enrichment task against a local stub of the API.
+
+Creates a SQLite catalog of N books that were never enriched, then measures
+the way the task used to work (sequential searches, a new event loop and HTTP
+client per book) on a sample, extrapolated to the whole backlog, and runs the
+chunked concurrent pipeline (app.tasks.enrichment) over all of it.
+
+The service's rate limiter and result cache are disabled, and its concurrency
+limit raised to --concurrency, so the stub's latency is what bounds both runs.
+In production GOOGLE_BOOKS_RATE_LIMIT_PER_SECOND (the API quota) does. Past
+about 50 connections httpcore's pool bookkeeping, which grows with the square
+of the pool size, starts to cost more CPU than it saves.
+
+Usage:
+    poetry run python -m benchmarks.enrichment_benchmark \\
+        --books 100000 --latency-ms 200 --concurrency 48 --db /tmp/enrichment_benchmark.db
+"""
+import argparse
+import asyncio
+import logging
+import os
+import threading
+import time
+
+import httpx
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from benchmarks.google_books_stub import GoogleBooksStub
+
+
+def create_catalog(path: str, books: int):
+    from app.db.base_class import Base
+    from app.db.models import Book
+
+    if os.path.exists(path):
+        os.remove(path)
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine, tables=[Book.__table__])
+    with engine.begin() as conn:
+        conn.execute(
+            insert(Book.__table__),
+            [{"title": f"Benchmark Title {i}", "author": f"Author {i % 997}", "genre": "Fiction"} for i in range(books)],
+        )
+    return engine
+
+
+def start_stub(latency: float) -> GoogleBooksStub:
+    """The stub runs on its own loop in a thread, as a remote API would"""
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+    return asyncio.run_coroutine_threadsafe(GoogleBooksStub(latency=latency).start(), loop).result()
+
+
+def old_task_rate(stub: GoogleBooksStub, sample: int) -> float:
+    """Books per second of the former loop: one event loop and client per sequential search"""
+
+    async def search(query: str) -> dict:
+        async with httpx.AsyncClient() as client:
+            response = await client.get(f"{stub.base_url}/volumes", params={"q": query, "maxResults": 3})
+            response.raise_for_status()
+            return response.json()
+
+    started = time.perf_counter()
+    for i in range(sample):
+        loop = asyncio.new_event_loop()
+        try:
+            assert loop.run_until_complete(search(f"Benchmark Title {i} Author {i % 997}"))["items"]
+        finally:
+            loop.close()
+    return sample / (time.perf_counter() - started)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--books", type=int, default=100_000)
+    parser.add_argument("--latency-ms", type=float, default=200.0)
+    parser.add_argument("--concurrency", type=int, default=48)
+    parser.add_argument("--chunk-size", type=int, default=2000)
+    parser.add_argument("--baseline-sample", type=int, default=25)
+    parser.add_argument("--db", default="/tmp/enrichment_benchmark.db")
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    from loguru import logger
+    logger.remove()
+
+    from app.core.config import settings
+    from app.services.google_books_service import google_books_service
+    from app.services.rate_limit import AdaptiveConcurrencyLimiter
+    from app.tasks.enrichment import enrich_pending_books
+    from app.tasks.worker import run_async
+
+    engine = create_catalog(args.db, args.books)
+    stub = start_stub(args.latency_ms / 1000)
+
+    rate = old_task_rate(stub, args.baseline_sample)
+    print(f"{'old task':<10} {rate:8.1f} books/s | {args.books / rate / 3600:6.2f} h for {args.books} books (extrapolated)")
+
+    settings.GOOGLE_BOOKS_MAX_CONNECTIONS = settings.GOOGLE_BOOKS_MAX_KEEPALIVE_CONNECTIONS = args.concurrency
+    google_books_service.base_url = stub.base_url
+    google_books_service.cache = None
+    google_books_service.rate_limiter = None
+    google_books_service.concurrency = AdaptiveConcurrencyLimiter(
+        initial=args.concurrency, min_limit=1, max_limit=args.concurrency, latency_target=10.0
+    )
+    run_async(google_books_service.start())
+
+    db = sessionmaker(bind=engine)()
+    summary = enrich_pending_books(
+        db, chunk_size=args.chunk_size, concurrency=args.concurrency, time_budget=float("inf")
+    )
+    db.close()
+    run_async(google_books_service.aclose())
+    print(
+        f"{'pipeline':<10} {summary['books_per_second']:8.1f} books/s | "
+        f"{summary['elapsed_seconds'] / 3600:6.2f} h for {summary['total_processed']} books "
+        f"({summary['chunks']} chunks, {stub.connections} connections)"
+    )
+    print(f"Speedup: {summary['books_per_second'] / rate:.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Benchmark GoogleBooksService request latency against a local stub of the API.
+
+Sends N volume lookups at concurrency C, first the way the service used to (a
+new httpx.AsyncClient, hence a new connection, per call), then through the
+service's shared pooled client. The stub's --connect-delay-ms stands in for the
+TCP + TLS handshakes a fresh connection to the real API costs.
+
+Then simulates a traffic spike: --spike-callers concurrent lookups spread over
+--spike-keys volumes, and counts the outbound requests made
+with and without single-flight coalescing.
+
+Usage:
+    poetry run python -m benchmarks.google_books_client_benchmark \\
+        --requests 500 --concurrency 10 --latency-ms 5 --connect-delay-ms 40
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+from benchmarks.google_books_stub import GoogleBooksStub
+
+
+def report(label: str, latencies: list, elapsed: float, connections: int) -> None:
+    latencies.sort()
+    print(
+        f"{label:<22} {len(latencies) / elapsed:7.0f} req/s | median {statistics.median(latencies):6.2f} ms | "
+        f"p99 {latencies[int(len(latencies) * 0.99) - 1]:6.2f} ms | {connections} connections"
+    )
+
+
+async def run_requests(args: argparse.Namespace, fetch) -> tuple:
+    latencies = []
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def one(i: int) -> None:
+        async with semaphore:
+            started = time.perf_counter()
+            assert await fetch(f"vol{i}")
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(args.requests)))
+    return latencies, time.perf_counter() - started
+
+
+async def run(args: argparse.Namespace) -> None:
+    from app.services.google_books_service import GoogleBooksService
+
+    stub = await GoogleBooksStub(
+        latency=args.latency_ms / 1000, connect_delay=args.connect_delay_ms / 1000
+    ).start()
+
+    async def fresh_client(volume_id: str) -> dict:
+        async with httpx.AsyncClient() as client:
+            response = await client.get(f"{stub.base_url}/volumes/{volume_id}")
+            response.raise_for_status()
+            return response.json()
+
+    latencies, elapsed = await run_requests(args, fresh_client)
+    report("client per request", latencies, elapsed, stub.connections)
+
+    service = GoogleBooksService()
+    service.base_url = stub.base_url
+    # Measure the client, not the result cache or the rate limit
+    service.cache = None
+    service.rate_limiter = None
+    await service.start()
+    connections_before = stub.connections
+    latencies, elapsed = await run_requests(args, service.get_book_details)
+    report("pooled client", latencies, elapsed, stub.connections - connections_before)
+    print(f"Pool stats: {service.stats()['pool']}")
+
+    for label, lookup in (
+        ("spike, uncoalesced", service._fetch_volume),
+        ("spike, single-flight", service.get_book_details),
+    ):
+        requests_before = stub.requests
+        started = time.perf_counter()
+        await asyncio.gather(*(lookup(f"hot{i % args.spike_keys}") for i in range(args.spike_callers)))
+        print(
+            f"{label:<22} {args.spike_callers} lookups of {args.spike_keys} volumes: "
+            f"{stub.requests - requests_before} outbound requests in {(time.perf_counter() - started) * 1000:.0f} ms"
+        )
+    await service.aclose()
+    await stub.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--latency-ms", type=float, default=5.0)
+    parser.add_argument("--connect-delay-ms", type=float, default=40.0)
+    parser.add_argument("--spike-callers", type=int, default=200)
+    parser.add_argument("--spike-keys", type=int, default=5)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
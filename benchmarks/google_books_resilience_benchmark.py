@@ -0,0 +1,98 @@
+"""
+Benchmark GoogleBooksService under throttling and during an outage, against
+the local stub of the API.
+
+Quota: the stub answers 429 beyond --quota-rps requests per second. Sends
+--requests lookups at --concurrency without a client-side rate limit, then with
+a token bucket set just under the quota, and reports successes, 429s received
+and elapsed time.
+
+Outage: every request takes --outage-latency-ms and fails with 503. Sends
+--requests lookups with the circuit breaker effectively disabled, then enabled,
+and reports outbound requests and how long callers waited for their errors.
+
+Usage:
+    poetry run python -m benchmarks.google_books_resilience_benchmark \\
+        --requests 200 --concurrency 20 --quota-rps 50
+"""
+import argparse
+import asyncio
+import time
+
+from benchmarks.google_books_stub import GoogleBooksStub
+
+
+def make_service(base_url: str, *, rate: float = None, failure_threshold: int = 10**9):
+    from app.services.google_books_service import GoogleBooksService
+    from app.services.rate_limit import CircuitBreaker, MemoryTokenBucket, RateLimiter
+
+    service = GoogleBooksService()
+    service.base_url = base_url
+    service.cache = None
+    service.rate_limiter = RateLimiter(MemoryTokenBucket(rate, burst=1)) if rate else None
+    service.breaker = CircuitBreaker(failure_threshold=failure_threshold, reset_seconds=60)
+    return service
+
+
+async def run_lookups(args: argparse.Namespace, service) -> tuple:
+    from app.services.google_books_service import GoogleBooksUnavailable
+
+    semaphore = asyncio.Semaphore(args.concurrency)
+    outcomes = {"ok": 0, "unavailable": 0}
+    waits = []
+
+    async def one(i: int) -> None:
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                await service.get_book_details(f"vol{i}")
+                outcomes["ok"] += 1
+            except GoogleBooksUnavailable:
+                outcomes["unavailable"] += 1
+            waits.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(args.requests)))
+    return outcomes, time.perf_counter() - started, waits
+
+
+async def run(args: argparse.Namespace) -> None:
+    stub = await GoogleBooksStub(max_rps=args.quota_rps, retry_after=1).start()
+    for label, rate in (("no rate limit", None), (f"token bucket {args.quota_rps * 0.9:g}/s", args.quota_rps * 0.9)):
+        service = make_service(stub.base_url, rate=rate)
+        throttled_before = stub.throttled
+        outcomes, elapsed, _ = await run_lookups(args, service)
+        print(
+            f"quota  | {label:<22} {outcomes['ok']} ok, {outcomes['unavailable']} unavailable, "
+            f"{stub.throttled - throttled_before} 429s received in {elapsed:.2f}s | "
+            f"concurrency limit {service.concurrency.limit:.1f}"
+        )
+        await service.aclose()
+        await asyncio.sleep(1.1)
+    await stub.stop()
+
+    stub = await GoogleBooksStub(latency=args.outage_latency_ms / 1000, error_rate=1.0).start()
+    for label, threshold in (("no circuit breaker", 10**9), ("circuit breaker", 5)):
+        service = make_service(stub.base_url, failure_threshold=threshold)
+        requests_before = stub.requests
+        outcomes, elapsed, waits = await run_lookups(args, service)
+        waits.sort()
+        print(
+            f"outage | {label:<22} {stub.requests - requests_before} outbound requests, "
+            f"median wait for the error {waits[len(waits) // 2] * 1000:.1f} ms, all failed after {elapsed:.2f}s"
+        )
+        await service.aclose()
+    await stub.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--quota-rps", type=float, default=50)
+    parser.add_argument("--outage-latency-ms", type=float, default=500)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
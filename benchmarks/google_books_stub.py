@@ -0,0 +1,172 @@
+"""
+Local stand-in for the Google Books API, for benchmarks and manual testing.
+
+A minimal HTTP/1.1 keep-alive server answering `GET {prefix}/volumes?q=...` and
+`GET {prefix}/volumes/{id}` with deterministic volumes. `connect_delay` is spent
+once per new connection before its first response, standing in for the TCP and
+TLS handshake round trips of a remote API; `latency` is added to every response.
+
+Faults can be injected (and changed while running): beyond `max_rps` requests in
+the last second it answers 429 with a `Retry-After` of `retry_after` seconds, and
+a fraction `error_rate` of requests get a 503.
+
+Run standalone:
+    poetry run python -m benchmarks.google_books_stub --port 8765 --latency-ms 20
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+import zlib
+from collections import deque
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import parse_qs, unquote, urlsplit
+
+
+def volume(volume_id: str) -> Dict[str, Any]:
+    return {
+        "id": volume_id,
+        "volumeInfo": {
+            "title": f"Stub Volume {volume_id}",
+            "authors": ["Stub Author"],
+            "description": "A volume served by the Google Books stub.",
+            "industryIdentifiers": [{"type": "ISBN_13", "identifier": "9780000000000"}],
+            "pageCount": 320,
+            "categories": ["Fiction"],
+            "imageLinks": {"thumbnail": f"http://stub.invalid/{volume_id}.jpg"},
+            "language": "en",
+        },
+    }
+
+
+class GoogleBooksStub:
+    def __init__(
+        self,
+        *,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        prefix: str = "/books/v1",
+        latency: float = 0.0,
+        connect_delay: float = 0.0,
+        max_rps: Optional[float] = None,
+        retry_after: float = 1.0,
+        error_rate: float = 0.0,
+    ):
+        self.host = host
+        self.port = port
+        self.prefix = prefix
+        self.latency = latency
+        self.connect_delay = connect_delay
+        self.max_rps = max_rps
+        self.retry_after = retry_after
+        self.error_rate = error_rate
+        self.requests = 0
+        self.connections = 0
+        self.throttled = 0
+        self.errors = 0
+        self._recent: deque = deque()
+        self._rng = random.Random(0)
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}{self.prefix}"
+
+    async def start(self) -> "GoogleBooksStub":
+        self._server = await asyncio.start_server(self._serve, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+    def inject_fault(self) -> Optional[Tuple[int, Dict[str, str]]]:
+        now = time.monotonic()
+        self._recent.append(now)
+        while self._recent[0] < now - 1:
+            self._recent.popleft()
+        if self.max_rps is not None and len(self._recent) > self.max_rps:
+            self.throttled += 1
+            return 429, {"Retry-After": f"{self.retry_after:g}"}
+        if self._rng.random() < self.error_rate:
+            self.errors += 1
+            return 503, {}
+        return None
+
+    def respond(self, path: str, query: Dict[str, list]) -> Tuple[int, Dict[str, Any]]:
+        if not path.startswith(self.prefix + "/volumes"):
+            return 404, {"error": {"code": 404, "message": "Not Found"}}
+        rest = path[len(self.prefix + "/volumes"):]
+        if rest.startswith("/"):
+            return 200, volume(unquote(rest[1:]))
+        q = query.get("q", [""])[0]
+        count = int(query.get("maxResults", ["10"])[0])
+        return 200, {"totalItems": count, "items": [volume(f"{zlib.crc32(q.encode())}-{i}") for i in range(count)]}
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.connections += 1
+        first = True
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    pass
+                self.requests += 1
+                delay = self.latency + (self.connect_delay if first else 0.0)
+                first = False
+                if delay:
+                    await asyncio.sleep(delay)
+                _, target, _ = request_line.decode("latin-1").split(" ", 2)
+                url = urlsplit(target)
+                headers: Dict[str, str] = {}
+                fault = self.inject_fault()
+                if fault is not None:
+                    status, headers = fault
+                    payload = {"error": {"code": status}}
+                else:
+                    status, payload = self.respond(url.path, parse_qs(url.query))
+                body = json.dumps(payload).encode()
+                extra = "".join(f"{name}: {value}\r\n" for name, value in headers.items())
+                writer.write(
+                    f"HTTP/1.1 {status} {'OK' if status == 200 else 'Error'}\r\n"
+                    f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n{extra}"
+                    f"Connection: keep-alive\r\n\r\n".encode() + body
+                )
+                await writer.drain()
+        except (ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+
+async def serve_forever(args: argparse.Namespace) -> None:
+    stub = await GoogleBooksStub(
+        port=args.port,
+        latency=args.latency_ms / 1000,
+        connect_delay=args.connect_delay_ms / 1000,
+        max_rps=args.max_rps,
+        retry_after=args.retry_after,
+        error_rate=args.error_rate,
+    ).start()
+    print(f"Google Books stub listening on {stub.base_url}")
+    await asyncio.Event().wait()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--connect-delay-ms", type=float, default=0.0)
+    parser.add_argument("--max-rps", type=float, default=None, help="Answer 429 beyond this request rate")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After of 429 answers, in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 503")
+    asyncio.run(serve_forever(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Benchmark the rating analytics (app.tasks.analytics).
+
+Folds N synthetic ratings, generated in memory, into the rating histograms
+batch by batch and derives the analytics from them, to time the vectorized
+computation on its own; then, with --db, runs the whole computation (reading
+the reviews, replacing book_rating_statistics) on a SQLite catalog created by
+benchmarks/statistics_benchmark.py.
+
+Usage:
+    poetry run python -m benchmarks.rating_analytics_benchmark \\
+        --ratings 50000000 --books 1000000 --db /tmp/statistics_benchmark.db
+"""
+import argparse
+import logging
+import resource
+import time
+
+
+def synthetic_batches(ratings: int, books: int, batch_size: int, seed: int = 0):
+    """(book_id, rating, month_index) batches of ratings spread over two years"""
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    for start in range(0, ratings, batch_size):
+        size = min(batch_size, ratings - start)
+        batch = np.empty((size, 3), dtype=np.int64)
+        # Skewed popularity: low ids get most of the ratings
+        batch[:, 0] = 1 + (books * rng.random(size) ** 2).astype(np.int64)
+        batch[:, 1] = rng.integers(1, 6, size)
+        batch[:, 2] = 2025 * 12 + rng.integers(0, 24, size)
+        yield batch
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ratings", type=int, default=50_000_000)
+    parser.add_argument("--books", type=int, default=1_000_000)
+    parser.add_argument("--genres", type=int, default=24)
+    parser.add_argument("--batch-size", type=int, default=100_000)
+    parser.add_argument("--db", help="SQLite catalog to run the whole computation on")
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    import numpy as np
+    from app.tasks.analytics import analyze, fold_ratings
+
+    genres = [f"Genre {i}" for i in range(args.genres)]
+    genre_of = np.arange(args.books + 1) % args.genres
+
+    # Generating the batches is not part of the computation: time it alone and subtract it
+    started = time.perf_counter()
+    for _ in synthetic_batches(args.ratings, args.books, args.batch_size):
+        pass
+    generate_seconds = time.perf_counter() - started
+    started = time.perf_counter()
+    by_book, by_month = fold_ratings(synthetic_batches(args.ratings, args.books, args.batch_size))
+    fold_seconds = time.perf_counter() - started - generate_seconds
+    started = time.perf_counter()
+    analytics, books = analyze(by_book, by_month, genres, genre_of)
+    analyze_seconds = time.perf_counter() - started
+    assert analytics["ratings"] == args.ratings
+    print(f"{args.ratings} ratings of {len(books.book_ids)} books, batches of {args.batch_size}")
+    print(f"{'fold':<10} {fold_seconds:8.3f} s (np.add.at into histograms)")
+    print(f"{'analyze':<10} {analyze_seconds:8.3f} s (summaries, percentiles, genres, top books)")
+    print(f"{'peak RSS':<10} {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:8.0f} MB")
+
+    if args.db:
+        from sqlalchemy import create_engine, func, select
+        from sqlalchemy.orm import sessionmaker
+        from app.db.base_class import Base
+        from app.db.models import BookRatingStatistics, BookStatistics, Review
+        from app.tasks.analytics import compute_rating_analytics
+
+        engine = create_engine(f"sqlite:///{args.db}")
+        Base.metadata.create_all(engine, tables=[BookRatingStatistics.__table__])
+        db = sessionmaker(bind=engine)()
+        reviews = db.scalar(select(func.count()).select_from(Review))
+        snapshot = BookStatistics(
+            total_books=0, total_reviews=0, books_with_reviews=0, books_with_google_id=0,
+            genre_distribution={}, duration_seconds=0,
+        )
+        db.add(snapshot)
+        started = time.perf_counter()
+        compute_rating_analytics(db, snapshot)
+        seconds = time.perf_counter() - started
+        print(f"{'database':<10} {seconds:8.3f} s ({reviews} reviews, {seconds / reviews * 1e6:.2f} us per review)")
+        db.close()
+
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Benchmark the personalized recommender (app.tasks.factorization and
+app.services.factor_model).
+
+Trains ALS on N synthetic ratings (generated in memory, with a long tail of
+book popularity) over a catalog of --books books, writes the factors as a
+model version under --model-dir, then maps it read-only as the API processes
+do and times scoring the top 10 books for sampled users: the norm-pruned
+block scan of top_books() against a dot product with every book followed by
+argpartition.
+
+Usage:
+    poetry run python -m benchmarks.recommender_benchmark \\
+        --ratings 10000000 --users 500000 --books 1000000 --model-dir /tmp/recommender_benchmark
+"""
+import argparse
+import logging
+import resource
+import time
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ratings", type=int, default=10_000_000)
+    parser.add_argument("--users", type=int, default=500_000)
+    parser.add_argument("--books", type=int, default=1_000_000)
+    parser.add_argument("--factors", type=int, default=64)
+    parser.add_argument("--iterations", type=int, default=10)
+    parser.add_argument("--model-dir", default="/tmp/recommender_benchmark")
+    parser.add_argument("--runs", type=int, default=200)
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    import numpy as np
+    from scipy import sparse
+    from benchmarks.similarity_benchmark import synthetic_ratings
+    from app.services.factor_model import FactorModelStore, top_books, write_factor_model
+    from app.tasks.factorization import alternating_least_squares
+
+    user_ids, book_ids, ratings = synthetic_ratings(args.ratings, args.users, args.books)
+    users, user_index = np.unique(user_ids, return_inverse=True)
+    books, book_index = np.unique(book_ids, return_inverse=True)
+    matrix = sparse.csr_matrix((ratings.astype(np.float32), (user_index, book_index)), shape=(len(users), len(books)))
+    print(f"{len(ratings)} ratings, {len(users)} users, {len(books)} books, {args.factors} factors")
+
+    started = time.perf_counter()
+    user_factors, book_factors = alternating_least_squares(
+        matrix, factors=args.factors, iterations=args.iterations, regularization=0.1, implicit=True, alpha=5.0,
+    )
+    seconds = time.perf_counter() - started
+    print(f"{'train':<10} {seconds:8.3f} s ({args.iterations} iterations, {seconds / args.iterations:.2f} s each)")
+
+    started = time.perf_counter()
+    write_factor_model(
+        args.model_dir, user_ids=users, user_factors=user_factors, book_ids=books,
+        book_factors=book_factors, meta={"mode": "implicit"}, keep_versions=1,
+    )
+    print(f"{'write':<10} {time.perf_counter() - started:8.3f} s")
+    del user_factors, book_factors
+
+    model = FactorModelStore(args.model_dir).current()
+    sample = np.random.default_rng(1).choice(len(model.user_ids), args.runs)
+    timings = {"pruned": [], "full scan": []}
+    for row in sample.tolist():
+        factor = np.asarray(model.user_factors[row])
+        started = time.perf_counter()
+        pruned, _ = top_books(model, factor, 10)
+        timings["pruned"].append(time.perf_counter() - started)
+        started = time.perf_counter()
+        scores = model.book_factors @ factor
+        full = np.argpartition(-scores, 9)[:10]
+        full = full[np.argsort(-scores[full])]
+        timings["full scan"].append(time.perf_counter() - started)
+        assert np.allclose(scores[pruned], scores[full])
+    for name, values in timings.items():
+        values = np.array(values) * 1000
+        print(f"{name:<10} {np.median(values):8.3f} ms median, {np.percentile(values, 95):.3f} ms p95 (top 10 of {len(model.book_ids)} books)")
+    print(f"{'peak RSS':<10} {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:8.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+Benchmark concurrent review writes through BookService.add_or_update_review.
+
+Runs W concurrent writers, each with its own session, posting reviews for random
+(book, user) pairs drawn from a small pool so that updates and racing creates of
+the same review are common. Reports throughput, latency and SQL statements per
+write, then checks for duplicate (book_id, user_id) reviews and for drift between
+the denormalized rating aggregates and the review table.
+
+Usage (SQLite, migrations are applied to the target database first):
+    DB_TYPE=sqlite SQLITE_DB_PATH=/tmp/bench_reviews.db \\
+        poetry run python -m benchmarks.review_write_benchmark --writers 16 --writes 200
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import subprocess
+import time
+
+from sqlalchemy import event, func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import settings
+from app.schemas.review import ReviewCreate
+
+
+async def seed_books(db: AsyncSession, total: int) -> list:
+    from app.db.models import Book
+
+    existing = await db.scalar(select(func.count()).select_from(Book))
+    if existing < total:
+        await db.execute(
+            insert(Book),
+            [
+                {"title": f"Benchmark Book {i}", "author": "Bench Author", "genre": "Fiction"}
+                for i in range(existing, total)
+            ]
+        )
+        await db.commit()
+    return list(await db.scalars(select(Book.id).order_by(Book.id).limit(total)))
+
+
+async def check_consistency(db: AsyncSession) -> None:
+    from app.db.models import Book, Review
+
+    duplicates = await db.scalar(
+        select(func.count()).select_from(
+            select(Review.book_id, Review.user_id)
+            .group_by(Review.book_id, Review.user_id)
+            .having(func.count() > 1)
+            .subquery()
+        )
+    )
+    stats = (
+        select(
+            Review.book_id,
+            func.sum(Review.rating).label("rating_sum"),
+            func.count(Review.id).label("rating_count"),
+        )
+        .group_by(Review.book_id)
+        .subquery()
+    )
+    drifted = await db.scalar(
+        select(func.count())
+        .select_from(Book)
+        .outerjoin(stats, stats.c.book_id == Book.id)
+        .where(
+            (Book.rating_sum != func.coalesce(stats.c.rating_sum, 0)) |
+            (Book.rating_count != func.coalesce(stats.c.rating_count, 0))
+        )
+    )
+    print(f"Duplicate (book, user) reviews: {duplicates} | books with drifted aggregates: {drifted}")
+
+
+async def run(args: argparse.Namespace) -> None:
+    from app.services.book_service import book_service
+
+    connect_args = {"timeout": 30} if settings.DB_TYPE == "sqlite" else {}
+    engine = create_async_engine(
+        settings.SQLALCHEMY_DATABASE_URI,
+        pool_size=args.writers,
+        connect_args=connect_args
+    )
+    Session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    statements = 0
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def count_statement(*_):
+        nonlocal statements
+        statements += 1
+
+    async with Session() as db:
+        book_ids = await seed_books(db, args.books)
+
+    rng = random.Random(7)
+    latencies = []
+    errors = 0
+
+    async def writer() -> None:
+        nonlocal errors
+        async with Session() as db:
+            for _ in range(args.writes):
+                book_id, user_id = rng.choice(book_ids), rng.randint(1, args.users)
+                review_in = ReviewCreate(rating=rng.randint(1, 5), review_text="benchmark")
+                started = time.perf_counter()
+                try:
+                    await book_service.add_or_update_review(
+                        db, book_id=book_id, user_id=user_id, review_in=review_in
+                    )
+                except Exception:
+                    errors += 1
+                    await db.rollback()
+                latencies.append((time.perf_counter() - started) * 1000)
+
+    statements = 0
+    started = time.perf_counter()
+    await asyncio.gather(*(writer() for _ in range(args.writers)))
+    elapsed = time.perf_counter() - started
+    total = args.writers * args.writes
+
+    latencies.sort()
+    print(
+        f"{total} writes by {args.writers} writers in {elapsed:.2f}s: "
+        f"{total / elapsed:.0f} writes/s | median {statistics.median(latencies):.2f} ms | "
+        f"p99 {latencies[int(len(latencies) * 0.99) - 1]:.2f} ms | "
+        f"{statements / total:.1f} statements/write | {errors} errors"
+    )
+    async with Session() as db:
+        await check_consistency(db)
+    await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--writers", type=int, default=16)
+    parser.add_argument("--writes", type=int, default=200, help="Writes per writer")
+    parser.add_argument("--books", type=int, default=50)
+    parser.add_argument("--users", type=int, default=20)
+    args = parser.parse_args()
+
+    subprocess.run(["alembic", "upgrade", "head"], check=True)
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+Benchmark book search latency on a synthetic catalog.
+
+Builds (or reuses) a catalog of N synthetic books in the configured database,
+then times GET /books-style searches through BookService for the full-text
+backend, the in-process trigram index and the legacy ILIKE scan.
+
+Usage (SQLite, migrations are applied to the target database first):
+    DB_TYPE=sqlite SQLITE_DB_PATH=/tmp/bench_search.db \\
+        poetry run python -m benchmarks.search_benchmark --books 1000000
+"""
+import argparse
+import asyncio
+import itertools
+import random
+import statistics
+import subprocess
+import time
+
+from sqlalchemy import create_engine, func, insert, select
+
+from app.core.config import settings
+
+SYLLABLES = ["ka", "lo", "mir", "then", "dra", "vel", "os", "tar", "quin", "bel", "sha", "dor", "ni", "gar", "ul", "wen"]
+FIRST_NAMES = ["Anna", "James", "Maria", "Chen", "Olga", "Pierre", "Aisha", "Kenji", "Lucia", "Tomas"]
+GENRES = ["Fiction", "Fantasy", "Science Fiction", "History", "Romance", "Mystery"]
+
+
+def build_vocabulary(rng: random.Random, size: int = 40_000) -> list:
+    words = set()
+    while len(words) < size:
+        words.add("".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))))
+    return sorted(words)
+
+
+def zipf_weights(words: list) -> list:
+    # Zipf (s=1) like natural language: a few very common words, a long tail of rare ones
+    return list(itertools.accumulate(1 / rank for rank in range(1, len(words) + 1)))
+
+
+def queries(words: list) -> list:
+    return [
+        ("stopword-like", words[0]),
+        ("frequent word", words[20]),
+        ("mid-frequency word", words[500]),
+        ("rare word", words[20_000]),
+        ("two words", f"{words[3]} {words[40]}"),
+        ("prefix", words[300][:5]),
+        ("author surname", words[100].title()),
+        ("no match", "zzzqx"),
+    ]
+
+
+def sync_database_url() -> str:
+    if settings.DB_TYPE == "postgres":
+        return settings.SQLALCHEMY_DATABASE_URI.replace("+asyncpg", "+psycopg2")
+    return settings.SQLALCHEMY_DATABASE_URI.replace("+aiosqlite", "")
+
+
+def seed_catalog(total: int, chunk_size: int = 50_000) -> None:
+    from app.db.models import Book
+
+    engine = create_engine(sync_database_url())
+    with engine.begin() as conn:
+        existing = conn.scalar(select(func.count()).select_from(Book))
+    if existing >= total:
+        print(f"Reusing catalog of {existing} books")
+        return
+
+    rng = random.Random(42)
+    words = build_vocabulary(rng)
+    weights = zipf_weights(words)
+    started = time.perf_counter()
+    for offset in range(existing, total, chunk_size):
+        rows = [
+            {
+                "title": " ".join(rng.choices(words, cum_weights=weights, k=rng.randint(2, 6))).title(),
+                "author": f"{rng.choice(FIRST_NAMES)} {rng.choices(words, cum_weights=weights)[0].title()}",
+                "genre": rng.choice(GENRES),
+            }
+            for i in range(offset, min(offset + chunk_size, total))
+        ]
+        with engine.begin() as conn:
+            conn.execute(insert(Book), rows)
+    engine.dispose()
+    print(f"Seeded {total - existing} books in {time.perf_counter() - started:.1f}s")
+
+
+async def time_searches(backend: str, repeats: int) -> None:
+    words = build_vocabulary(random.Random(42))
+    from app.db.session import SessionLocal, engine
+    from app.services.book_service import book_service
+    from app.services.search_index import book_search_index
+
+    engine.echo = False
+    settings.BOOK_SEARCH_BACKEND = backend
+    async with SessionLocal() as db:
+        if backend == "trigram" and not book_search_index.ready:
+            started = time.perf_counter()
+            await book_search_index.build(db)
+            print(
+                f"Built trigram index in {time.perf_counter() - started:.1f}s, "
+                f"{book_search_index.index.memory_bytes() / 2**20:.0f} MiB of postings"
+            )
+        for label, query in queries(words):
+            timings = []
+            for _ in range(repeats):
+                started = time.perf_counter()
+                books = await book_service.get_books(db, skip=0, limit=10, search=query)
+                timings.append((time.perf_counter() - started) * 1000)
+            print(
+                f"{backend:>6} | {label:<18} {query!r:<24} | hits on page {len(books):>2} | "
+                f"median {statistics.median(timings):8.2f} ms | max {max(timings):8.2f} ms"
+            )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--books", type=int, default=1_000_000)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument(
+        "--backends", default="fts,trigram,ilike",
+        help="Comma-separated search backends to time (fts, trigram, ilike)"
+    )
+    args = parser.parse_args()
+
+    subprocess.run(["alembic", "upgrade", "head"], check=True)
+    seed_catalog(args.books)
+
+    async def run() -> None:
+        for backend in args.backends.split(","):
+            await time_searches(backend, args.repeats)
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
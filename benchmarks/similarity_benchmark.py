@@ -0,0 +1,103 @@
+"""
+Benchmark the item-item recommender (app.tasks.similarity).
+
+Trains on N synthetic ratings (generated in memory, with a long tail of book
+popularity) and times building the rating matrix and computing the top
+neighbors of every book block by block. With --db, also stores the neighbors
+in a SQLite database and times reading a book's similar books the way
+GET /books/{book_id}/similar does.
+
+Usage:
+    poetry run python -m benchmarks.similarity_benchmark \\
+        --ratings 5000000 --users 200000 --books 100000 --db /tmp/similarity_benchmark.db
+"""
+import argparse
+import asyncio
+import logging
+import os
+import resource
+import time
+
+
+def synthetic_ratings(ratings: int, users: int, books: int, seed: int = 0):
+    """user_id, book_id and rating arrays; low book ids are the most popular"""
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    user_ids = rng.integers(1, users + 1, ratings, dtype=np.int32)
+    book_ids = (1 + books * rng.random(ratings) ** 2).astype(np.int32)
+    # Users rate by taste: each user prefers books of one parity
+    taste = (user_ids + book_ids) % 2
+    rating = np.clip(rng.normal(2.5 + taste * 1.5, 1.0, ratings).round(), 1, 5).astype(np.int32)
+    # One rating per (user, book), as the unique index guarantees
+    keys = np.unique(user_ids.astype(np.int64) * (books + 1) + book_ids, return_index=True)[1]
+    return user_ids[keys], book_ids[keys], rating[keys]
+
+
+async def time_similar_books(path: str, book_ids, runs: int) -> float:
+    from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+    from app.crud.crud_similarity import book_similarity
+
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    async with async_sessionmaker(engine, class_=AsyncSession)() as db:
+        started = time.perf_counter()
+        for i in range(runs):
+            await book_similarity.get_neighbors(db, book_id=int(book_ids[i % len(book_ids)]), limit=10)
+        seconds = (time.perf_counter() - started) / runs
+    await engine.dispose()
+    return seconds
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ratings", type=int, default=5_000_000)
+    parser.add_argument("--users", type=int, default=200_000)
+    parser.add_argument("--books", type=int, default=100_000)
+    parser.add_argument("--db", help="SQLite database to store the neighbors in")
+    parser.add_argument("--runs", type=int, default=1000)
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    from app.core.config import settings
+    from app.tasks.similarity import rating_matrix, replace_book_similarity, top_neighbors
+
+    user_ids, book_ids, ratings = synthetic_ratings(args.ratings, args.users, args.books)
+    started = time.perf_counter()
+    matrix, books = rating_matrix(user_ids, book_ids, ratings, settings.RECOMMENDER_SIMILARITY)
+    matrix_seconds = time.perf_counter() - started
+    print(f"{len(ratings)} ratings, {matrix.shape[0]} users, {matrix.shape[1]} books, {settings.RECOMMENDER_SIMILARITY}")
+    print(f"{'matrix':<10} {matrix_seconds:8.3f} s (sparse users x books, unit columns)")
+
+    blocks = top_neighbors(matrix, settings.RECOMMENDER_NEIGHBORS, settings.RECOMMENDER_BLOCK_SIZE)
+    if not args.db:
+        started = time.perf_counter()
+        neighbors = sum(len(block.sources) for block in blocks)
+        print(f"{'neighbors':<10} {time.perf_counter() - started:8.3f} s ({neighbors} kept, blocks of {settings.RECOMMENDER_BLOCK_SIZE} books)")
+    else:
+        from sqlalchemy import create_engine, insert
+        from sqlalchemy.orm import sessionmaker
+        from app.db.base_class import Base
+        from app.db.models import Book, BookSimilarity
+
+        if os.path.exists(args.db):
+            os.remove(args.db)
+        engine = create_engine(f"sqlite:///{args.db}")
+        Base.metadata.create_all(engine, tables=[Book.__table__, BookSimilarity.__table__])
+        with engine.begin() as conn:
+            conn.execute(insert(Book.__table__), [
+                {"id": book_id, "title": f"Title {book_id}", "author": "Author", "genre": "Genre"}
+                for book_id in books.tolist()
+            ])
+        db = sessionmaker(bind=engine)()
+        started = time.perf_counter()
+        neighbors = replace_book_similarity(db, books, blocks)
+        db.commit()
+        db.close()
+        print(f"{'neighbors':<10} {time.perf_counter() - started:8.3f} s ({neighbors} computed and stored)")
+        seconds = asyncio.run(time_similar_books(args.db, books, args.runs))
+        print(f"{'similar':<10} {seconds * 1000:8.3f} ms (read a book's 10 most similar books)")
+    print(f"{'peak RSS':<10} {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:8.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
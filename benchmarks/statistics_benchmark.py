@@ -0,0 +1,121 @@
+"""
+Benchmark the statistics computation on a large synthetic catalog.
+
+Creates a SQLite catalog of N books (a fifth of them without reviews, a third
+linked to Google Books) and M reviews, then times the five queries the task
+used to run, the single scan of the book table the nightly task now uses to
+reconcile the statistics counters (app.tasks.statistics), and reading the
+counters as GET /statistics does.
+
+Usage:
+    poetry run python -m benchmarks.statistics_benchmark \\
+        --books 100000 --reviews 10000000 --db /tmp/statistics_benchmark.db
+"""
+import argparse
+import logging
+import os
+import time
+
+from sqlalchemy import create_engine, func, select, text
+from sqlalchemy.orm import sessionmaker
+
+
+def create_catalog(path: str, books: int, reviews: int):
+    from app.db.base_class import Base
+    from app.db.models import Book, BookStatistics, GenreStatistics, Review
+
+    if os.path.exists(path):
+        os.remove(path)
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine, tables=[Book.__table__, Review.__table__, BookStatistics.__table__, GenreStatistics.__table__])
+    reviewed_books = books * 4 // 5
+    with engine.begin() as conn:
+        # Generated in SQL: inserting 10M rows from Python would dominate the run
+        conn.execute(text(
+            "WITH RECURSIVE n(i) AS (SELECT 0 UNION ALL SELECT i + 1 FROM n WHERE i + 1 < :books) "
+            "INSERT INTO book (id, title, author, genre, google_books_id, rating_sum, rating_count, version) "
+            "SELECT i + 1, 'Title ' || i, 'Author ' || (i % 997), 'Genre ' || (i % 24), "
+            "CASE WHEN i % 3 = 0 THEN 'vol-' || i END, 0, 0, 0 FROM n"
+        ), {"books": books})
+        conn.execute(text(
+            "WITH RECURSIVE n(i) AS (SELECT 0 UNION ALL SELECT i + 1 FROM n WHERE i + 1 < :reviews) "
+            "INSERT INTO review (rating, book_id, user_id) "
+            "SELECT 1 + i % 5, 1 + i % :reviewed_books, i / :reviewed_books FROM n"
+        ), {"reviews": reviews, "reviewed_books": reviewed_books})
+        # The rating aggregates the review write paths would have maintained
+        conn.execute(text(
+            "UPDATE book SET rating_sum = r.rating_sum, rating_count = r.rating_count, "
+            "average_rating = r.rating_sum * 1.0 / r.rating_count "
+            "FROM (SELECT book_id, sum(rating) AS rating_sum, count(*) AS rating_count "
+            "FROM review GROUP BY book_id) AS r WHERE r.book_id = book.id"
+        ))
+    return engine
+
+
+def old_statistics(db) -> dict:
+    """The five queries calculate_book_statistics used to run"""
+    from app.db.models import Book, Review
+
+    total_books = db.scalar(select(func.count()).select_from(Book))
+    total_reviews = db.scalar(select(func.count()).select_from(Review))
+    books_with_google_id = db.scalar(
+        select(func.count()).select_from(Book).where(Book.google_books_id.isnot(None))
+    )
+    books_with_reviews = db.scalar(select(func.count()).select_from(Book).where(Book.reviews.any()))
+    genre_stats = db.execute(
+        select(Book.genre, func.count(Book.id)).group_by(Book.genre).order_by(func.count(Book.id).desc())
+    ).all()
+    return {
+        "total_books": total_books,
+        "total_reviews": total_reviews,
+        "books_with_reviews": books_with_reviews,
+        "books_with_google_id": books_with_google_id,
+        "genre_distribution": dict(genre_stats),
+    }
+
+
+def timed(fn, runs: int):
+    best, result = float("inf"), None
+    for _ in range(runs):
+        started = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--books", type=int, default=100_000)
+    parser.add_argument("--reviews", type=int, default=10_000_000)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--db", default="/tmp/statistics_benchmark.db")
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    from app.db.models import GenreStatistics
+    from app.crud.crud_statistics import summarize_genres
+    from app.tasks.statistics import compute_statistics, reconcile_counters
+
+    started = time.perf_counter()
+    engine = create_catalog(args.db, args.books, args.reviews)
+    print(f"Created {args.books} books and {args.reviews} reviews in {time.perf_counter() - started:.0f}s")
+    db = sessionmaker(bind=engine)()
+
+    old_seconds, old = timed(lambda: old_statistics(db), args.runs)
+    new_seconds, new = timed(lambda: compute_statistics(db), args.runs)
+    assert {**new, "genre_distribution": dict(new["genre_distribution"])} == old
+    print(f"{'old task':<10} {old_seconds:8.3f} s (5 queries)")
+    print(f"{'recompute':<10} {new_seconds:8.3f} s (1 scan)")
+
+    reconcile_seconds, _ = timed(lambda: reconcile_counters(db), args.runs)
+    print(f"{'reconcile':<10} {reconcile_seconds:8.3f} s (recompute and replace the counters)")
+    read_seconds, current = timed(
+        lambda: summarize_genres(db.scalars(select(GenreStatistics)).all()), args.runs * 100
+    )
+    assert current == new
+    print(f"{'endpoint':<10} {read_seconds * 1000:8.3f} ms (read the counters)")
+    db.close()
+
+
+if __name__ == "__main__":
+    main()